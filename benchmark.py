@@ -0,0 +1,347 @@
+import argparse
+import concurrent.futures
+import glob
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import traceback
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+import read_data
+import read_salbp
+from utils.solution_decoding import column_values
+
+DATA_DIR = "data"
+REPORT_PATH = os.path.join("result_data", "benchmark_report.json")
+BASELINE_PATH = os.path.join("result_data", "benchmark_baseline.json")
+
+BACKENDS = ("heuristic", "decomposition", "highs", "scip", "gurobi")
+PHASES = ("read", "build", "export", "solve", "decode")
+
+# Cycle times of the bundled `.IN2` files, taken from the usual SALBP-1 benchmark settings
+IN2_CYCLE_TIMES = {
+    "ARC83": 5048,
+    "ARC111": 7520,
+    "MERTENS": 10,
+    "SAWYER30": 41,
+    "SCHOLL": 1699,
+}
+
+# A phase counts as slower than the baseline if it exceeds it by both the factor and the slack
+TIME_TOLERANCE = 0.25
+TIME_SLACK = 0.05
+
+def discover_instances(data_dir=DATA_DIR):
+    """
+    Returns the paths of the `.IN2` files and `input*.xlsx` workbooks in `data_dir`.
+
+    Workbooks without all sheets of `read_data.SHEETS` can't be read and are skipped.
+    """
+    paths = glob.glob(os.path.join(data_dir, "*.IN2")) + glob.glob(os.path.join(data_dir, "input*.xlsx"))
+    instances = []
+    for path in sorted(path for path in paths if not os.path.basename(path).startswith("~$")):
+        missing = _missing_sheets(path) if path.lower().endswith(".xlsx") else []
+        if missing:
+            print(f"Skipping `{path}`, it has no sheets {', '.join(missing)}.")
+            continue
+        instances.append(path)
+    return instances
+
+def _missing_sheets(path):
+    import pandas as pd
+
+    with pd.ExcelFile(path) as workbook:
+        return [sheet for sheet in read_data.SHEETS if sheet not in workbook.sheet_names]
+
+def instance_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+def load_instance(path, cycle_time=None):
+    """
+    Reads an instance from an Excel workbook or a `.IN2` file.
+
+    Args:
+        path (str): Path of the instance.
+        cycle_time (int): Cycle time of a `.IN2` file, defaults to `IN2_CYCLE_TIMES`.
+    """
+    if path.lower().endswith(".in2"):
+        if cycle_time is None:
+            cycle_time = IN2_CYCLE_TIMES.get(instance_name(path))
+        return read_salbp.read_input_from_in2(path, cycle_time=cycle_time)
+    return read_data.read_input_from_excel(path)
+
+def run_case(path, backend, time_limit, cycle_time=None, symmetry_breaking=False, formulation="assignment",
+             progress_dir=None):
+    """
+    Runs one backend on one instance and measures it.
+
+    Args:
+        symmetry_breaking (bool): Passed on to `OptimizationModel.build_model`.
+        formulation (str): Passed on to `OptimizationModel.build_model`.
+        progress_dir (str): Directory for the incumbent and bound time series of the solver backends,
+            written as `<instance>_<backend>.csv`, see `utils.progress.ProgressLog`.
+
+    Returns:
+        dict: The record of the run with the wall time of each phase in seconds, the peak RSS in MB,
+            the model size, objective, bound, gap, number of branch-and-bound nodes and number of stations.
+    """
+    record = {
+        "instance": instance_name(path),
+        "backend": backend,
+        "status": None,
+        "phases": {},
+        "peak_rss_mb": None,
+        "num_variables": None,
+        "num_constraints": None,
+        "objective": None,
+        "lower_bound": None,
+        "gap": None,
+        "nodes": None,
+        "num_stations": None,
+    }
+    try:
+        start = time.perf_counter()
+        data_input = load_instance(path, cycle_time)
+        record["phases"]["read"] = time.perf_counter() - start
+
+        if backend == "heuristic":
+            station_results = _run_heuristic(data_input, record)
+        elif backend == "decomposition":
+            station_results = _run_decomposition(data_input, time_limit, record)
+        else:
+            progress = None
+            if progress_dir is not None:
+                from utils.progress import ProgressLog
+
+                progress = ProgressLog()
+                progress.metadata = {"instance": record["instance"], "backend": backend, "time_limit": time_limit}
+            try:
+                station_results = _run_model(data_input, backend, time_limit, record, symmetry_breaking,
+                                             formulation, progress)
+            finally:
+                if progress is not None and progress.rows:
+                    progress.export(os.path.join(progress_dir, f"{record['instance']}_{backend}.csv"))
+
+        if station_results is not None:
+            record["num_stations"] = len(station_results)
+    except Exception as error:
+        record["status"] = "error"
+        record["error"] = f"{type(error).__name__}: {error}"
+        traceback.print_exc()
+
+    record["peak_rss_mb"] = _peak_rss_mb()
+    return record
+
+def _run_heuristic(data_input, record):
+    from heuristic_solver import SolverHeuristic
+    from utils.bounds import cost_lower_bound, relative_gap
+    from utils.heuristics import solution_cost
+
+    start = time.perf_counter()
+    station_results = SolverHeuristic().solve(data_input)
+    record["phases"]["solve"] = time.perf_counter() - start
+    record["status"] = "feasible"
+    record["objective"] = solution_cost(station_results, data_input["station_costs"])
+    record["lower_bound"] = cost_lower_bound(
+        data_input["tasks"], data_input["product_names"], data_input["station_types"], data_input["task_time_dict"],
+        data_input["cycle_time_dict"], data_input["stationtype_compatibility"], data_input["station_costs"])
+    record["gap"] = relative_gap(record["objective"], record["lower_bound"])
+    return station_results
+
+def _run_decomposition(data_input, time_limit, record):
+    from decomposition_solver import SolverDecomposition
+
+    solver = SolverDecomposition(time_limit=time_limit)
+    start = time.perf_counter()
+    station_results = solver.solve(data_input)
+    record["phases"]["solve"] = time.perf_counter() - start
+    record.update(solver.statistics)
+    return station_results
+
+def _run_model(data_input, backend, time_limit, record, symmetry_breaking=False, formulation="assignment",
+               progress=None):
+    from model_with_stationtypes import OptimizationModel
+
+    model = OptimizationModel()
+    model.build_model(data_input["cycle_time_dict"], data_input["tasks"], data_input["station_types"],
+                      data_input["product_names"], data_input["task_time_dict"],
+                      data_input["precedence_relations"], data_input["incompatible_tasks"],
+                      data_input["compatible_tasks"], data_input["stationtype_compatibility"],
+                      data_input["station_costs"], prune_stations=True, heuristic_start=True,
+                      symmetry_breaking=symmetry_breaking, presolve=True, formulation=formulation)
+
+    if backend == "gurobi":
+        station_results = model.execute_solver("gurobi", time_limit=time_limit, progress=progress)
+        record["phases"].update(model.timings)
+        if station_results is None and not model.statistics:
+            record["status"] = "unavailable"
+            return None
+        record.update(model.statistics)
+        return station_results
+
+    if backend == "highs":
+        from highs_solver import SolverHiGHS as Solver
+    elif backend == "scip":
+        from scip_solver import SolverSCIP as Solver
+    else:
+        raise ValueError(f"Backend '{backend}' is not supported.")
+
+    solver = Solver(data_input["num_tasks"], data_input["precedence_relations"], time_limit=time_limit)
+    solver.lower_bound = model.lower_bound
+    solver.unit_members = model.unit_members
+    solver.progress = progress
+    try:
+        # HiGHS gets the model in memory, SCIP reads it from an MPS file
+        if backend == "highs":
+            return solver.solve_model(model.model)
+        with tempfile.TemporaryDirectory() as directory:
+            mps_file_path = os.path.join(directory, "alb_model.mps")
+            model.export_model(mps_file_path)
+            solver.mip_start = column_values(model.model, model.column_map)
+            return solver.solve(mps_file_path, model.column_map)
+    finally:
+        # Keeps the measurements of the finished phases if a later phase fails
+        record["phases"].update(model.timings)
+        record["phases"].update(solver.timings)
+        record.update(solver.statistics)
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    # The largest child counts too, e.g. a worker of the decomposition backend
+    peak = max(resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN))
+    # ru_maxrss is given in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_benchmark(paths, backends=BACKENDS, time_limit=60, symmetry_breaking=False, formulation="assignment",
+                  progress_dir=None):
+    """
+    Runs every backend on every instance, each run in a fresh process so the peak RSS is per run.
+
+    Returns:
+        dict: The report with the environment and one record per run under "cases".
+    """
+    cases = []
+    for path in paths:
+        for backend in backends:
+            print(f"Benchmarking `{instance_name(path)}` with {backend}...")
+            # Pool workers are daemonic and couldn't start the processes of the decomposition backend
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+                record = executor.submit(run_case, path, backend, time_limit, None, symmetry_breaking,
+                                         formulation, progress_dir).result()
+            cases.append(record)
+
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time_limit": time_limit,
+        "symmetry_breaking": symmetry_breaking,
+        "formulation": formulation,
+        "cases": cases,
+    }
+
+def compare_with_baseline(report, baseline, time_tolerance=TIME_TOLERANCE, time_slack=TIME_SLACK):
+    """
+    Compares a report with a baseline report.
+
+    A run regresses if it fails although it succeeded in the baseline, if its objective or station
+    count grows, or if its build or read time exceeds the baseline by more than `time_tolerance`
+    (relative) and `time_slack` seconds. Solve times depend on the time limit and aren't compared.
+
+    Returns:
+        list of str: One message per regression.
+    """
+    baseline_cases = {(case["instance"], case["backend"]): case for case in baseline.get("cases", [])}
+    regressions = []
+    for case in report["cases"]:
+        previous = baseline_cases.get((case["instance"], case["backend"]))
+        if previous is None or previous["status"] in ("error", "unavailable"):
+            continue
+        name = f"{case['instance']} / {case['backend']}"
+
+        if case["status"] in ("error", "unavailable"):
+            regressions.append(f"{name}: {case['status']} (baseline: {previous['status']})")
+            continue
+
+        for key in ("objective", "num_stations"):
+            if previous[key] is not None and (case[key] is None or case[key] > previous[key] + 1e-6):
+                regressions.append(f"{name}: {key} {case[key]} (baseline: {previous[key]})")
+
+        for phase in ("read", "build"):
+            old, new = previous["phases"].get(phase), case["phases"].get(phase)
+            if old is not None and new is not None and new > old * (1 + time_tolerance) + time_slack:
+                regressions.append(f"{name}: {phase} time {new:.3f}s (baseline: {old:.3f}s)")
+
+    return regressions
+
+def print_report(report):
+    print(f"\n{'Instance':<14}{'Backend':<15}{'Status':<14}" + "".join(f"{p:>9}" for p in PHASES)
+          + f"{'RSS MB':>9}{'Vars':>9}{'Cons':>9}{'Objective':>12}{'Bound':>12}{'Gap':>8}{'Nodes':>9}{'Stations':>10}")
+    for case in report["cases"]:
+        phases = "".join(
+            f"{case['phases'][p]:>9.3f}" if p in case["phases"] else f"{'-':>9}" for p in PHASES
+        )
+        print(f"{case['instance']:<14}{case['backend']:<15}{str(case['status']):<14}{phases}"
+              f"{_format(case['peak_rss_mb'], '.0f', 9)}{_format(case['num_variables'], 'd', 9)}"
+              f"{_format(case['num_constraints'], 'd', 9)}{_format(case['objective'], '.6g', 12)}"
+              f"{_format(case.get('lower_bound'), '.6g', 12)}"
+              f"{_format(case['gap'], '.2%', 8)}{_format(case.get('nodes'), 'd', 9)}"
+              f"{_format(case['num_stations'], 'd', 10)}")
+
+def _format(value, spec, width):
+    return f"{'-':>{width}}" if value is None else f"{value:>{width}{spec}}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks the solver backends on the bundled instances.")
+    parser.add_argument("instances", nargs="*", help="Instance files, defaults to the instances in data/.")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--time-limit", type=float, default=60, help="Time limit of each solver run in seconds.")
+    parser.add_argument("--symmetry-breaking", action="store_true",
+                        help="Adds the symmetry breaking constraints to the model.")
+    parser.add_argument("--formulation", choices=("assignment", "cumulative"), default="assignment",
+                        help="Formulation of the station assignment, see `OptimizationModel.build_model`.")
+    parser.add_argument("--progress-dir", default=None,
+                        help="Directory for the incumbent and bound time series of each solver run as CSV.")
+    parser.add_argument("--output", default=REPORT_PATH, help="Path of the JSON report.")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Path of the baseline report.")
+    parser.add_argument("--update-baseline", action="store_true", help="Stores the report as new baseline.")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.instances or discover_instances(), args.backends, args.time_limit,
+                           args.symmetry_breaking, args.formulation, args.progress_dir)
+    print_report(report)
+
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"\nReport written to `{args.output}`.")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Baseline written to `{args.baseline}`.")
+        return 0
+
+    if not os.path.isfile(args.baseline):
+        print(f"No baseline found at `{args.baseline}`, run with --update-baseline to create one.")
+        return 0
+
+    with open(args.baseline) as file:
+        regressions = compare_with_baseline(report, json.load(file))
+    if regressions:
+        print("\nRegressions against the baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print("\nNo regressions against the baseline.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
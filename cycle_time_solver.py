@@ -0,0 +1,258 @@
+import argparse
+import math
+import time
+import traceback
+
+import read_data
+import read_salbp
+import write_assignments
+from instance import Instance
+from utils.bounds import cost_lower_bound
+from utils.heuristics import ranked_positional_weight, solution_cost
+from utils.precedence_graph import PrecedenceGraph
+
+
+class SolverCycleTime:
+    def __init__(self, solver_name="appsi_highs", time_limit=60, tolerance=1e-3, prune_stations=True):
+        """
+        Parameters:
+        ----------
+        solver_name : str
+            Name of the solver for Pyomo's SolverFactory, used for the probes the bounds and the
+            heuristic can't decide.
+        time_limit : float
+            Seconds per solver probe.
+        tolerance : float
+            Relative width of the final interval if task or cycle times aren't integers.
+        prune_stations : bool
+            Passed on to `OptimizationModel.build_model`.
+        """
+        self.solver_name = solver_name
+        self.time_limit = time_limit
+        self.tolerance = tolerance
+        self.prune_stations = prune_stations
+        # One dict per probe with the keys "cycle_time_dict", "method" ("bound", "heuristic" or "milp")
+        # and "feasible", which is None if the probe couldn't decide
+        self.probes = []
+        self.timings = {}
+
+    def solve(self, data_input, budget):
+        """
+        Finds the shortest cycle times for which a line costs at most `budget` (SALBP-2).
+
+        With several products, the cycle times of the input are scaled by a common factor, so their
+        ratios are kept. With a single product and integer task times, the search runs over integer
+        cycle times and is exact.
+
+        The search bisects in three passes. The combinatorial bounds of `utils.bounds` first exclude
+        the cycle times whose lower bound on the costs exceeds the budget. The ranked positional weight
+        heuristic then finds lines within the budget. Only the remaining interval is closed with the
+        MILP, whose probes start from the cheapest line found so far that fits the probed cycle times.
+        A line found at any cycle time is feasible down to its largest station time, so the upper end
+        of the interval jumps to that time.
+
+        Args:
+            data_input (dict or Instance): Input data as returned by `read_data.read_input_from_excel`
+                or `read_data.read_instance`.
+            budget (float): Maximum costs of the line, a number of stations if every station costs 1.
+
+        Returns:
+            dict: The keys "cycle_time_dict" with the shortest cycle time of each product,
+                "station_results" with a line for them, and "optimal", which is False if a solver
+                probe hit its time limit without a proof.
+
+        Raises:
+            ValueError: If no line within the budget exists even for the longest useful cycle time.
+        """
+        if isinstance(data_input, Instance):
+            data_input = data_input.to_data_input()
+        self.probes = []
+        start = time.perf_counter()
+        result = _Search(self, data_input, budget).run()
+        self.timings = {"search": time.perf_counter() - start}
+
+        cycle_times = ", ".join(f"{p}: {c:g}" for p, c in result["cycle_time_dict"].items())
+        print(f"Shortest cycle times within a budget of {budget:g}: {cycle_times} "
+              f"({'optimal' if result['optimal'] else 'not proven'}, {len(self.probes)} probes, "
+              f"{sum(probe['method'] == 'milp' for probe in self.probes)} MILP).")
+        return result
+
+
+class _Search:
+    # Bisection over the cycle time of a single product with integer task times, and over the factor
+    # applied to all cycle times otherwise
+    def __init__(self, solver, data_input, budget):
+        self.solver = solver
+        self.data_input = data_input
+        self.budget = budget
+        self.products = data_input["product_names"]
+        task_times = data_input["task_time_dict"]
+        self.integral = len(self.products) == 1 and all(float(t).is_integer() for t in task_times.values())
+        # Cycle time per unit of the searched value
+        self.scale = {p: 1 if self.integral else data_input["cycle_time_dict"][p] for p in self.products}
+        self.times = {p: [task_times[(i, p)] / self.scale[p] for i in data_input["tasks"]] for p in self.products}
+        # Shared by all probes, only the cycle times change
+        self.precedence_graph = PrecedenceGraph.from_pairs(data_input["tasks"], data_input["precedence_relations"])
+        # Every line found, feasible for the values at least as large as its load
+        self.lines = []
+        self.optimal = True
+
+    def run(self):
+        lo = max(max(times) for times in self.times.values())
+        if self.integral:
+            lo = int(lo)
+        hi = self._initial_value(lo)
+
+        lo, _ = self._bisect(lo, hi, self._bound_probe)
+        _, hi = self._bisect(lo, hi, self._heuristic_probe)
+        self._bisect(lo, hi, self._milp_probe)
+
+        value, station_results = min(
+            ((load, line) for load, line in self.lines if solution_cost(line, self._costs) <= self.budget + 1e-6),
+            key=lambda entry: entry[0])
+        write_assignments.print_station_results(station_results)
+        return {"cycle_time_dict": self._cycle_time_dict(value), "station_results": station_results,
+                "optimal": self.optimal}
+
+    @property
+    def _costs(self):
+        return self.data_input["station_costs"]
+
+    def _initial_value(self, lo):
+        # The input cycle times, doubled until the heuristic finds a line within the budget, or the
+        # total task times as last resort, where the MILP has to find one
+        total = max(sum(times) for times in self.times.values())
+        value = max(self.data_input["cycle_time_dict"][self.products[0]] if self.integral else 1, lo)
+        while value < total:
+            load = self._heuristic_probe(value)
+            if load is not None:
+                return load
+            value *= 2
+        if self._bound_probe(total) is None or self._milp_probe(total) is None:
+            raise ValueError(f"No line costs at most {self.budget:g} for any cycle time.")
+        return self.lines[-1][0]
+
+    def _bisect(self, lo, hi, probe):
+        # Narrows [lo, hi], where hi is feasible, probe(value) returns a feasible value <= value or None
+        while (lo < hi) if self.integral else (hi - lo > self.solver.tolerance * hi):
+            middle = (lo + hi) // 2 if self.integral else (lo + hi) / 2
+            feasible = probe(middle)
+            if feasible is None:
+                lo = middle + 1 if self.integral else middle
+            else:
+                hi = feasible
+        return lo, hi
+
+    def _cycle_time_dict(self, value):
+        return {p: value * self.scale[p] for p in self.products}
+
+    def _load(self, station_results):
+        # The smallest value the line is feasible for
+        task_times = self.data_input["task_time_dict"]
+        load = max(sum(task_times[(i, p)] for i in info["assigned_tasks"]) / self.scale[p]
+                   for info in station_results.values() for p in self.products)
+        return int(load) if self.integral else load
+
+    def _record(self, value, method, feasible):
+        self.solver.probes.append(
+            {"cycle_time_dict": self._cycle_time_dict(value), "method": method, "feasible": feasible})
+
+    def _add_line(self, station_results):
+        # Returns the load of the line if it is within the budget
+        load = self._load(station_results)
+        self.lines.append((load, station_results))
+        return load if solution_cost(station_results, self._costs) <= self.budget + 1e-6 else None
+
+    def _bound_probe(self, value):
+        # None if the costs of every line exceed the budget, so shorter cycle times are infeasible too
+        data = self.data_input
+        bound = cost_lower_bound(data["tasks"], data["product_names"], data["station_types"], data["task_time_dict"],
+                                 self._cycle_time_dict(value), data["stationtype_compatibility"], self._costs)
+        feasible = bound <= self.budget + 1e-6
+        self._record(value, "bound", None if feasible else False)
+        return value if feasible else None
+
+    def _heuristic_probe(self, value):
+        data = self.data_input
+        try:
+            station_results = ranked_positional_weight(
+                data["tasks"], data["product_names"], data["station_types"], data["task_time_dict"],
+                self._cycle_time_dict(value), data["precedence_relations"], data["incompatible_tasks"],
+                data["compatible_tasks"], data["stationtype_compatibility"], self._costs, self.precedence_graph)
+        except ValueError:
+            # Some tasks don't fit on a station
+            self._record(value, "heuristic", None)
+            return None
+        load = self._add_line(station_results)
+        self._record(value, "heuristic", True if load is not None else None)
+        return load
+
+    def _milp_probe(self, value):
+        from model_with_stationtypes import OptimizationModel
+
+        data = self.data_input
+        # Lines found at other cycle times stay feasible if they fit
+        fitting = [line for load, line in self.lines if load <= value]
+        initial_solution = min(fitting, key=lambda line: solution_cost(line, self._costs), default=None)
+        try:
+            model = OptimizationModel()
+            model.build_model(self._cycle_time_dict(value), data["tasks"], data["station_types"],
+                              data["product_names"], data["task_time_dict"], data["precedence_relations"],
+                              data["incompatible_tasks"], data["compatible_tasks"], data["stationtype_compatibility"],
+                              self._costs, prune_stations=self.solver.prune_stations, heuristic_start=True,
+                              presolve=True, initial_solution=initial_solution,
+                              precedence_graph=self.precedence_graph)
+        except ValueError:
+            # Some tasks don't fit on a station
+            traceback.print_exc()
+            self._record(value, "milp", False)
+            return None
+
+        if solution_cost(model.initial_solution, self._costs) <= self.budget + 1e-6:
+            self._record(value, "heuristic", True)
+            return self._add_line(model.initial_solution)
+
+        station_results = model.execute_solver(self.solver.solver_name, time_limit=self.solver.time_limit)
+        statistics = model.statistics
+        load = self._add_line(station_results) if station_results else None
+        if load is not None:
+            self._record(value, "milp", True)
+            return load
+
+        # Infeasible only if the solver proved that no line is within the budget, the solver stops at a
+        # relative gap, so an optimal status alone isn't a proof
+        lower_bound = statistics.get("lower_bound")
+        if lower_bound is not None and all(float(cost).is_integer() for cost in self._costs.values()):
+            lower_bound = math.ceil(lower_bound - 1e-6)
+        proven = str(statistics.get("status")).lower() == "infeasible" \
+            or (lower_bound is not None and lower_bound > self.budget + 1e-6)
+        if not proven:
+            self.optimal = False
+        self._record(value, "milp", False if proven else None)
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Finds the shortest cycle time of a line within a budget (SALBP-2).")
+    parser.add_argument("instance", help="Excel or SALBP benchmark (.IN2) file.")
+    parser.add_argument("budget", type=float, help="Maximum costs of the line, or number of stations with --stations.")
+    parser.add_argument("--stations", action="store_true", help="Every station costs 1, so the budget counts stations.")
+    parser.add_argument("--solver", default="appsi_highs", help="Name of the solver for Pyomo's SolverFactory.")
+    parser.add_argument("--time-limit", type=float, default=60, help="Time limit of each solver probe in seconds.")
+    args = parser.parse_args(argv)
+
+    if args.instance.lower().endswith(".in2"):
+        data_input = read_salbp.read_input_from_in2(args.instance)
+    else:
+        data_input = read_data.read_instance(args.instance)
+    if isinstance(data_input, Instance):
+        data_input = data_input.to_data_input()
+    if args.stations:
+        data_input = {**data_input, "station_costs": {k: 1 for k in data_input["station_types"]}}
+
+    SolverCycleTime(args.solver, args.time_limit).solve(data_input, args.budget)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,198 @@
+import math
+import multiprocessing
+import os
+import time
+import traceback
+
+import write_assignments
+from heuristic_solver import SolverHeuristic
+from instance import Instance
+from utils.bounds import cost_lower_bound, relative_gap
+from utils.heuristics import solution_cost
+
+
+class SolverDecomposition:
+    def __init__(self, solver_name="appsi_highs", tasks_per_segment=30, overlap=2, time_limit=120, processes=None,
+                 prune_stations=True):
+        """
+        Parameters:
+        ----------
+        solver_name : str
+            Name of the solver for Pyomo's SolverFactory, used for every sub-line.
+        tasks_per_segment : int
+            Minimum number of tasks of a segment, a segment always consists of whole stations.
+        overlap : int
+            Number of stations on each side of a segment boundary re-optimised by the stitching pass.
+        time_limit : float
+            Seconds for both passes together, the segments get half of it.
+        processes : int
+            Number of worker processes, defaults to the number of CPUs.
+        prune_stations : bool
+            Passed on to `OptimizationModel.build_model`.
+        """
+        self.solver_name = solver_name
+        self.tasks_per_segment = tasks_per_segment
+        self.overlap = overlap
+        self.time_limit = time_limit
+        self.processes = processes or os.cpu_count() or 1
+        self.prune_stations = prune_stations
+        # Wall times of the start line, segment and stitching passes in seconds and the statistics of the line
+        self.timings = {}
+        self.statistics = {}
+
+    def solve(self, data_input):
+        """
+        Balances a line by solving sub-lines of consecutive stations in parallel.
+
+        A heuristic line is cut into segments of whole stations. Its station order is a topological
+        order, so every precedence relation between two segments points forward and every same-station
+        group lies within one station. Each segment is solved as an independent `OptimizationModel`
+        over its tasks, and the sub-lines are concatenated. A stitching pass then re-solves the stations
+        around every segment boundary with the rest of the line fixed. A sub-line only replaces the
+        stations it was built from if it is cheaper, so the line never gets worse than the heuristic one.
+
+        Args:
+            data_input (dict or Instance): Input data as returned by `read_data.read_input_from_excel`
+                or `read_data.read_instance`.
+
+        Returns:
+            dict: Maps the station number to a dict with the keys "station_type" and "assigned_tasks".
+        """
+        if isinstance(data_input, Instance):
+            data_input = data_input.to_data_input()
+        station_costs = data_input["station_costs"]
+        self.timings = {}
+
+        start = time.perf_counter()
+        line = [info for _, info in sorted(SolverHeuristic().solve(data_input).items())]
+        self.timings["start_line"] = time.perf_counter() - start
+        print(f"Heuristic line with costs {solution_cost(dict(enumerate(line)), station_costs):g}.")
+
+        with multiprocessing.Pool(processes=self.processes) as pool:
+            start = time.perf_counter()
+            segments = self._segments(line)
+            print(f"Solving {len(segments)} segments with {self.processes} processes...")
+            line, segments = self._resolve(pool, data_input, line, segments, self.time_limit / 2)
+            self.timings["segments"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            boundaries = self._boundaries(line, segments)
+            print(f"Stitching {len(boundaries)} segment boundaries...")
+            line, _ = self._resolve(pool, data_input, line, boundaries, self.time_limit / 2)
+            self.timings["stitch"] = time.perf_counter() - start
+
+        station_results = {j: info for j, info in enumerate(line, start=1)}
+        objective = solution_cost(station_results, station_costs)
+        lower_bound = cost_lower_bound(
+            data_input["tasks"], data_input["product_names"], data_input["station_types"], data_input["task_time_dict"],
+            data_input["cycle_time_dict"], data_input["stationtype_compatibility"], station_costs)
+        self.statistics = {
+            "status": "feasible",
+            "objective": objective,
+            "gap": relative_gap(objective, lower_bound),
+            "lower_bound": lower_bound,
+        }
+
+        print(f"Decomposed line with costs {objective:g}:")
+        write_assignments.print_station_results(station_results)
+        return station_results
+
+    def _segments(self, line):
+        # Ranges of consecutive stations with at least `tasks_per_segment` tasks, the last one may have fewer
+        segments = []
+        first = 0
+        num_tasks = 0
+        for j, info in enumerate(line):
+            num_tasks += len(info["assigned_tasks"])
+            if num_tasks >= self.tasks_per_segment:
+                segments.append((first, j + 1))
+                first = j + 1
+                num_tasks = 0
+        if first < len(line):
+            segments.append((first, len(line)))
+        return segments
+
+    def _boundaries(self, line, segments):
+        # Disjoint ranges of `overlap` stations on both sides of each boundary between two segments
+        windows = []
+        end = 0
+        for _, boundary in segments[:-1]:
+            window = (max(boundary - self.overlap, end), min(boundary + self.overlap, len(line)))
+            if window[1] - window[0] >= 2:
+                windows.append(window)
+                end = window[1]
+        return windows
+
+    def _resolve(self, pool, data_input, line, windows, budget):
+        # Solves the tasks of each range of stations as a sub-line in parallel and keeps the cheaper stations.
+        # Returns the new line and the ranges of its stations built from each window, a cheaper sub-line
+        # may have a different number of stations.
+        if not windows:
+            return line, windows
+        rounds = math.ceil(len(windows) / self.processes)
+        jobs = [
+            (self.solver_name, _sub_input(data_input, [i for info in line[first:last] for i in info["assigned_tasks"]]),
+             budget / rounds, self.prune_stations)
+            for first, last in windows
+        ]
+        sub_lines = pool.starmap(_solve_sub_line, jobs)
+
+        station_costs = data_input["station_costs"]
+        new_line = []
+        new_windows = []
+        end = 0
+        for (first, last), sub_line in sorted(zip(windows, sub_lines)):
+            new_line += line[end:first]
+            stations = line[first:last]
+            if sub_line is not None and solution_cost(dict(enumerate(sub_line)), station_costs) \
+                    < solution_cost(dict(enumerate(stations)), station_costs) - 1e-9:
+                stations = sub_line
+            new_windows.append((len(new_line), len(new_line) + len(stations)))
+            new_line += stations
+            end = last
+        new_line += line[end:]
+        return new_line, new_windows
+
+
+def _sub_input(data_input, tasks):
+    # The instance restricted to a subset of the tasks
+    task_set = set(tasks)
+
+    def within(pairs):
+        return [(a, b) for a, b in pairs if a in task_set and b in task_set]
+
+    return {
+        **data_input,
+        "num_tasks": len(tasks),
+        "tasks": sorted(tasks),
+        "task_time_dict": {
+            (i, p): task_time for (i, p), task_time in data_input["task_time_dict"].items() if i in task_set
+        },
+        "stationtype_compatibility": {
+            (i, k): value for (i, k), value in data_input["stationtype_compatibility"].items() if i in task_set
+        },
+        "precedence_relations": within(data_input["precedence_relations"]),
+        "incompatible_tasks": within(data_input["incompatible_tasks"]),
+        "compatible_tasks": within(data_input["compatible_tasks"]),
+    }
+
+
+def _solve_sub_line(solver_name, sub_input, time_limit, prune_stations):
+    # Runs in a worker process, returns the stations of the sub-line in line order or None
+    try:
+        from model_with_stationtypes import OptimizationModel
+
+        model = OptimizationModel()
+        model.build_model(sub_input["cycle_time_dict"], sub_input["tasks"], sub_input["station_types"],
+                          sub_input["product_names"], sub_input["task_time_dict"],
+                          sub_input["precedence_relations"], sub_input["incompatible_tasks"],
+                          sub_input["compatible_tasks"], sub_input["stationtype_compatibility"],
+                          sub_input["station_costs"], prune_stations=prune_stations, heuristic_start=True,
+                          presolve=True)
+        station_results = model.execute_solver(solver_name, time_limit=time_limit)
+    except Exception:
+        traceback.print_exc()
+        return None
+    if not station_results:
+        return None
+    return [info for _, info in sorted(station_results.items())]
@@ -0,0 +1,322 @@
+import math
+import random
+import time
+
+import numpy as np
+
+import write_assignments
+from instance import Instance
+from utils.heuristics import group_units, ranked_positional_weight
+
+
+class SolverHeuristic:
+    def __init__(self, iterations=20000, time_limit=1.0, seed=0):
+        """
+        Parameters:
+        ----------
+        iterations : int
+            Maximum number of local search moves.
+        time_limit : float
+            Maximum number of seconds spent in the local search.
+        seed : int
+            Seed of the random number generator, which makes runs reproducible.
+        """
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.seed = seed
+
+    def solve(self, data_input):
+        """
+        Builds a line with the ranked positional weight rule and improves it with simulated annealing.
+
+        Args:
+            data_input (dict or Instance): Input data as returned by `read_data.read_input_from_excel`
+                or `read_data.read_instance`.
+
+        Returns:
+            dict: Maps the station number to a dict with the keys "station_type" and "assigned_tasks".
+        """
+        print("Using the heuristic solver...")
+        instance = Instance.from_data_input(data_input)
+        initial_solution = ranked_positional_weight(
+            data_input["tasks"], data_input["product_names"], data_input["station_types"],
+            data_input["task_time_dict"], data_input["cycle_time_dict"], data_input["precedence_relations"],
+            data_input["incompatible_tasks"], data_input["compatible_tasks"],
+            data_input["stationtype_compatibility"], data_input["station_costs"], instance.precedence_graph)
+
+        station_results = self.improve(instance, initial_solution)
+
+        write_assignments.print_station_results(station_results)
+        return station_results
+
+    def improve(self, data_input, station_results):
+        """
+        Improves a feasible line with simulated annealing over unit moves and swaps between stations.
+
+        Every move keeps the line feasible. The search minimises the station costs and, as a secondary
+        goal, prefers unevenly loaded stations, which drives lightly loaded stations towards being emptied.
+
+        Args:
+            data_input (dict or Instance): Input data of the line.
+            station_results (dict): Feasible line to start from.
+
+        Returns:
+            dict: The best line found, with the same structure as `station_results`.
+        """
+        search = _LineSearch(data_input, station_results, random.Random(self.seed))
+        search.run(self.iterations, self.time_limit)
+        return search.best_station_results()
+
+
+class _LineSearch:
+    # Weight of the load balance term relative to the cheapest station
+    BALANCE_WEIGHT = 0.5
+    START_TEMPERATURE = 0.5
+    END_TEMPERATURE = 0.005
+    NEW_STATION_PROBABILITY = 0.05
+
+    def __init__(self, data_input, station_results, rng):
+        self.rng = rng
+        instance = Instance.from_data_input(data_input)
+        self.station_types = list(instance.station_types)
+
+        units, members, unit_predecessors, unit_successors = group_units(
+            instance["tasks"], instance["precedence_relations"], instance["compatible_tasks"],
+            instance.precedence_graph)
+        index = {unit: k for k, unit in enumerate(units)}
+        unit_of_task = {task: index[unit] for unit in units for task in members[unit]}
+        self.members = [members[unit] for unit in units]
+        rows = [[instance.task_index[task] for task in self.members[u]] for u in range(len(units))]
+
+        # Array backed unit data, units are indexed in topological order
+        self.times = np.array([instance.task_times[r].sum(axis=0) for r in rows], dtype=float) \
+            .reshape(len(units), instance.num_products)
+        self.cycle = instance.cycle_times.astype(float)
+        task_masks = instance.compatibility_masks()
+        self.full_mask = (1 << instance.num_types) - 1
+        self.masks = []
+        for r in rows:
+            mask = self.full_mask
+            for i in r:
+                mask &= task_masks[i]
+            self.masks.append(mask)
+        self.type_costs = instance.station_costs.tolist()
+        self.min_cost = min(self.type_costs) or 1
+        self.predecessors = [[index[v] for v in unit_predecessors[unit]] for unit in units]
+        self.successors = [[index[v] for v in unit_successors[unit]] for unit in units]
+        self.incompatible = [set() for _ in units]
+        for d, f in instance.tasks[instance.incompatible_pairs].tolist():
+            self.incompatible[unit_of_task[d]].add(unit_of_task[f])
+            self.incompatible[unit_of_task[f]].add(unit_of_task[d])
+        self._mask_cost = {}
+
+        # Line state: station ids in line order, their units, loads and positions
+        num_units = len(units)
+        capacity = num_units + 1
+        self.station_of = np.zeros(num_units, dtype=np.int64)
+        self.station_units = [set() for _ in range(capacity)]
+        self.loads = np.zeros((capacity, instance.num_products), dtype=float)
+        self.position = np.zeros(capacity, dtype=np.int64)
+        self.free_ids = list(range(capacity - 1, len(station_results) - 1, -1))
+        self.line = []
+        for station_id, j in enumerate(sorted(station_results)):
+            self.line.append(station_id)
+            for task in station_results[j]["assigned_tasks"]:
+                u = unit_of_task[task]
+                if u not in self.station_units[station_id]:
+                    self.station_units[station_id].add(u)
+                    self.station_of[u] = station_id
+                    self.loads[station_id] += self.times[u]
+        self._update_positions()
+
+        self.cost = sum(self._station_cost(s) for s in self.line)
+        self.best_cost = self.cost
+        self.best_station_of = self.station_of.copy()
+        self.best_line = list(self.line)
+
+    def run(self, iterations, time_limit):
+        num_units = len(self.members)
+        if num_units < 2 or iterations <= 0:
+            return
+
+        start = time.perf_counter()
+        cooling = (self.END_TEMPERATURE / self.START_TEMPERATURE) ** (1 / iterations)
+        temperature = self.START_TEMPERATURE
+
+        for iteration in range(iterations):
+            if iteration % 256 == 0 and time.perf_counter() - start > time_limit:
+                break
+            temperature *= cooling
+
+            u = self.rng.randrange(num_units)
+            roll = self.rng.random()
+            if roll < self.NEW_STATION_PROBABILITY:
+                self._try_new_station(u, temperature)
+            elif roll < 0.5 + self.NEW_STATION_PROBABILITY / 2:
+                self._try_move(u, self.line[self.rng.randrange(len(self.line))], temperature)
+            else:
+                self._try_swap(u, self.rng.randrange(num_units), temperature)
+
+    def best_station_results(self):
+        station_results = {}
+        for station_id in self.best_line:
+            units = sorted(u for u in range(len(self.members)) if self.best_station_of[u] == station_id)
+            if not units:
+                continue
+            mask = self.full_mask
+            for u in units:
+                mask &= self.masks[u]
+            station_type = min((k for k in range(len(self.station_types)) if mask >> k & 1),
+                               key=lambda k: self.type_costs[k])
+            station_results[len(station_results) + 1] = {
+                "station_type": self.station_types[station_type],
+                "assigned_tasks": [task for u in units for task in self.members[u]],
+            }
+        return station_results
+
+    # Moves
+
+    def _try_move(self, u, target, temperature):
+        source = self.station_of[u]
+        if source == target or not self._fits(u, target) or not self._precedence_ok(u, self.position[target]):
+            return
+        if self.masks[u] & self._mask(target) == 0 or self.incompatible[u] & self.station_units[target]:
+            return
+
+        before = self._energy(source) + self._energy(target)
+        cost_before = self._station_cost(source) + self._station_cost(target)
+        self._remove(u, source)
+        self._add(u, target)
+        delta = self._energy(source) + self._energy(target) - before
+        if self._accept(delta, temperature):
+            self._commit(self._station_cost(source) + self._station_cost(target) - cost_before, source, target)
+        else:
+            self._remove(u, target)
+            self._add(u, source)
+
+    def _try_swap(self, u, v, temperature):
+        source, target = self.station_of[u], self.station_of[v]
+        if source == target:
+            return
+        if np.any(self.loads[target] - self.times[v] + self.times[u] > self.cycle) \
+                or np.any(self.loads[source] - self.times[u] + self.times[v] > self.cycle):
+            return
+        if not self._precedence_ok(u, self.position[target], v, self.position[source]) \
+                or not self._precedence_ok(v, self.position[source], u, self.position[target]):
+            return
+        if self.incompatible[u] & (self.station_units[target] - {v}) \
+                or self.incompatible[v] & (self.station_units[source] - {u}):
+            return
+        if self.masks[u] & self._mask(target, without=v) == 0 or self.masks[v] & self._mask(source, without=u) == 0:
+            return
+
+        before = self._energy(source) + self._energy(target)
+        cost_before = self._station_cost(source) + self._station_cost(target)
+        self._remove(u, source)
+        self._remove(v, target)
+        self._add(u, target)
+        self._add(v, source)
+        delta = self._energy(source) + self._energy(target) - before
+        if self._accept(delta, temperature):
+            self._commit(self._station_cost(source) + self._station_cost(target) - cost_before, source, target)
+        else:
+            self._remove(u, target)
+            self._remove(v, source)
+            self._add(u, source)
+            self._add(v, target)
+
+    def _try_new_station(self, u, temperature):
+        source = self.station_of[u]
+        if len(self.station_units[source]) < 2 or not self.free_ids:
+            return
+        # The new station is placed directly behind the source station, or in front of it
+        if not any(self.station_of[w] == source for w in self.successors[u]):
+            offset = 1
+        elif not any(self.station_of[w] == source for w in self.predecessors[u]):
+            offset = 0
+        else:
+            return
+
+        before = self._energy(source)
+        cost_before = self._station_cost(source)
+        target = self.free_ids.pop()
+        self.line.insert(self.position[source] + offset, target)
+        self._update_positions()
+        self._remove(u, source)
+        self._add(u, target)
+        delta = self._energy(source) + self._energy(target) - before
+        if self._accept(delta, temperature):
+            self._commit(self._station_cost(source) + self._station_cost(target) - cost_before, source, target)
+        else:
+            self._remove(u, target)
+            self._add(u, source)
+            self._drop_station(target)
+
+    # State helpers
+
+    def _fits(self, u, station_id):
+        return bool(np.all(self.loads[station_id] + self.times[u] <= self.cycle))
+
+    def _precedence_ok(self, u, position, swapped=None, swapped_position=None):
+        for w in self.predecessors[u]:
+            p = swapped_position if w == swapped else self.position[self.station_of[w]]
+            if p > position:
+                return False
+        for w in self.successors[u]:
+            p = swapped_position if w == swapped else self.position[self.station_of[w]]
+            if p < position:
+                return False
+        return True
+
+    def _mask(self, station_id, without=None):
+        mask = self.full_mask
+        for w in self.station_units[station_id]:
+            if w != without:
+                mask &= self.masks[w]
+        return mask
+
+    def _station_cost(self, station_id):
+        if not self.station_units[station_id]:
+            return 0
+        mask = self._mask(station_id)
+        if mask not in self._mask_cost:
+            self._mask_cost[mask] = min(self.type_costs[k] for k in range(len(self.station_types)) if mask >> k & 1)
+        return self._mask_cost[mask]
+
+    def _energy(self, station_id):
+        if not self.station_units[station_id]:
+            return 0.0
+        load = float(np.mean(self.loads[station_id] / self.cycle))
+        return self._station_cost(station_id) / self.min_cost - self.BALANCE_WEIGHT * load * load
+
+    def _accept(self, delta, temperature):
+        return delta <= 0 or self.rng.random() < math.exp(-delta / temperature)
+
+    def _remove(self, u, station_id):
+        self.station_units[station_id].discard(u)
+        self.loads[station_id] -= self.times[u]
+
+    def _add(self, u, station_id):
+        self.station_units[station_id].add(u)
+        self.loads[station_id] += self.times[u]
+        self.station_of[u] = station_id
+
+    def _commit(self, cost_change, *station_ids):
+        for station_id in station_ids:
+            if not self.station_units[station_id]:
+                self._drop_station(station_id)
+        self.cost += cost_change
+        if self.cost < self.best_cost:
+            self.best_cost = self.cost
+            self.best_station_of = self.station_of.copy()
+            self.best_line = list(self.line)
+
+    def _drop_station(self, station_id):
+        self.line.remove(station_id)
+        self.loads[station_id] = 0
+        self.free_ids.append(station_id)
+        self._update_positions()
+
+    def _update_positions(self):
+        for position, station_id in enumerate(self.line):
+            self.position[station_id] = position
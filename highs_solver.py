@@ -1,14 +1,41 @@
 import highspy
-from collections import defaultdict
 import os
-import networkx as nx
+import time
+import numpy as np
+from pyomo.environ import Constraint, Objective, Var, maximize, value
+from pyomo.repn import generate_standard_repn
+
+import write_assignments
+from utils.bounds import relative_gap
+from utils.solution_decoding import column_map_from_model, decode_station_results
 
 class SolverHiGHS:
-    def __init__(self, num_tasks, precedence_relations):
+    def __init__(self, num_tasks, precedence_relations, time_limit=None):
         self.max_num_stations = num_tasks
         self.precedence_relations = precedence_relations
-
-    def solve(self, file_path):
+        self.time_limit = time_limit
+        # Wall times of the last run in seconds and the statistics reported by HiGHS
+        self.timings = {}
+        self.statistics = {}
+        # Called with (objective, station_results) whenever HiGHS finds an improving solution
+        self.incumbent_callback = None
+        # Lower bound on the objective, e.g. `OptimizationModel.lower_bound`. HiGHS stops once an
+        # incumbent reaches it, and it tightens the reported gap.
+        self.lower_bound = None
+        # Maps the super-tasks of a presolved model to their tasks, see `OptimizationModel.unit_members`
+        self.unit_members = None
+        # `utils.progress.ProgressLog` filled with the incumbents, bounds and node counts during the run
+        self.progress = None
+
+    def solve(self, file_path, column_map=None):
+        """
+        Solves the model of an MPS file.
+
+        Args:
+            file_path (str): Path of the MPS file.
+            column_map (dict): Maps the column names of the file to (component name, index), see
+                `OptimizationModel.column_map`. If None, the names are parsed as Pyomo symbolic labels.
+        """
         # Check if filename is a valid MPS file
         if not os.path.isfile(file_path):
             raise FileNotFoundError(f"File '{file_path}' wasn't found.")
@@ -17,69 +44,191 @@ class SolverHiGHS:
 
         print("Using HiGHS to solve the model...")
         # Call solver
-        self.run_highs_optimizer(file_path)
+        return self.run_highs_optimizer(file_path, column_map)
+
+    def solve_model(self, model):
+        """
+        Solves a Pyomo model by passing its matrices to HiGHS directly, without writing an MPS file.
+
+        The current values of the variables, e.g. the heuristic solution loaded by
+        `OptimizationModel.build_model`, are passed as MIP start.
+
+        Args:
+            model (ConcreteModel): A linear model, e.g. `OptimizationModel.model`.
+        """
+        print("Using HiGHS to solve the model...")
+        start = time.perf_counter()
+        h = self._create_highs()
+        if h.passModel(build_highs_lp(model)) == highspy.HighsStatus.kError:
+            raise ValueError("HiGHS rejected the model.")
+        # Columns are in the order of the variables, see `build_highs_lp`
+        start_values = [(k, var.value) for k, var in enumerate(model.component_data_objects(Var, descend_into=True))
+                        if var.value is not None]
+        if start_values:
+            columns, values = zip(*start_values)
+            h.setSolution(len(columns), np.array(columns, dtype=np.int32), np.array(values, dtype=float))
+        self.timings["export"] = time.perf_counter() - start
+        return self._run(h, column_map_from_model(model))
 
     # Uses the Open-Source-Library to solve the problem
-    def run_highs_optimizer(self, file_path):
+    def run_highs_optimizer(self, file_path, column_map=None):
+        start = time.perf_counter()
+        h = self._create_highs()
+        if h.readModel(file_path) == highspy.HighsStatus.kError:
+            raise ValueError(f"HiGHS couldn't read the model from '{file_path}'.")
+        self.timings["read_model"] = time.perf_counter() - start
+        return self._run(h, column_map)
+
+    def _create_highs(self):
         h = highspy.Highs()
-        h.readModel(file_path)
+        if self.time_limit is not None:
+            h.setOptionValue("time_limit", float(self.time_limit))
+        return h
+
+    def _run(self, h, column_map):
+        if self.incumbent_callback is not None:
+            names = h.getLp().col_names_
+
+            def on_improving_solution(event):
+                station_results = decode_station_results(names, event.data_out.mip_solution, column_map,
+                                                         self.unit_members)
+                self.incumbent_callback(event.data_out.objective_function_value, station_results)
+
+            h.cbMipImprovingSolution.subscribe(on_improving_solution)
+
+        if self.lower_bound is not None:
+            def on_interrupt(event):
+                if event.data_out.mip_primal_bound <= self.lower_bound + 1e-6:
+                    event.data_in.user_interrupt = True
+
+            h.cbMipInterrupt.subscribe(on_interrupt)
+
+        if self.progress is not None:
+            self.progress.clear()
+
+            def on_improving_solution_progress(event):
+                self.progress.record(event.data_out.running_time, event.data_out.objective_function_value,
+                                     event.data_out.mip_dual_bound, event.data_out.mip_node_count, "incumbent")
+
+            def on_progress(event):
+                self.progress.record(event.data_out.running_time, event.data_out.mip_primal_bound,
+                                     event.data_out.mip_dual_bound, event.data_out.mip_node_count)
+
+            h.cbMipImprovingSolution.subscribe(on_improving_solution_progress)
+            h.cbMipInterrupt.subscribe(on_progress)
+
+        start = time.perf_counter()
         h.run()
         solution = h.getSolution()
         model_status = h.getModelStatus()
         print('Model status = ', h.modelStatusToString(model_status))
-
-        station_task_dict = self.create_station_task_dict(solution)
-
-        # Sorts the tasks of a station according to precedence relations
-        sorted_station_task_dict = self.sort_tasks_in_stations(station_task_dict)
-
-        self.print_task_assignments(sorted_station_task_dict)
-
-    def create_station_task_dict(self, solution):
-        station_task_dict = defaultdict(list)
-        # Iterate through tasks and stations
-        for task in range(self.max_num_stations):
-            for station in range(self.max_num_stations):
-                index = task * self.max_num_stations + station  # Calculate Index
-                value = solution.col_value[index]
-                rounded_value = round(value)
-                if rounded_value == 1:
-                    station_task_dict[station + 1].append(task + 1)  # Add station and task to dictionary
-
-        return station_task_dict
-    
-    def sort_tasks_in_stations(self, station_task_dict):
-        # Erstelle einen gerichteten Graphen basierend auf den precedence_relations
-        G = nx.DiGraph()
-        G.add_edges_from(self.precedence_relations)
-
-        # Durchlaufe jede Station und sortiere die Aufgaben
-        for station, tasks in station_task_dict.items():
-            items_in_graph = [task for task in tasks if task in G.nodes]
-            items_not_in_graph = [task for task in tasks if task not in G.nodes]
-
-            subgraph = G.subgraph(items_in_graph)
-            # Wenn keine Aufgaben in der aktuellen Station sind, überspringe die Station
-            sorted_items = list(nx.topological_sort(subgraph))
-
-            sorted_list = []
-            for item in tasks:
-                if item in items_in_graph:
-                    sorted_list.append(sorted_items.pop(0))  # Füge die sortierten Items hinzu
-                else:
-                    sorted_list.append(item)
-
-            # Sortiere die Aufgaben der Station nach der Reihenfolge
-            station_task_dict[station] = sorted_list
-
-        return station_task_dict
-
-    def print_task_assignments(self, station_task_dict):
-        sorted_station_keys = sorted(station_task_dict.keys())
-
-        print("\nTask Assignment Summary:")
-        for idx, station in enumerate(sorted_station_keys, start=1):
-            # Get the tasks for this station
-            tasks = station_task_dict[station]
-            # Output the station with the new name (Station 1, Station 2, etc.)
-            print(f"Station {idx}: {tasks}")
\ No newline at end of file
+        self.timings["solve"] = time.perf_counter() - start
+
+        info = h.getInfo()
+        has_solution = info.primal_solution_status == highspy.SolutionStatus.kSolutionStatusFeasible
+        objective = info.objective_function_value if has_solution else None
+        lower_bound = info.mip_dual_bound
+        if self.lower_bound is not None:
+            lower_bound = max(lower_bound, self.lower_bound)
+        self.statistics = {
+            "status": h.modelStatusToString(model_status),
+            "num_variables": h.getNumCol(),
+            "num_constraints": h.getNumRow(),
+            "objective": objective,
+            "gap": relative_gap(objective, lower_bound) if has_solution else None,
+            "lower_bound": lower_bound,
+            "nodes": info.mip_node_count,
+        }
+        if self.progress is not None:
+            self.progress.record(h.getRunTime(), objective, info.mip_dual_bound, info.mip_node_count, "final")
+        if not has_solution:
+            print("HiGHS found no solution.")
+            return None
+
+        start = time.perf_counter()
+        station_results = decode_station_results(h.getLp().col_names_, solution.col_value, column_map,
+                                                 self.unit_members)
+        self.timings["decode"] = time.perf_counter() - start
+
+        write_assignments.print_station_results(station_results)
+        return station_results
+
+
+def build_highs_lp(model):
+    """
+    Builds the HiGHS representation of a linear Pyomo model in memory.
+
+    Columns follow the order of `model.component_data_objects(Var)` and are named like the Pyomo
+    variables, e.g. `x[3,2]`. Fixed variables are passed as columns with equal bounds.
+
+    Args:
+        model (ConcreteModel): The model, it must have exactly one active objective.
+
+    Returns:
+        highspy.HighsLp: The model with row-wise constraint matrix and integrality information.
+
+    Raises:
+        ValueError: If the objective or a constraint isn't linear.
+    """
+    variables = list(model.component_data_objects(Var, descend_into=True))
+    column = {id(var): k for k, var in enumerate(variables)}
+    inf = highspy.kHighsInf
+
+    def bound(expression, default):
+        return default if expression is None else float(value(expression))
+
+    lp = highspy.HighsLp()
+    lp.num_col_ = len(variables)
+    lp.col_names_ = [var.name for var in variables]
+    lp.col_lower_ = np.array([var.value if var.fixed else bound(var.lb, -inf) for var in variables], dtype=float)
+    lp.col_upper_ = np.array([var.value if var.fixed else bound(var.ub, inf) for var in variables], dtype=float)
+    lp.integrality_ = [
+        highspy.HighsVarType.kInteger if var.is_integer() else highspy.HighsVarType.kContinuous
+        for var in variables
+    ]
+
+    objectives = list(model.component_data_objects(Objective, active=True, descend_into=True))
+    if len(objectives) != 1:
+        raise ValueError(f"Expected one active objective, found {len(objectives)}.")
+    objective = objectives[0]
+    repn = _linear_repn(objective.expr, objective)
+    col_cost = np.zeros(len(variables))
+    for var, coefficient in zip(repn.linear_vars, repn.linear_coefs):
+        col_cost[column[id(var)]] += coefficient
+    lp.col_cost_ = col_cost
+    lp.offset_ = float(repn.constant)
+    lp.sense_ = highspy.ObjSense.kMaximize if objective.sense == maximize else highspy.ObjSense.kMinimize
+
+    # Constraint matrix in compressed row format
+    row_lower, row_upper = [], []
+    start, index, coefficients = [0], [], []
+    for constraint in model.component_data_objects(Constraint, active=True, descend_into=True):
+        lower, body, upper = constraint.to_bounded_expression(evaluate_bounds=True)
+        repn = _linear_repn(body, constraint)
+        row = {}
+        for var, coefficient in zip(repn.linear_vars, repn.linear_coefs):
+            k = column[id(var)]
+            row[k] = row.get(k, 0) + coefficient
+        constant = float(repn.constant)
+        row_lower.append((-inf if lower is None else lower) - constant)
+        row_upper.append((inf if upper is None else upper) - constant)
+        index.extend(row.keys())
+        coefficients.extend(row.values())
+        start.append(len(index))
+
+    lp.num_row_ = len(row_lower)
+    lp.row_lower_ = np.array(row_lower, dtype=float)
+    lp.row_upper_ = np.array(row_upper, dtype=float)
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+    lp.a_matrix_.num_col_ = len(variables)
+    lp.a_matrix_.num_row_ = len(row_lower)
+    lp.a_matrix_.start_ = np.array(start, dtype=np.int32)
+    lp.a_matrix_.index_ = np.array(index, dtype=np.int32)
+    lp.a_matrix_.value_ = np.array(coefficients, dtype=float)
+    return lp
+
+def _linear_repn(expression, component):
+    repn = generate_standard_repn(expression, quadratic=False)
+    if not repn.is_linear():
+        raise ValueError(f"HiGHS only supports linear models, `{component.name}` isn't linear.")
+    return repn
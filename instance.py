@@ -0,0 +1,302 @@
+import json
+import os
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from functools import cached_property
+
+import numpy as np
+
+from utils.precedence_graph import PrecedenceGraph
+
+
+@dataclass(frozen=True, eq=False)
+class Instance:
+    """
+    Array backed representation of an assembly line balancing instance.
+
+    Tasks, products and station types are addressed by their position in `tasks`, `product_names`
+    and `station_types`. For backward compatibility the instance can be indexed like the dict
+    returned by `read_data.read_input_from_excel`, e.g. `instance["task_time_dict"][(task, product)]`.
+
+    Attributes:
+        solver (str): Name of the solver requested in the input data.
+        num_tasks (int): Number of tasks as stated in the input data.
+        tasks (np.ndarray): Task IDs, shape (n_tasks,).
+        product_names (tuple of str): Product names.
+        station_types (tuple of str): Station types.
+        task_times (np.ndarray): Processing times, shape (n_tasks, n_products).
+        cycle_times (np.ndarray): Cycle time of each product, shape (n_products,).
+        compatibility (np.ndarray): Boolean matrix, True if a task can be processed on a station
+            type, shape (n_tasks, n_types).
+        station_costs (np.ndarray): Cost of opening a station of each type, shape (n_types,).
+        successor_indptr, successor_indices (np.ndarray): Precedence relations as CSR adjacency
+            over task indices, the successors of task i are
+            `successor_indices[successor_indptr[i]:successor_indptr[i + 1]]`.
+        predecessor_indptr, predecessor_indices (np.ndarray): The transposed adjacency.
+        incompatible_pairs (np.ndarray): Task index pairs which can't share a station, shape (m, 2).
+        same_station_pairs (np.ndarray): Task index pairs which must share a station, shape (m, 2).
+    """
+    solver: str
+    num_tasks: int
+    tasks: np.ndarray
+    product_names: tuple
+    station_types: tuple
+    task_times: np.ndarray
+    cycle_times: np.ndarray
+    compatibility: np.ndarray
+    station_costs: np.ndarray
+    successor_indptr: np.ndarray
+    successor_indices: np.ndarray
+    predecessor_indptr: np.ndarray
+    predecessor_indices: np.ndarray
+    incompatible_pairs: np.ndarray
+    same_station_pairs: np.ndarray
+    task_index: dict = field(init=False, repr=False)
+
+    # Keys of the dict returned by `read_data.read_input_from_excel`
+    DATA_INPUT_KEYS = (
+        "solver", "cycle_time_dict", "num_tasks", "tasks", "product_names", "task_time_dict", "station_costs",
+        "stationtype_compatibility", "station_types", "precedence_relations", "incompatible_tasks",
+        "compatible_tasks",
+    )
+
+    def __post_init__(self):
+        for name in self.__dataclass_fields__:
+            value = getattr(self, name, None)
+            if isinstance(value, np.ndarray):
+                value.setflags(write=False)
+        object.__setattr__(self, "task_index", {task: i for i, task in enumerate(self.tasks.tolist())})
+
+    @classmethod
+    def from_arrays(cls, solver, num_tasks, tasks, product_names, station_types, task_times, cycle_times,
+                    compatibility, station_costs, precedence_pairs, incompatible_pairs, same_station_pairs):
+        """
+        Creates an instance from arrays, building the CSR adjacency of the precedence relations.
+
+        Args:
+            precedence_pairs, incompatible_pairs, same_station_pairs (array-like): Pairs of task IDs.
+                All other arguments correspond to the attributes of the instance.
+        """
+        tasks = np.asarray(tasks, dtype=np.int64)
+        sorter = np.argsort(tasks, kind="stable")
+
+        def to_indices(pairs):
+            pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+            positions = np.searchsorted(tasks, pairs, sorter=sorter).clip(max=max(len(tasks) - 1, 0))
+            indices = sorter[positions] if len(tasks) else positions
+            unknown = tasks[indices] != pairs if len(tasks) else np.ones_like(pairs, dtype=bool)
+            if unknown.any():
+                raise ValueError(f"Unknown task {pairs[unknown][0]} in task pairs.")
+            return indices.astype(np.int64)
+
+        precedence = to_indices(precedence_pairs)
+        successor_indptr, successor_indices = _csr(precedence[:, 0], precedence[:, 1], len(tasks))
+        predecessor_indptr, predecessor_indices = _csr(precedence[:, 1], precedence[:, 0], len(tasks))
+
+        return cls(
+            solver=solver,
+            num_tasks=int(num_tasks),
+            tasks=tasks,
+            product_names=tuple(product_names),
+            station_types=tuple(station_types),
+            task_times=np.asarray(task_times).reshape(len(tasks), len(product_names)),
+            cycle_times=np.asarray(cycle_times),
+            compatibility=np.asarray(compatibility, dtype=bool).reshape(len(tasks), len(station_types)),
+            station_costs=np.asarray(station_costs),
+            successor_indptr=successor_indptr,
+            successor_indices=successor_indices,
+            predecessor_indptr=predecessor_indptr,
+            predecessor_indices=predecessor_indices,
+            incompatible_pairs=to_indices(incompatible_pairs),
+            same_station_pairs=to_indices(same_station_pairs),
+        )
+
+    @classmethod
+    def from_data_input(cls, data_input):
+        """
+        Creates an instance from the dict returned by `read_data.read_input_from_excel`.
+        """
+        if isinstance(data_input, Instance):
+            return data_input
+
+        tasks = list(data_input["tasks"])
+        products = list(data_input["product_names"])
+        station_types = list(data_input["station_types"])
+        task_time_dict = data_input["task_time_dict"]
+        compatibility = data_input["stationtype_compatibility"]
+        cycle_time_dict = data_input["cycle_time_dict"]
+        station_costs = data_input["station_costs"]
+
+        return cls.from_arrays(
+            solver=data_input["solver"],
+            num_tasks=data_input["num_tasks"],
+            tasks=tasks,
+            product_names=products,
+            station_types=station_types,
+            task_times=[[task_time_dict[(i, p)] for p in products] for i in tasks],
+            cycle_times=[cycle_time_dict[p] for p in products],
+            compatibility=[[compatibility[(i, k)] for k in station_types] for i in tasks],
+            station_costs=[station_costs[k] for k in station_types],
+            precedence_pairs=data_input["precedence_relations"],
+            incompatible_pairs=data_input["incompatible_tasks"],
+            same_station_pairs=data_input["compatible_tasks"],
+        )
+
+    def save(self, directory):
+        """
+        Writes the instance to a directory, one `.npy` file per array and the names to `meta.json`.
+        """
+        os.makedirs(directory, exist_ok=True)
+        meta = {"solver": self.solver, "num_tasks": self.num_tasks}
+        for name in self.__dataclass_fields__:
+            value = getattr(self, name)
+            if isinstance(value, np.ndarray):
+                np.save(os.path.join(directory, f"{name}.npy"), value, allow_pickle=False)
+            elif isinstance(value, tuple):
+                meta[name] = list(value)
+        with open(os.path.join(directory, "meta.json"), "w") as file:
+            json.dump(meta, file)
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        """
+        Reads an instance written by `save`. The arrays are memory-mapped unless `mmap_mode` is None.
+        """
+        with open(os.path.join(directory, "meta.json")) as file:
+            meta = json.load(file)
+        fields = {}
+        for name, definition in cls.__dataclass_fields__.items():
+            if not definition.init:
+                continue
+            if name in meta:
+                fields[name] = tuple(meta[name]) if isinstance(meta[name], list) else meta[name]
+            else:
+                fields[name] = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+        return cls(**fields)
+
+    @property
+    def num_products(self):
+        return len(self.product_names)
+
+    @property
+    def num_types(self):
+        return len(self.station_types)
+
+    def successors(self, i):
+        """Returns the task indices succeeding the task with index i."""
+        return self.successor_indices[self.successor_indptr[i]:self.successor_indptr[i + 1]]
+
+    def predecessors(self, i):
+        """Returns the task indices preceding the task with index i."""
+        return self.predecessor_indices[self.predecessor_indptr[i]:self.predecessor_indptr[i + 1]]
+
+    @cached_property
+    def precedence_graph(self):
+        """
+        The preprocessed precedence relations with topological order, transitive reduction and
+        reachability bitsets, computed on first access and shared by the validation, the
+        heuristics and the model builder.
+
+        Raises:
+            PrecedenceCycleError: If the precedence relations contain a cycle.
+        """
+        return PrecedenceGraph.from_csr(self.tasks, self.successor_indptr, self.successor_indices)
+
+    def compatibility_masks(self):
+        """Returns one integer per task with bit k set if the task is compatible with station type k."""
+        return [int(mask) for mask in self.compatibility @ (1 << np.arange(self.num_types, dtype=np.int64))]
+
+    # Dict style accessors
+
+    @property
+    def task_time_dict(self):
+        return _MatrixView(self.task_times, self.tasks.tolist(), self.product_names)
+
+    @property
+    def stationtype_compatibility(self):
+        return _MatrixView(self.compatibility.view(np.uint8), self.tasks.tolist(), self.station_types)
+
+    @property
+    def cycle_time_dict(self):
+        return dict(zip(self.product_names, self.cycle_times.tolist()))
+
+    @property
+    def station_cost_dict(self):
+        return dict(zip(self.station_types, self.station_costs.tolist()))
+
+    @property
+    def precedence_relations(self):
+        sources = np.repeat(self.tasks, np.diff(self.successor_indptr))
+        return list(zip(sources.tolist(), self.tasks[self.successor_indices].tolist()))
+
+    def __getitem__(self, key):
+        if key == "cycle_time_dict":
+            return self.cycle_time_dict
+        if key == "station_costs":
+            return self.station_cost_dict
+        if key in ("solver", "num_tasks", "task_time_dict", "stationtype_compatibility", "precedence_relations"):
+            return getattr(self, key)
+        if key == "tasks":
+            return self.tasks.tolist()
+        if key in ("product_names", "station_types"):
+            return list(getattr(self, key))
+        if key == "incompatible_tasks":
+            return self._task_pairs(self.incompatible_pairs)
+        if key == "compatible_tasks":
+            return self._task_pairs(self.same_station_pairs)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.DATA_INPUT_KEYS
+
+    def keys(self):
+        return list(self.DATA_INPUT_KEYS)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def to_data_input(self):
+        """
+        Returns the instance as plain dict, as returned by `read_data.read_input_from_excel`.
+        """
+        data_input = {key: self[key] for key in self.DATA_INPUT_KEYS}
+        data_input["task_time_dict"] = dict(data_input["task_time_dict"])
+        data_input["stationtype_compatibility"] = dict(data_input["stationtype_compatibility"])
+        return data_input
+
+    def _task_pairs(self, pairs):
+        return [tuple(pair) for pair in self.tasks[pairs].tolist()]
+
+
+class _MatrixView(Mapping):
+    # Read-only mapping from (row_label, column_label) to the matrix entry
+    def __init__(self, matrix, row_labels, column_labels):
+        self._matrix = matrix
+        self._row_labels = row_labels
+        self._column_labels = column_labels
+        self._rows = {label: i for i, label in enumerate(row_labels)}
+        self._columns = {label: k for k, label in enumerate(column_labels)}
+
+    def __getitem__(self, key):
+        row, column = key
+        return self._matrix[self._rows[row], self._columns[column]].item()
+
+    def __iter__(self):
+        return ((row, column) for row in self._row_labels for column in self._column_labels)
+
+    def __len__(self):
+        return self._matrix.size
+
+    def __contains__(self, key):
+        try:
+            row, column = key
+        except (TypeError, ValueError):
+            return False
+        return row in self._rows and column in self._columns
+
+
+def _csr(sources, targets, size):
+    order = np.argsort(sources, kind="stable")
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=size), out=indptr[1:])
+    return indptr, targets[order].astype(np.int64)
@@ -1,24 +1,55 @@
 import logging
 
 import read_data
+import read_salbp
+import write_assignments
 import utils.validate_input as validator
+from utils import profiling
 
+from instance import Instance
 from model_with_stationtypes import OptimizationModel
+from decomposition_solver import SolverDecomposition
+from portfolio_solver import SolverPortfolio
 from highs_solver import SolverHiGHS
 from scip_solver import SolverSCIP
 from utils.graph_utils import validate_graph, visualize_graph
 
 
 INPUT_DATA_PATH = "data/input.xlsx"
+# Cycle time used for .IN2 benchmark files, None uses the largest task time
+IN2_CYCLE_TIME = None
 MPS_FILE_PATH = "result_data/alb_model.mps"
+# "portfolio" races all available solvers, "decomposition" solves sub-lines in parallel (see
+# `decomposition_solver.SolverDecomposition`), any other name is passed to Pyomo's SolverFactory
+SOLVER = "portfolio"
+TIME_LIMIT = 120
 NUMBER_OF_SOLUTIONS = 1
+# Phase profiling options, e.g. "time", "time,memory" or "cprofile" (see `utils.profiling.OPTIONS`),
+# None reads them from the ALB_PROFILE environment variable
+PROFILE = None
+# JSON file for the phase timings, only written if profiling is enabled
+PROFILE_FILE_PATH = None
 
 def main():
     # Sets the log level to DEBUG to display all logs from DEBUG level and above.
     logging.basicConfig(level=logging.DEBUG)
 
-    # Tries to read input data from the INPUT_DATA_PATH Excel file.
-    data_input = read_data.read_input_from_excel(INPUT_DATA_PATH)
+    # Times the phases of the run, a disabled profiler costs next to nothing
+    profiler = profiling.configure(PROFILE)
+    try:
+        _run()
+    finally:
+        profiler.summary()
+        if profiler.enabled and PROFILE_FILE_PATH is not None:
+            profiler.export(PROFILE_FILE_PATH)
+
+def _run():
+    # Tries to read input data from the INPUT_DATA_PATH Excel or SALBP benchmark (.IN2) file.
+    with profiling.phase("read"):
+        if INPUT_DATA_PATH.lower().endswith(".in2"):
+            data_input = read_salbp.read_input_from_in2(INPUT_DATA_PATH, cycle_time=IN2_CYCLE_TIME)
+        else:
+            data_input = read_data.read_instance(INPUT_DATA_PATH)
 
     precedence_relations = data_input["precedence_relations"]
     num_tasks = data_input["num_tasks"]
@@ -34,39 +65,77 @@ def main():
 
     print(f"Cycle time dict: {cycle_time_dict}")
 
-    # Checks if precedence_relations is valid, e.g. if it contains a cycle
-    print("Precedence relations validation: ", end="")
-    validate_graph(precedence_relations)
+    with profiling.phase("validate"):
+        # Checks if precedence_relations is valid, e.g. if it contains a cycle
+        print("Precedence relations validation: ", end="")
+        validate_graph(precedence_relations)
 
-    # validator.validate_input(task_time_dict, compatible_tasks, incompatible_tasks, precedence_relations, cycle_time)
+        # Preprocessed once and shared by the validation, the heuristics and the model builder
+        precedence_graph = Instance.from_data_input(data_input).precedence_graph
+
+        # Checks the same-station groups against incompatibilities, precedence relations and cycle times
+        print("Input validation: ", end="")
+        if not validator.validate_input(tasks, product_names, task_time_dict, cycle_time_dict, compatible_tasks,
+                                        incompatible_tasks, precedence_relations, precedence_graph):
+            raise ValueError("Input data is inconsistent.")
+        print("Passed.")
 
     # Visualizes the precedence relations as a graph
-    visualize_graph(precedence_relations)
+    with profiling.phase("visualize"):
+        visualize_graph(precedence_relations)
+
+    if SOLVER == "portfolio":
+        # Races the available solvers in parallel processes, each builds its own model
+        print("Solution 1: ")
+        with profiling.phase("portfolio"):
+            SolverPortfolio(time_limit=TIME_LIMIT).solve(data_input)
+        return
+
+    if SOLVER == "decomposition":
+        print("Solution 1: ")
+        with profiling.phase("decomposition"):
+            SolverDecomposition(time_limit=TIME_LIMIT).solve(data_input)
+        return
 
     # Builds the model
     model = OptimizationModel()
     
-    model.build_model(cycle_time_dict, tasks, station_types, product_names, task_time_dict, precedence_relations,
-                      incompatible_tasks, compatible_tasks, stationtype_compatibility, station_costs)
+    with profiling.phase("build"):
+        model.build_model(cycle_time_dict, tasks, station_types, product_names, task_time_dict, precedence_relations,
+                          incompatible_tasks, compatible_tasks, stationtype_compatibility, station_costs,
+                          prune_stations=True, heuristic_start=True, presolve=True,
+                          precedence_graph=precedence_graph)
+    if NUMBER_OF_SOLUTIONS > 1:
+        solutions = model.find_solutions(SOLVER, NUMBER_OF_SOLUTIONS, time_limit=TIME_LIMIT)
+        for number, (cost, station_results) in enumerate(solutions, start=1):
+            print(f"Solution {number} with costs {cost}: ")
+            write_assignments.print_station_results(station_results)
+        return
+
     print("Solution 1: ")
-    model.execute_solver("gurobi")
+    model.execute_solver(SOLVER, time_limit=TIME_LIMIT)
 
     """
-    model.export_model(MPS_FILE_PATH)
-    
     if solver == "HiGHS":
         # Initialize the solver
         highs_solver = SolverHiGHS(num_tasks, precedence_relations)
+        highs_solver.unit_members = model.unit_members
 
-        # Solve the model with HiGHS
-        highs_solver.solve(MPS_FILE_PATH)
+        # Solve the model with HiGHS, the model is passed in memory without an MPS file
+        highs_solver.solve_model(model.model)
+
+        # Optionally keeps the model as MPS file for debugging
+        # model.export_model(MPS_FILE_PATH)
 
     elif solver == "SCIP":
+        model.export_model(MPS_FILE_PATH)
+
         # Initialize the solver
         scip_solver = SolverSCIP(num_tasks, precedence_relations)
+        scip_solver.unit_members = model.unit_members
 
         # Solve the model with SCIP
-        scip_solver.solve(MPS_FILE_PATH)
+        scip_solver.solve(MPS_FILE_PATH, model.column_map)
 
     else:
         raise ValueError(f"Solver '{solver}' is not supported.")
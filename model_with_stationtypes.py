@@ -1,14 +1,78 @@
 import logging
+import time
 from pyomo.environ import *
 from pyomo.opt import SolverFactory
+from pyomo.solvers.plugins.solvers.persistent_solver import PersistentSolver
+
+import write_assignments
+
+from utils import profiling
+from utils.bounds import cost_lower_bound, relative_gap
+from utils.heuristics import ranked_positional_weight, solution_cost
+from utils.precedence_graph import PrecedenceGraph
+from utils.presolve import exceeds_cycle_time, presolve_instance
+from utils.solution_decoding import column_map_from_symbol_map
+from utils.station_windows import compute_station_windows
+
+logger = logging.getLogger(__name__)
+
+# Relative MIP gap at which the solvers stop
+MIP_GAP = 0.05
+
+# Names of the time limit and relative MIP gap options per solver family
+SOLVER_OPTION_NAMES = {
+    "gurobi": ("TimeLimit", "MIPGap"),
+    "highs": ("time_limit", "mip_rel_gap"),
+    "cplex": ("timelimit", "mipgap"),
+    "cbc": ("seconds", "ratioGap"),
+    "glpk": ("tmlim", "mipgap"),
+    "scip": ("limits/time", "limits/gap"),
+}
+
+# Formulations of the station assignment, see `OptimizationModel.build_model`
+FORMULATIONS = ("assignment", "cumulative")
 
 class OptimizationModel:
     def __init__(self):
         logging.getLogger('pyomo').setLevel(logging.WARNING)
         self.model = None
+        self.initial_solution = None
+        # Wall times of the last build, export, solve and decode in seconds and the solver statistics
+        self.timings = {}
+        self.statistics = {}
+        # Maps the column names of the last exported file to (component name, index)
+        self.column_map = None
+        # Maps each super-task of the presolve to its tasks, and the numbers of removed pairs, rows and variables
+        self.unit_members = {}
+        self.presolve_report = None
+        self._unit_of = {}
+        # Incompatible pairs the presolve dropped as unable to share a station with the data of the build
+        self._dropped_incompatible = []
+        # Lower bound on the line costs from `utils.bounds`, None if unknown
+        self.lower_bound = None
+        # True if the heuristic solution reaches the lower bound, so no solver has to run
+        self._heuristic_optimal = False
+        # Solver objects by name, so persistent solvers keep the model loaded between solves
+        self._solvers = {}
+        # True once a solution has been loaded into the variables, which then serve as warm start
+        self._has_incumbent = False
+        # True if the station windows or the symmetry breaking depend on the data of the build
+        self._data_dependent_bounds = False
+        # True if symmetry breaking excluded station types interchangeable with another type
+        self._duplicate_types = False
+        self._formulation = "assignment"
+        # Arguments of the last build with the what-if changes applied, so the model can be rebuilt,
+        # e.g. without the station bound
+        self._build_args = None
+        # True if the cost of the heuristic solution reduced the number of stations
+        self._station_bound_active = False
+        # True if a what-if change invalidated the station bound, which is re-derived before the next solve
+        self._rebuild_pending = False
 
     def build_model(self, cycle_time_dict, tasks, station_types, products, task_time_dict, precedence_relations,
-                    incompatible_tasks, same_station_pairs, stationtype_compatibility, station_costs):
+                    incompatible_tasks, same_station_pairs, stationtype_compatibility, station_costs,
+                    prune_stations=False, heuristic_start=False, symmetry_breaking=False, presolve=False,
+                    formulation="assignment", initial_solution=None, station_bound=True, precedence_graph=None):
         """
         Parameters: 
         ----------
@@ -40,12 +104,139 @@ class OptimizationModel:
             A dictionary where:
             - The key is a station type (string)
             - The value is the fixed cost (integer) of opening a station of that type
+        prune_stations: bool
+            If True, each task only gets variables and constraints for the stations between its
+            earliest and latest feasible station, derived from the processing times of its
+            predecessors and successors. Otherwise every task may be assigned to every station.
+        heuristic_start: bool
+            If True, a ranked positional weight heuristic builds a feasible line first. Its cost
+            bounds the number of stations of the model and its solution is passed to the solver
+            as a MIP start.
+        symmetry_breaking: bool
+            If True, open stations are numbered contiguously from 1, each open station holds a task,
+            the first station holds a task without predecessors, and of several station types with
+            equal costs and compatibilities only the first one is used.
+        presolve: bool
+            If True, tasks which must share a station are merged into super-tasks, implied precedence
+            relations are dropped and incompatible pairs which can't share a station anyway are
+            dropped before the model is built (see `utils.presolve.presolve_instance`).
+        formulation: str
+            "assignment" links the stations of two tasks by one precedence row sum(j * x[g,j]) <=
+            sum(j * x[h,j]), whose LP relaxation is weak. "cumulative" adds the variables w[i,j] = 1 if
+            task i is assigned to station j or an earlier one, and one precedence row w[h,j] <= w[g,j]
+            per station, which gives tighter LP bounds at the cost of more rows.
+        initial_solution: dict
+            A feasible line in the format of the results, e.g. of a scenario with shorter cycle times,
+            passed to the solver as MIP start. With heuristic_start, the cheaper of it and the
+            heuristic solution is used.
+        station_bound: bool
+            If False, the heuristic or initial solution is only used as MIP start and doesn't bound
+            the number of stations, so lines costing more than it remain feasible.
+        precedence_graph: PrecedenceGraph
+            The preprocessed precedence relations over `tasks` in the same order, e.g.
+            `Instance.precedence_graph`. Built from `precedence_relations` if None.
         """
+        if formulation not in FORMULATIONS:
+            raise ValueError(f"Unknown formulation '{formulation}', expected one of {FORMULATIONS}.")
+        start = time.perf_counter()
+        # Copies, the what-if changes update them
+        self._build_args = {
+            "cycle_time_dict": dict(cycle_time_dict), "tasks": tasks, "station_types": station_types,
+            "products": products, "task_time_dict": dict(task_time_dict),
+            "precedence_relations": list(precedence_relations), "incompatible_tasks": list(incompatible_tasks),
+            "same_station_pairs": list(same_station_pairs), "stationtype_compatibility": stationtype_compatibility,
+            "station_costs": dict(station_costs),
+            "prune_stations": prune_stations, "heuristic_start": heuristic_start,
+            "symmetry_breaking": symmetry_breaking, "presolve": presolve, "formulation": formulation,
+            "initial_solution": initial_solution, "station_bound": station_bound,
+            "precedence_graph": precedence_graph,
+        }
+
         # Define the model
         model = ConcreteModel()
 
+        # Topological order, reachability and transitive reduction of the precedence relations
+        if precedence_graph is None:
+            precedence_graph = PrecedenceGraph.from_pairs(tasks, precedence_relations)
+        elif precedence_graph.tasks.tolist() != list(tasks):
+            raise ValueError("The precedence graph must be built over the tasks in the same order.")
+
         # Define upper bound for number of stations
         max_stations = len(tasks)
+        self.initial_solution = None
+
+        if heuristic_start:
+            self.initial_solution = ranked_positional_weight(
+                tasks, products, station_types, task_time_dict, cycle_time_dict, precedence_relations,
+                incompatible_tasks, same_station_pairs, stationtype_compatibility, station_costs,
+                precedence_graph=precedence_graph)
+
+        if initial_solution is not None:
+            # Stations are renumbered from 1 in line order, so the solution fits the station windows
+            initial_solution = {
+                j: dict(info) for j, (_, info) in enumerate(sorted(initial_solution.items()), start=1)
+            }
+            if self.initial_solution is None or solution_cost(initial_solution, station_costs) \
+                    < solution_cost(self.initial_solution, station_costs):
+                self.initial_solution = initial_solution
+
+        if self.initial_solution is not None and station_bound:
+            # A line with more stations than this can't be cheaper than the initial solution
+            min_station_cost = min(station_costs.values())
+            if min_station_cost > 0:
+                cost_bound = int(solution_cost(self.initial_solution, station_costs) // min_station_cost)
+                max_stations = max(len(self.initial_solution), min(max_stations, cost_bound))
+        self._station_bound_active = max_stations < len(tasks)
+
+        self.lower_bound = cost_lower_bound(tasks, products, station_types, task_time_dict, cycle_time_dict,
+                                            stationtype_compatibility, station_costs)
+        print(f"Lower bound on the line costs: {self.lower_bound:g}")
+        self._heuristic_optimal = self.initial_solution is not None \
+            and solution_cost(self.initial_solution, station_costs) <= self.lower_bound + 1e-6
+
+        # Station types interchangeable with an earlier type aren't used with symmetry breaking
+        representative_types = _representative_station_types(station_types, tasks, stationtype_compatibility,
+                                                              station_costs) if symmetry_breaking else {}
+        if representative_types and self.initial_solution is not None:
+            for info in self.initial_solution.values():
+                info["station_type"] = representative_types.get(info["station_type"], info["station_type"])
+
+        # Stations each task may be assigned to
+        if prune_stations:
+            windows = compute_station_windows(tasks, products, task_time_dict, cycle_time_dict,
+                                              precedence_relations, same_station_pairs, max_stations,
+                                              precedence_graph=precedence_graph)
+        else:
+            windows = {i: (1, max_stations) for i in tasks}
+
+        # The model is built over the super-tasks of the presolve, which `unit_members` maps back to the tasks
+        self.unit_members = {}
+        self.presolve_report = None
+        self._dropped_incompatible = []
+        if presolve:
+            presolved = presolve_instance(tasks, products, task_time_dict, cycle_time_dict, precedence_relations,
+                                          incompatible_tasks, same_station_pairs, stationtype_compatibility, windows,
+                                          precedence_graph=precedence_graph)
+            tasks = presolved["tasks"]
+            task_time_dict = presolved["task_time_dict"]
+            stationtype_compatibility = presolved["stationtype_compatibility"]
+            precedence_relations = presolved["precedence_relations"]
+            incompatible_tasks = presolved["incompatible_tasks"]
+            same_station_pairs = []
+            windows = presolved["windows"]
+            self.unit_members = presolved["members"]
+            self.presolve_report = presolved["report"]
+            self._dropped_incompatible = presolved["dropped_incompatible"]
+            print("Presolve merged {merged_tasks} tasks into super-tasks and removed {removed_precedence_pairs} "
+                  "precedence pairs and {removed_incompatible_pairs} incompatible pairs "
+                  "({removed_rows} rows, {removed_variables} variables).".format(**self.presolve_report))
+        self._unit_of = {task: unit for unit, members in self.unit_members.items() for task in members}
+
+        stations_of_task = {i: range(windows[i][0], windows[i][1] + 1) for i in tasks}
+        tasks_of_station = {j: [] for j in range(1, max_stations + 1)}
+        for i in tasks:
+            for j in stations_of_task[i]:
+                tasks_of_station[j].append(i)
 
         # Sets
         model.TASKS = Set(initialize=tasks)
@@ -55,18 +246,30 @@ class OptimizationModel:
         model.PrecedencePairs = Set(initialize=precedence_relations, within=model.TASKS * model.TASKS)
         model.IncompatiblePairs = Set(initialize=incompatible_tasks, within=model.TASKS * model.TASKS)
         model.SameStationPairs = Set(initialize=same_station_pairs, within=model.TASKS * model.TASKS)
+        model.TaskStations = Set(dimen=2, initialize=[(i, j) for i in tasks for j in stations_of_task[i]])
+        model.IncompatibleStations = Set(dimen=3, initialize=[
+            (d, f, j) for d, f in incompatible_tasks for j in stations_of_task[d] if j in stations_of_task[f]
+        ])
+        model.SameStationStations = Set(dimen=3, initialize=[
+            (m, n, j) for m, n in same_station_pairs for j in stations_of_task[m]
+        ])
+        if formulation == "cumulative":
+            model.PrecedenceStations = Set(dimen=3, initialize=[
+                (g, h, j) for g, h in precedence_relations for j in _precedence_stations(stations_of_task, g, h)
+            ])
 
         # Parameters
-        model.c = Param(model.PRODUCTS, initialize=cycle_time_dict) # Cycle time
-        model.t = Param(model.TASKS, model.PRODUCTS, initialize=task_time_dict) # Processing time of a task 
+        # c, t and C are mutable, so what-if changes can update them in place (see `set_cycle_time`)
+        model.c = Param(model.PRODUCTS, initialize=cycle_time_dict, mutable=True) # Cycle time
+        model.t = Param(model.TASKS, model.PRODUCTS, initialize=task_time_dict, mutable=True) # Processing time of a task 
         model.F = Param(model.TASKS, model.TYPES, initialize=stationtype_compatibility, within=Binary)
-        model.C = Param(model.TYPES, initialize=station_costs) # Cost for opening a station
+        model.C = Param(model.TYPES, initialize=station_costs, mutable=True) # Cost for opening a station
 
         # Decision Variables
-        model.x = Var(model.TASKS, model.STATIONS, within=Binary)  # Task assignment
+        model.x = Var(model.TaskStations, within=Binary)  # Task assignment
         model.z = Var(model.STATIONS, within=Binary)  # Station open/close
         model.y = Var(model.STATIONS, model.TYPES, within=Binary)  # Station type assignment
-        model.task_order = Var(model.TASKS, model.STATIONS, within=NonNegativeIntegers)
+        model.task_order = Var(model.TaskStations, within=NonNegativeIntegers)
 
 
         # Objective function
@@ -78,23 +281,50 @@ class OptimizationModel:
 
         # Task Assignment: Each task is assigned to exactly one station
         def task_assignment_rule(model, i):
-            return sum(model.x[i, j] for j in model.STATIONS) == 1
+            return sum(model.x[i, j] for j in stations_of_task[i]) == 1
         model.task_assignment = Constraint(model.TASKS, rule=task_assignment_rule)
 
         # Open Stations: Tasks can only be assigned to open stations
         def open_station_rule(model, i, j):
             return model.x[i, j] <= model.z[j]
-        model.open_station = Constraint(model.TASKS, model.STATIONS, rule=open_station_rule)
+        model.open_station = Constraint(model.TaskStations, rule=open_station_rule)
 
         # Cycle Time Constraint
         def cycle_time_rule(model, j, p):
-            return sum(model.t[i, p] * model.x[i, j] for i in model.TASKS) <= model.c[p] * model.z[j]
+            if not tasks_of_station[j]:
+                return Constraint.Skip
+            return sum(model.t[i, p] * model.x[i, j] for i in tasks_of_station[j]) <= model.c[p] * model.z[j]
         model.cycle_time = Constraint(model.STATIONS, model.PRODUCTS, rule=cycle_time_rule)
 
         # Precedence Relations
-        def precedence_rule(model, g, h):
-            return sum(j * model.x[g, j] for j in model.STATIONS) <= sum(j * model.x[h, j] for j in model.STATIONS)
-        model.precedence = Constraint(model.PrecedencePairs, rule=precedence_rule)
+        if formulation == "cumulative":
+            # w[i, j] is 1 if task i is assigned to station j or an earlier one
+            model.w = Var(model.TaskStations, within=Binary)
+
+            def cumulative_assignment_rule(model, i, j):
+                previous = model.w[i, j - 1] if j > stations_of_task[i].start else 0
+                return model.w[i, j] == previous + model.x[i, j]
+            model.cumulative_assignment = Constraint(model.TaskStations, rule=cumulative_assignment_rule)
+
+            def cumulative(i, j):
+                # w[i, j] is 0 before and 1 after the station window of task i
+                if j < stations_of_task[i].start:
+                    return 0
+                if j >= stations_of_task[i].stop - 1:
+                    return 1
+                return model.w[i, j]
+
+            # If task h is assigned to station j or an earlier one, so is task g
+            def precedence_rule(model, g, h, j):
+                if isinstance(cumulative(g, j), int) and isinstance(cumulative(h, j), int):
+                    return Constraint.Feasible if cumulative(h, j) <= cumulative(g, j) else Constraint.Infeasible
+                return cumulative(h, j) <= cumulative(g, j)
+            model.precedence = Constraint(model.PrecedenceStations, rule=precedence_rule)
+        else:
+            def precedence_rule(model, g, h):
+                return sum(j * model.x[g, j] for j in stations_of_task[g]) \
+                    <= sum(j * model.x[h, j] for j in stations_of_task[h])
+            model.precedence = Constraint(model.PrecedencePairs, rule=precedence_rule)
 
         # Station Type Assignment: Each station has exactly one type
         def station_type_rule(model, j):
@@ -104,61 +334,321 @@ class OptimizationModel:
         # Station Type Compatibility
         def station_compatibility_rule(model, i, j):
             return model.x[i, j] <= sum(model.F[i, k] * model.y[j, k] for k in model.TYPES)
-        model.station_compatibility = Constraint(model.TASKS, model.STATIONS, rule=station_compatibility_rule)
+        model.station_compatibility = Constraint(model.TaskStations, rule=station_compatibility_rule)
         
         # Incompatible Tasks
         def incompatible_tasks_rule(model, d, f, j):
             return model.x[d, j] + model.x[f, j] <= 1
-        model.incompatible_tasks = Constraint(model.IncompatiblePairs, model.STATIONS, rule=incompatible_tasks_rule)
+        model.incompatible_tasks = Constraint(model.IncompatibleStations, rule=incompatible_tasks_rule)
 
         # Same Station Tasks
         def same_station_tasks_rule(model, m, n, j):
             return model.x[m, j] == model.x[n, j]
-        model.same_station_tasks = Constraint(model.SameStationPairs, model.STATIONS, rule=same_station_tasks_rule)
+        model.same_station_tasks = Constraint(model.SameStationStations, rule=same_station_tasks_rule)
 
+        # Precedence Within Station: task_order[i, j] is zero unless x[i, j] = 1 (see task_order_assignment),
+        # so the sum over the stations equals the bilinear sum of x[i, j] * task_order[i, j] and the model stays linear
         def precedence_within_station_rule(model, g, h):
-            return sum(model.x[g, j] * model.task_order[g, j] for j in model.STATIONS) \
-                <= sum(model.x[h, j] * model.task_order[h, j] for j in model.STATIONS) - 1
+            return sum(model.task_order[g, j] for j in stations_of_task[g]) \
+                <= sum(model.task_order[h, j] for j in stations_of_task[h]) - 1
         model.precedence_within_station = Constraint(model.PrecedencePairs, rule=precedence_within_station_rule)
 
         def task_order_assignment_rule(model, i, j):
-            return model.task_order[i, j] <= max_stations * model.x[i, j]
-        model.task_order_assignment = Constraint(model.TASKS, model.STATIONS, rule=task_order_assignment_rule)
+            return model.task_order[i, j] <= len(tasks) * model.x[i, j]
+        model.task_order_assignment = Constraint(model.TaskStations, rule=task_order_assignment_rule)
+
+        if symmetry_breaking:
+            # Open stations are contiguous, so the empty stations are always the last ones
+            def contiguous_stations_rule(model, j):
+                if j == max_stations:
+                    return Constraint.Skip
+                return model.z[j] >= model.z[j + 1]
+            model.contiguous_stations = Constraint(model.STATIONS, rule=contiguous_stations_rule)
+
+            # Open stations aren't empty
+            def nonempty_station_rule(model, j):
+                return model.z[j] <= sum(model.x[i, j] for i in tasks_of_station[j])
+            model.nonempty_station = Constraint(model.STATIONS, rule=nonempty_station_rule)
+
+            # All predecessors of a task on station 1 are on station 1 too, so it holds a task without predecessors
+            successor_tasks = {h for _, h in precedence_relations}
+            first_tasks = [i for i in tasks if i not in successor_tasks and 1 in stations_of_task[i]]
+            if first_tasks:
+                model.first_station = Constraint(expr=sum(model.x[i, 1] for i in first_tasks) >= model.z[1])
+
+            # Interchangeable station types
+            model.DuplicateTypes = Set(initialize=list(representative_types))
+            def duplicate_type_rule(model, j, k):
+                return model.y[j, k] == 0
+            model.duplicate_type = Constraint(model.STATIONS, model.DuplicateTypes, rule=duplicate_type_rule)
+
+        # Extra rows of pairs added by what-if changes after the build
+        model.extra_pair_rows = ConstraintList()
 
         self.model = model
+        self._stations_of_task = stations_of_task
+        self._formulation = formulation
+        # Rules of the rows belonging to a pair of tasks, reused by what-if changes
+        self._pair_rules = {
+            "precedence": (precedence_rule, precedence_within_station_rule),
+            "incompatible": (incompatible_tasks_rule,),
+        }
+        self._pair_rows = {}
+        self._solvers = {}
+        self._has_incumbent = False
+        self._rebuild_pending = False
+        self._data_dependent_bounds = prune_stations or symmetry_breaking
+        self._duplicate_types = bool(representative_types)
+
+        if self.initial_solution is not None:
+            self._set_initial_values(self.initial_solution)
+
+        self.timings["build"] = time.perf_counter() - start
+
+    def _set_initial_values(self, station_results):
+        # Loads a line layout into the variables so it can be used as MIP start
+        model = self.model
+        for var in (model.x, model.z, model.y, model.task_order):
+            for index in var:
+                var[index].set_value(0)
+
+        order = 1
+        station_of_task = {}
+        for j, info in station_results.items():
+            model.z[j].set_value(1)
+            model.y[j, info["station_type"]].set_value(1)
+            for i in info["assigned_tasks"]:
+                # Super-tasks are named after one of their tasks
+                if self._unit_of.get(i, i) != i:
+                    continue
+                if (i, j) not in model.TaskStations:
+                    raise ValueError(f"Initial solution assigns task {i} outside of its station window.")
+                model.x[i, j].set_value(1)
+                model.task_order[i, j].set_value(order)
+                station_of_task[i] = j
+                order += 1
+
+        if self._formulation == "cumulative":
+            for i, j in model.TaskStations:
+                model.w[i, j].set_value(int(station_of_task[i] <= j))
 
     def export_model(self, file_path):
         # Write the model to a mps file
         if self.model is not None:
-            self.model.write(file_path)
+            start = time.perf_counter()
+            # Symbolic labels keep the variable names in the file, so solutions can be decoded by name
+            with profiling.phase("export"):
+                _, symbol_map_id = self.model.write(file_path, io_options={"symbolic_solver_labels": True})
+            self.column_map = column_map_from_symbol_map(self.model.solutions.symbol_map[symbol_map_id])
+            self.timings["export"] = time.perf_counter() - start
             print("Model exported successfully.")
         else:
             raise ValueError("Model shouldn't be None.")
         
-    def execute_solver(self, solver_name):
+    def execute_solver(self, solver_name, time_limit=120, progress=None):
+        """
+        Solves the model and returns the line layout, or None if no solution was found. `statistics`
+        is left empty if the solver isn't available.
+
+        If `progress` is a `utils.progress.ProgressLog`, it receives the incumbents, bounds and node
+        counts of the solve through the callbacks of the persistent Gurobi interfaces "appsi_gurobi"
+        and "gurobi_persistent". For other solvers it only receives the final result.
+        """
+        if progress is not None:
+            progress.clear()
+        self._rebuild_if_pending()
+        if self._heuristic_optimal:
+            print("The heuristic solution reaches the lower bound, so it is optimal.")
+            self.statistics = {
+                "status": "optimal",
+                "num_variables": self.model.nvariables(),
+                "num_constraints": self.model.nconstraints(),
+                "objective": value(self.model.objective),
+                "gap": 0.0,
+                "lower_bound": self.lower_bound,
+            }
+            if progress is not None:
+                progress.record(0.0, self.statistics["objective"], self.lower_bound, 0, "final")
+            write_assignments.print_station_results(self.initial_solution)
+            return self.initial_solution
+
         # Solve the model
-        solver = SolverFactory(solver_name)
-        if not solver.available():
+        solver = self._get_solver(solver_name)
+        if not solver.available(exception_flag=False):
             print(f"{solver_name} solver is not available!")
+            self.statistics = {}
         else:
             print(f"Using {solver_name} to solve the model.")
+            return self._solve(solver, solver_name, time_limit, progress)
+
+    def find_solutions(self, solver_name, number_of_solutions, time_limit=120):
+        """
+        Finds up to `number_of_solutions` distinct line layouts, cheapest first.
+
+        Gurobi collects the layouts in its solution pool within a single solve. Other solvers
+        re-solve the same model, each time with a sparse no-good cut excluding the previous task
+        assignment (see `add_constraint`). The cuts are removed again afterwards.
+
+        A model built with a station bound from the heuristic solution excludes every layout costing
+        more than that solution, so it is rebuilt without the bound first.
+
+        Args:
+            solver_name (str): Name of the solver for Pyomo's SolverFactory.
+            number_of_solutions (int): Maximum number of layouts.
+            time_limit (float): Time limit of each solve in seconds.
+
+        Returns:
+            list of tuple: (cost, station_results) per layout, ordered by cost.
+        """
+        self._rebuild_if_pending()
+        if self._station_bound_active:
+            print("Rebuilding the model without the station bound of the heuristic solution, which excludes "
+                  "layouts costing more than it.")
+            self.build_model(**{**self._build_args, "station_bound": False})
+
+        if solver_name in ("gurobi", "gurobi_persistent") \
+                and SolverFactory("gurobi_persistent").available(exception_flag=False):
+            return self._solution_pool(number_of_solutions, time_limit)
+
+        solver = self._get_solver(solver_name)
+        if not solver.available(exception_flag=False):
+            print(f"{solver_name} solver is not available!")
+            return []
+
+        print(f"Using {solver_name} to enumerate {number_of_solutions} solutions.")
+        solutions = []
+        layouts = set()
+        try:
+            while len(solutions) < number_of_solutions:
+                station_results = self._solve(solver, solver_name, time_limit)
+                if station_results is None:
+                    break
+                layout = _layout_key(station_results)
+                if layout not in layouts:
+                    layouts.add(layout)
+                    solutions.append((value(self.model.objective), station_results))
+                self.add_constraint()
+        finally:
+            if hasattr(self.model, 'NoGoodCuts'):
+                self.model.del_component(self.model.NoGoodCuts)
+
+        return sorted(solutions, key=lambda solution: solution[0])
+
+    def _get_solver(self, solver_name):
+        # The appsi solvers, e.g. "appsi_gurobi" or "appsi_highs", keep the model loaded and only
+        # apply the changes made since the last solve
+        if solver_name not in self._solvers:
+            self._solvers[solver_name] = SolverFactory(solver_name)
+        return self._solvers[solver_name]
+
+    def _solve(self, solver, solver_name, time_limit, progress=None):
+        family = next((family for family in SOLVER_OPTION_NAMES if family in solver_name), None)
+        if isinstance(solver, PersistentSolver):
+            # Unlike the appsi solvers, these interfaces need the model loaded before the solve and don't
+            # pick up changed parameters or (de)activated rows, so it is loaded again every time
+            solver.set_instance(self.model)
+        if family == "gurobi" and hasattr(solver, "set_callback"):
+            # Cached persistent solvers would otherwise keep the callback of an earlier solve
+            solver.set_callback(_gurobi_progress_callback(progress) if progress is not None else None)
+        elif progress is not None:
+            print(f"{solver_name} offers no callbacks, only the final result is recorded.")
+        if family == "gurobi":
             solver.options['Heuristics'] = 1.0
             solver.options['MIPFocus'] = 2
-            solver.options['TimeLimit'] = 120
-            solver.options['MIPGap'] = 0.05
-            results = solver.solve(self.model, tee=True)
-            self._write_results()
+            if self.lower_bound is not None:
+                # Stops as soon as an incumbent reaches the lower bound
+                solver.options['BestObjStop'] = self.lower_bound + 1e-6
+        if family is not None:
+            time_limit_option, gap_option = SOLVER_OPTION_NAMES[family]
+            solver.options[time_limit_option] = int(time_limit) if family == "glpk" else time_limit
+            solver.options[gap_option] = MIP_GAP
+        solve_options = {}
+        # The previous incumbent, or else the heuristic solution, is the MIP start
+        warm_start_capable = getattr(solver, "warm_start_capable", lambda: True)()
+        if (self._has_incumbent or self.initial_solution is not None) and warm_start_capable:
+            solve_options['warmstart'] = True
+        start = time.perf_counter()
+        with profiling.phase("solve"):
+            results = solver.solve(self.model, tee=True, load_solutions=False, **solve_options)
+        self.timings["solve"] = time.perf_counter() - start
+
+        # Without a solution the variables would keep the values of the previous solve
+        if len(results.solution) == 0:
+            print(f"No solution found ({results.solver.termination_condition}).")
+            self.statistics = self._solver_statistics(results)
+            self.statistics["objective"] = None
+            if progress is not None:
+                progress.record(self.timings["solve"], None, self.statistics["lower_bound"], None, "final")
+            return None
+        self.model.solutions.load_from(results)
+        self._has_incumbent = True
+        self.statistics = self._solver_statistics(results)
+        if progress is not None:
+            progress.record(self.timings["solve"], self.statistics["objective"], self.statistics["lower_bound"],
+                            None, "final")
+
+        start = time.perf_counter()
+        with profiling.phase("decode"):
+            station_results = self._write_results()
+        self.timings["decode"] = time.perf_counter() - start
+        return station_results
+
+    def _solution_pool(self, number_of_solutions, time_limit):
+        # Collects the best layouts in one Gurobi solve with PoolSearchMode 2
+        solver = SolverFactory("gurobi_persistent")
+        solver.set_instance(self.model)
+        solver.set_gurobi_param('PoolSearchMode', 2)
+        solver.set_gurobi_param('PoolSolutions', number_of_solutions)
+        solver.set_gurobi_param('TimeLimit', time_limit)
+        if self.initial_solution is not None:
+            solver.set_gurobi_param('Heuristics', 1.0)
+        print(f"Using the Gurobi solution pool to find {number_of_solutions} solutions.")
+
+        start = time.perf_counter()
+        solver.solve(tee=True, load_solutions=False, warmstart=self.initial_solution is not None)
+        self.timings["solve"] = time.perf_counter() - start
+
+        variables = list(self.model.component_data_objects(Var))
+        solutions = []
+        layouts = set()
+        for number in range(solver.get_model_attr('SolCount')):
+            solver.set_gurobi_param('SolutionNumber', number)
+            for var in variables:
+                var.set_value(solver.get_var_attr(var, 'Xn'), skip_validation=True)
+            station_results = self._write_results()
+            layout = _layout_key(station_results)
+            if layout not in layouts:
+                layouts.add(layout)
+                solutions.append((value(self.model.objective), station_results))
+
+        return sorted(solutions, key=lambda solution: solution[0])
+
+    def _solver_statistics(self, results):
+        # The solver's bound or the combinatorial bound, whichever is tighter
+        lower_bound = results.problem.lower_bound
+        if lower_bound is None or abs(lower_bound) == float("inf"):
+            lower_bound = self.lower_bound
+        elif self.lower_bound is not None:
+            lower_bound = max(lower_bound, self.lower_bound)
+        return {
+            "status": str(results.solver.termination_condition),
+            "num_variables": self.model.nvariables(),
+            "num_constraints": self.model.nconstraints(),
+            "objective": value(self.model.objective, exception=False),
+            "gap": relative_gap(results.problem.upper_bound, lower_bound),
+            "lower_bound": lower_bound,
+        }
 
     def _write_results(self):
         station_results = {}
 
         # Iterate over all stations
         for j in self.model.STATIONS:
-            if self.model.z[j].value == 1:  # Station is open
+            if (self.model.z[j].value or 0) > 0.5:  # Station is open
                 # Find the assigned station type
                 station_type = None
                 for k in self.model.TYPES:
-                    if self.model.y[j, k].value == 1:  # Station type is assigned
+                    if (self.model.y[j, k].value or 0) > 0.5:  # Station type is assigned
                         station_type = k
                         break
 
@@ -166,14 +656,14 @@ class OptimizationModel:
                 assigned_tasks = sorted(
                     [
                         (i, self.model.task_order[i, j].value)
-                        for i in self.model.TASKS
-                        if self.model.x[i, j].value == 1
+                        for i, station in self.model.TaskStations
+                        if station == j and (self.model.x[i, j].value or 0) > 0.5
                     ],
                     key=lambda x: x[1]  # Sort by task_order
                 )
 
-                # Extract just the task IDs for output
-                assigned_tasks = [task[0] for task in assigned_tasks]
+                # Extract just the task IDs for output, super-tasks are replaced by their tasks
+                assigned_tasks = [i for task in assigned_tasks for i in self.unit_members.get(task[0], [task[0]])]
 
                 # Store the results for this station
                 station_results[j] = {
@@ -182,25 +672,262 @@ class OptimizationModel:
                 }
 
         # Print results
-        count = 1
-        for station_index, info in station_results.items():
-            print(
-                f"Station {count} with type {info['station_type']}: {info['assigned_tasks']}"
-            ) 
-            count += 1
+        write_assignments.print_station_results(station_results)
+
+        return station_results
+
+    # What-if changes, applied to the built model in place
+
+    def set_cycle_time(self, product, cycle_time):
+        """
+        Changes the cycle time of a product without rebuilding the model.
+        """
+        self._changed(f"cycle time of {product}", loosened=cycle_time > self.model.c[product].value)
+        self.model.c[product] = cycle_time
+        self._build_args["cycle_time_dict"][product] = cycle_time
+        self._restore_dropped_incompatible()
+
+    def set_task_time(self, task, product, task_time):
+        """
+        Changes the processing time of a task for a product without rebuilding the model.
+        """
+        task_time_dict = self._build_args["task_time_dict"]
+        previous_time = task_time_dict[task, product]
+        self._changed(f"time of task {task}", loosened=task_time < previous_time)
+        task_time_dict[task, product] = task_time
+        unit = self._unit_of.get(task, task)
+        self.model.t[unit, product] = self.model.t[unit, product].value - previous_time + task_time
+        self._restore_dropped_incompatible()
+
+    def set_station_cost(self, station_type, cost):
+        """
+        Changes the cost of opening a station of a type without rebuilding the model.
+        """
+        self._changed(f"cost of station type {station_type}",
+                      loosened=cost < self.model.C[station_type].value or self._duplicate_types)
+        self.model.C[station_type] = cost
+        self._build_args["station_costs"][station_type] = cost
+
+    def set_precedence(self, g, h, active=True):
+        """
+        Adds (active=True) or removes the precedence relation where task g must precede task h.
+
+        Relations the presolve dropped as implied by others get their rows once a removal leaves
+        them unimplied, as do incompatible pairs it dropped which may share a station without the relation.
+        """
+        self._changed(f"precedence relation ({g}, {h})", loosened=not active)
+        self._set_pair_rows("precedence", (g, h), active)
+        _set_pair(self._build_args["precedence_relations"], (g, h), active)
+        # The graph of the build no longer matches the precedence relations
+        self._build_args["precedence_graph"] = None
+        if not active:
+            self._restore_implied_precedence()
+            self._restore_dropped_incompatible()
+
+    def set_incompatible(self, d, f, active=True):
+        """
+        Adds (active=True) or removes the pair of tasks d and f which can't share a station.
+        """
+        self._changed(f"incompatible pair ({d}, {f})", loosened=not active)
+        self._set_pair_rows("incompatible", (d, f), active)
+        _set_pair(self._build_args["incompatible_tasks"], (d, f), active)
+
+    def set_same_station(self, m, n, active=True):
+        """
+        Adds (active=True) or removes the pair of tasks m and n which must share a station.
+        """
+        self._changed(f"same station pair ({m}, {n})", loosened=not active)
+        self._set_pair_rows("same_station", (m, n), active)
+        _set_pair(self._build_args["same_station_pairs"], (m, n), active)
+
+    def _set_pair_rows(self, kind, tasks, active):
+        if self._rebuild_pending:
+            # The rebuild takes the changed pairs from the build arguments
+            return
+        pair = tuple(self._unit_of.get(task, task) for task in tasks)
+        if pair[0] == pair[1]:
+            raise ValueError(f"Tasks {tasks[0]} and {tasks[1]} were merged into one super-task by the presolve, "
+                             f"build with presolve=False to change their relation.")
+        if (kind, pair) not in self._pair_rows:
+            rows = self._find_pair_rows(kind, pair)
+            if not rows:
+                if not active:
+                    return
+                rows = self._add_pair_rows(kind, pair)
+            self._pair_rows[kind, pair] = rows
+        for row in self._pair_rows[kind, pair]:
+            if active:
+                row.activate()
+            else:
+                row.deactivate()
+
+    def _restore_implied_precedence(self):
+        # The presolve only builds rows for the transitive reduction. A relation it dropped as implied
+        # gets its rows once the relations implying it are removed.
+        if self.presolve_report is None or self._rebuild_pending:
+            return
+        model = self.model
+        active = [pair for pair in model.PrecedencePairs if ("precedence", pair) not in self._pair_rows]
+        active += [pair for (kind, pair), rows in self._pair_rows.items() if kind == "precedence" and rows[0].active]
+        units = list(model.TASKS)
+        graph = PrecedenceGraph.from_pairs(units, active)
+        index = {unit: k for k, unit in enumerate(units)}
+        for g, h in self._build_args["precedence_relations"]:
+            pair = (self._unit_of.get(g, g), self._unit_of.get(h, h))
+            if pair[0] != pair[1] and not graph.precedes(index[pair[0]], index[pair[1]]):
+                self._set_pair_rows("precedence", pair, True)
+
+    def _restore_dropped_incompatible(self):
+        # The presolve drops incompatible pairs whose tasks exceed a cycle time together with the tasks on
+        # precedence paths between them. A pair gets its rows once the changed data lets it share a station.
+        # Pairs with disjoint station windows stay without rows, the windows only change with a rebuild.
+        if not self._dropped_incompatible or self._rebuild_pending:
+            return
+        data = self._build_args
+        tasks = list(data["tasks"])
+        graph = data["precedence_graph"]
+        if graph is None:
+            graph = PrecedenceGraph.from_pairs(tasks, data["precedence_relations"])
+        task_index = {task: k for k, task in enumerate(tasks)}
+        dropped = []
+        for d, f in self._dropped_incompatible:
+            if all(tuple(pair) != (d, f) for pair in data["incompatible_tasks"]):
+                # Removed by `set_incompatible`
+                continue
+            units = (self._unit_of.get(d, d), self._unit_of.get(f, f))
+            group = [task for unit in units for task in self.unit_members.get(unit, [unit])]
+            if exceeds_cycle_time(group, graph, task_index, tasks, data["products"], data["task_time_dict"],
+                                  data["cycle_time_dict"]):
+                dropped.append((d, f))
+                continue
+            print(f"Adding the rows of the incompatible pair ({d}, {f}), its tasks may share a station now.")
+            self._set_pair_rows("incompatible", (d, f), True)
+        self._dropped_incompatible = dropped
+
+    def _find_pair_rows(self, kind, pair):
+        # Rows of the pair created by the build
+        model = self.model
+        if kind == "precedence":
+            if pair not in model.PrecedencePairs:
+                return []
+            if self._formulation == "cumulative":
+                return [model.precedence[index] for index in model.PrecedenceStations if index[:2] == pair] \
+                    + [model.precedence_within_station[pair]]
+            return [model.precedence[pair], model.precedence_within_station[pair]]
+        if kind == "incompatible":
+            return [model.incompatible_tasks[index] for index in model.IncompatibleStations if index[:2] == pair]
+        return [model.same_station_tasks[index] for index in model.SameStationStations if index[:2] == pair]
+
+    def _add_pair_rows(self, kind, pair):
+        model = self.model
+        first, second = pair
+        stations_of_task = self._stations_of_task
+
+        if kind == "precedence":
+            precedence_rule, precedence_within_station_rule = self._pair_rules[kind]
+            if self._formulation == "cumulative":
+                expressions = [precedence_rule(model, first, second, j)
+                               for j in _precedence_stations(stations_of_task, first, second)]
+                expressions = [expression for expression in expressions if expression is not Constraint.Feasible]
+            else:
+                expressions = [precedence_rule(model, first, second)]
+            expressions.append(precedence_within_station_rule(model, first, second))
+        elif kind == "incompatible":
+            rule, = self._pair_rules[kind]
+            expressions = [rule(model, first, second, j)
+                           for j in stations_of_task[first] if j in stations_of_task[second]]
+        else:
+            # The station windows of a new pair may differ, outside its window a task isn't assigned
+            def assigned(i, j):
+                return model.x[i, j] if j in stations_of_task[i] else 0
+            stations = sorted(set(stations_of_task[first]) | set(stations_of_task[second]))
+            expressions = [assigned(first, j) == assigned(second, j) for j in stations]
+
+        return [model.extra_pair_rows.add(expression) for expression in expressions]
+
+    def _changed(self, change, loosened):
+        # The heuristic solution may be infeasible after any change, and a loosening change invalidates the lower bound
+        self._heuristic_optimal = False
+        if self._station_bound_active:
+            # The optimal line may need more stations than the heuristic line of the old data allows
+            self._rebuild_pending = True
+        elif self.initial_solution is not None:
+            # The MIP start may be infeasible now
+            self.initial_solution = None
+        if not loosened:
+            return
+        self.lower_bound = None
+        if self._data_dependent_bounds and not self._rebuild_pending:
+            logger.warning(
+                "Changing the %s may allow lines excluded by the station windows or symmetry breaking of "
+                "the build. Build with prune_stations=False and symmetry_breaking=False for exact what-if "
+                "results.",
+                change)
+
+    def _rebuild_if_pending(self):
+        # Rebuilds the model from the changed data, which re-derives the heuristic solution, the station
+        # bound and the station windows. A given initial solution may be infeasible for the changed data.
+        if not self._rebuild_pending:
+            return
+        print("Rebuilding the model, the what-if changes invalidated the station bound of the heuristic solution.")
+        self.build_model(**{**self._build_args, "initial_solution": None})
 
     def add_constraint(self):
-        # Überprüfen, ob ConstraintList existiert
+        """
+        Excludes the task assignment of the current solution with a no-good cut.
+
+        Every task is assigned to exactly one station, so requiring that not all of the currently
+        1-valued `x[i,j]` stay 1 is sufficient. The cut only contains one variable per task.
+        """
         if not hasattr(self.model, 'NoGoodCuts'):
             self.model.NoGoodCuts = ConstraintList()
 
-        # Aktuelle Lösung auslesen
-        solution = {(t, s): self.model.x[t, s].value for t in self.model.TASKS for s in self.model.STATIONS}
+        assigned = [
+            self.model.x[i, j] for i, j in self.model.TaskStations if (self.model.x[i, j].value or 0) > 0.5
+        ]
+        self.model.NoGoodCuts.add(sum(assigned) <= len(assigned) - 1)
+
+
+def _representative_station_types(station_types, tasks, stationtype_compatibility, station_costs):
+    # Maps each station type to the first earlier type with the same costs and compatible tasks
+    representatives = {}
+    first_of_signature = {}
+    for k in station_types:
+        signature = (station_costs[k], tuple(stationtype_compatibility[(i, k)] for i in tasks))
+        if signature in first_of_signature:
+            representatives[k] = first_of_signature[signature]
+        else:
+            first_of_signature[signature] = k
+    return representatives
+
+def _gurobi_progress_callback(progress):
+    # Callback of Pyomo's Gurobi interfaces, called with (model, solver, where)
+    from gurobipy import GRB
+
+    def callback(cb_model, cb_solver, where):
+        if where == GRB.Callback.MIP:
+            progress.record(cb_solver.cbGet(GRB.Callback.RUNTIME), cb_solver.cbGet(GRB.Callback.MIP_OBJBST),
+                            cb_solver.cbGet(GRB.Callback.MIP_OBJBND), cb_solver.cbGet(GRB.Callback.MIP_NODCNT))
+        elif where == GRB.Callback.MIPSOL:
+            progress.record(cb_solver.cbGet(GRB.Callback.RUNTIME), cb_solver.cbGet(GRB.Callback.MIPSOL_OBJ),
+                            cb_solver.cbGet(GRB.Callback.MIPSOL_OBJBND), cb_solver.cbGet(GRB.Callback.MIPSOL_NODCNT),
+                            "incumbent")
+    return callback
+
+def _set_pair(pairs, pair, active):
+    # Adds or removes a pair of the build arguments in place
+    if active and all(tuple(other) != pair for other in pairs):
+        pairs.append(pair)
+    elif not active:
+        pairs[:] = [other for other in pairs if tuple(other) != pair]
+
+def _precedence_stations(stations_of_task, g, h):
+    # Stations where the windows don't imply w[h, j] <= w[g, j]: from the first station of h to the last but one of g
+    return range(stations_of_task[h].start, stations_of_task[g].stop - 1)
 
-        # Neues "No-Good-Cut"-Constraint hinzufügen
-        self.model.NoGoodCuts.add(
-            sum(
-                (1 - solution[t, s]) * self.model.x[t, s] + solution[t, s] * (1 - self.model.x[t, s])
-                for t in self.model.TASKS for s in self.model.STATIONS
-            ) >= 1
-        )
\ No newline at end of file
+def _layout_key(station_results):
+    # Stations in line order with their type and tasks, independent of the station numbers
+    return tuple(
+        (info["station_type"], frozenset(info["assigned_tasks"]))
+        for _, info in sorted(station_results.items())
+    )
@@ -0,0 +1,238 @@
+import importlib.util
+import multiprocessing
+import os
+import queue
+import tempfile
+import time
+import traceback
+
+import write_assignments
+from instance import Instance
+from utils.bounds import cost_lower_bound
+from utils.solution_decoding import column_values
+
+BACKENDS = ("gurobi", "highs", "scip", "heuristic")
+
+# Status strings of the backends which prove the solution optimal
+OPTIMAL_STATUSES = {"optimal", "Optimal"}
+
+# Seconds the backends stop before the deadline, to decode and send their result in time
+RESULT_MARGIN = 1.0
+
+
+class SolverPortfolio:
+    def __init__(self, backends=None, time_limit=120, prune_stations=True, heuristic_start=True):
+        """
+        Parameters:
+        ----------
+        backends : list[str]
+            Backends racing each other, out of "gurobi", "highs", "scip" and "heuristic".
+            Defaults to all available backends.
+        time_limit : float
+            Seconds until the best solution found so far is returned.
+        prune_stations, heuristic_start : bool
+            Passed on to `OptimizationModel.build_model`.
+        """
+        self.backends = list(backends) if backends is not None else available_backends()
+        self.time_limit = time_limit
+        self.prune_stations = prune_stations
+        self.heuristic_start = heuristic_start
+        # (seconds since the start, backend, objective) of every incumbent reported by a backend
+        self.incumbents = []
+        # Final status of each backend, and the backend of the returned solution
+        self.statuses = {}
+        self.winner = None
+        # Lower bound on the line costs, an incumbent reaching it stops the race
+        self.lower_bound = None
+
+    def solve(self, data_input):
+        """
+        Runs all backends in parallel processes on the same instance.
+
+        Every backend reports its incumbents while it runs. As soon as one backend proves its
+        solution optimal, or an incumbent reaches the lower bound of `utils.bounds`, the others
+        are stopped. Otherwise the best solution found until the time limit is returned. A backend
+        is only told the time left after building its model, so its final result arrives in time.
+
+        Args:
+            data_input (dict or Instance): Input data as returned by `read_data.read_input_from_excel`
+                or `read_data.read_instance`.
+
+        Returns:
+            dict: Maps the station number to a dict with the keys "station_type" and "assigned_tasks",
+                or None if no backend found a solution.
+        """
+        if not self.backends:
+            raise ValueError("No solver backend is available.")
+        if isinstance(data_input, Instance):
+            data_input = data_input.to_data_input()
+
+        self.lower_bound = cost_lower_bound(
+            data_input["tasks"], data_input["product_names"], data_input["station_types"], data_input["task_time_dict"],
+            data_input["cycle_time_dict"], data_input["stationtype_compatibility"], data_input["station_costs"])
+        print(f"Racing {', '.join(self.backends)} for {self.time_limit} seconds, lower bound {self.lower_bound:g}...")
+        self.incumbents = []
+        self.statuses = {}
+        self.winner = None
+        best_objective = float("inf")
+        best_station_results = None
+
+        context = multiprocessing.get_context()
+        messages = context.Queue()
+        start = time.perf_counter()
+        deadline = start + self.time_limit
+        # The workers get the deadline as wall-clock time, perf_counter isn't comparable across processes
+        wall_deadline = time.time() + self.time_limit
+        workers = {
+            backend: context.Process(
+                target=_run_backend, name=f"portfolio-{backend}", daemon=True,
+                args=(backend, data_input, wall_deadline, self.prune_stations, self.heuristic_start, messages))
+            for backend in self.backends
+        }
+        for worker in workers.values():
+            worker.start()
+
+        try:
+            while len(self.statuses) < len(workers):
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    kind, backend, *payload = messages.get(timeout=min(remaining, 1.0))
+                except queue.Empty:
+                    # A worker which died without reporting counts as failed
+                    for name, worker in workers.items():
+                        if name not in self.statuses and not worker.is_alive():
+                            self.statuses[name] = "crashed"
+                    continue
+
+                if kind == "error":
+                    self.statuses[backend] = "error"
+                    print(f"{backend} failed: {payload[0]}")
+                    continue
+
+                status, objective, station_results = payload
+                if objective is not None and station_results and objective < best_objective - 1e-9:
+                    best_objective = objective
+                    best_station_results = station_results
+                    self.winner = backend
+                    self.incumbents.append((time.perf_counter() - start, backend, objective))
+                    print(f"New incumbent {objective:g} from {backend}.")
+                    if objective <= self.lower_bound + 1e-6:
+                        print(f"{backend} reached the lower bound.")
+                        break
+
+                if kind == "done":
+                    self.statuses[backend] = status
+                    # Optimal only within the MIP gap, so a cheaper incumbent of another backend is kept
+                    if status in OPTIMAL_STATUSES and station_results and objective is not None \
+                            and objective <= best_objective + 1e-9:
+                        print(f"{backend} proved optimality.")
+                        self.winner = backend
+                        best_station_results = station_results
+                        break
+        finally:
+            for worker in workers.values():
+                if worker.is_alive():
+                    worker.terminate()
+            for worker in workers.values():
+                worker.join()
+            for backend in workers:
+                self.statuses.setdefault(backend, "stopped")
+
+        if best_station_results is None:
+            print("No backend found a solution.")
+            return None
+
+        print(f"Best solution by {self.winner}:")
+        write_assignments.print_station_results(best_station_results)
+        return best_station_results
+
+
+def available_backends():
+    """
+    Returns the backends whose solver is installed.
+    """
+    backends = []
+    try:
+        from pyomo.opt import SolverFactory
+        if SolverFactory("gurobi").available(exception_flag=False):
+            backends.append("gurobi")
+    except Exception:
+        pass
+    if importlib.util.find_spec("highspy") is not None:
+        backends.append("highs")
+    if importlib.util.find_spec("pyscipopt") is not None:
+        backends.append("scip")
+    backends.append("heuristic")
+    return backends
+
+
+def _run_backend(backend, data_input, deadline, prune_stations, heuristic_start, messages):
+    # Runs in a worker process, every message is a tuple (kind, backend, ...). The solvers get the time
+    # left until the deadline after the build, so their result arrives before the portfolio stops.
+    def time_limit():
+        remaining = deadline - time.time() - RESULT_MARGIN
+        if remaining <= 0:
+            raise TimeoutError("No time left for the solver after building the model.")
+        return remaining
+
+    def report_incumbent(objective, station_results):
+        messages.put(("incumbent", backend, None, objective, station_results))
+
+    try:
+        if backend == "heuristic":
+            from heuristic_solver import SolverHeuristic
+            from utils.heuristics import solution_cost
+
+            station_results = SolverHeuristic().solve(data_input)
+            messages.put(("done", backend, "feasible", solution_cost(station_results, data_input["station_costs"]),
+                          station_results))
+            return
+
+        from model_with_stationtypes import OptimizationModel
+
+        model = OptimizationModel()
+        model.build_model(data_input["cycle_time_dict"], data_input["tasks"], data_input["station_types"],
+                          data_input["product_names"], data_input["task_time_dict"],
+                          data_input["precedence_relations"], data_input["incompatible_tasks"],
+                          data_input["compatible_tasks"], data_input["stationtype_compatibility"],
+                          data_input["station_costs"], prune_stations=prune_stations,
+                          heuristic_start=heuristic_start, presolve=True)
+
+        if backend == "gurobi":
+            station_results = model.execute_solver("gurobi", time_limit=time_limit())
+            if station_results is None and not model.statistics:
+                raise RuntimeError("gurobi solver is not available.")
+            statistics = model.statistics
+        elif backend == "highs":
+            from highs_solver import SolverHiGHS
+
+            solver = SolverHiGHS(data_input["num_tasks"], data_input["precedence_relations"],
+                                 time_limit=time_limit())
+            solver.incumbent_callback = report_incumbent
+            solver.lower_bound = model.lower_bound
+            solver.unit_members = model.unit_members
+            station_results = solver.solve_model(model.model)
+            statistics = solver.statistics
+        elif backend == "scip":
+            from scip_solver import SolverSCIP
+
+            solver = SolverSCIP(data_input["num_tasks"], data_input["precedence_relations"])
+            solver.incumbent_callback = report_incumbent
+            solver.lower_bound = model.lower_bound
+            solver.unit_members = model.unit_members
+            with tempfile.TemporaryDirectory() as directory:
+                mps_file_path = os.path.join(directory, "alb_model.mps")
+                model.export_model(mps_file_path)
+                solver.mip_start = column_values(model.model, model.column_map)
+                solver.time_limit = time_limit()
+                station_results = solver.solve(mps_file_path, model.column_map)
+            statistics = solver.statistics
+        else:
+            raise ValueError(f"Backend '{backend}' is not supported.")
+
+        messages.put(("done", backend, statistics["status"], statistics["objective"], station_results))
+    except Exception as error:
+        traceback.print_exc()
+        messages.put(("error", backend, f"{type(error).__name__}: {error}"))
@@ -1,5 +1,32 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+
+import numpy as np
 import pandas as pd
 
+from instance import Instance
+
+logger = logging.getLogger(__name__)
+
+# Directory of the binary instance cache used by `read_instance`
+CACHE_DIR = os.path.join("data", ".cache")
+
+# Sheets of the input workbook and the row used as header (None if the sheet has no header row)
+SHEETS = {
+    'overview': None,
+    'task_times': 0,
+    'cycle_time': 0,
+    'station_types': 0,
+    'station_costs': 0,
+    'precedence_relations': 0,
+    'incompatible_tasks': 0,
+    'compatible_tasks': 0,
+}
+
 def read_input_from_excel(file_path):
     """
     Reads the input data from the Excel file.
@@ -7,15 +34,16 @@ def read_input_from_excel(file_path):
     Args:
         file_path (str): Path to the Excel file containing the input data.
     """
-    
-    solver, num_products, num_tasks = _read_hyperparameters(file_path)
-    tasks, product_names, task_time_dict = _read_task_times(file_path)
-    cycle_time_dict = _read_cycle_time(file_path, product_names)
-    stationtype_compatibility, station_types = _read_station_types(file_path)
-    station_costs = _read_station_costs(file_path)
-    precedence_relations = _read_task_pairs(file_path, 'precedence_relations')
-    incompatible_tasks = _read_task_pairs(file_path, 'incompatible_tasks')
-    compatible_tasks = _read_task_pairs(file_path, 'compatible_tasks')
+    sheets = _read_sheets(file_path)
+
+    solver, num_products, num_tasks = _read_hyperparameters(sheets['overview'])
+    tasks, product_names, task_time_dict = _read_task_times(sheets['task_times'])
+    cycle_time_dict = _read_cycle_time(sheets['cycle_time'], product_names)
+    stationtype_compatibility, station_types = _read_station_types(sheets['station_types'])
+    station_costs = _read_station_costs(sheets['station_costs'])
+    precedence_relations = _read_task_pairs(sheets['precedence_relations'])
+    incompatible_tasks = _read_task_pairs(sheets['incompatible_tasks'])
+    compatible_tasks = _read_task_pairs(sheets['compatible_tasks'])
 
     data_input = {
         "solver": solver,
@@ -36,65 +64,166 @@ def read_input_from_excel(file_path):
 
     return data_input
 
-def _read_hyperparameters(file_path):
-    df_overview = pd.read_excel(file_path, sheet_name='overview', header=None)
+def read_instance(file_path, cache_dir=CACHE_DIR):
+    """
+    Reads the input data from the Excel file into an array backed `Instance`.
+
+    Parsed instances are cached in `cache_dir`, keyed by the content hash of the workbook. As long
+    as the modification time and size of the workbook are unchanged, the cached arrays are
+    memory-mapped without hashing or parsing the workbook again.
+
+    Args:
+        file_path (str): Path to the Excel file containing the input data.
+        cache_dir (str): Directory of the instance cache, None disables the cache.
+    """
+    if cache_dir is None:
+        return _parse_instance(file_path)
+
+    stat = os.stat(file_path)
+    index_path = os.path.join(cache_dir, hashlib.sha1(os.path.abspath(file_path).encode()).hexdigest() + ".json")
+    index = _read_cache_index(index_path)
+
+    if index.get("mtime_ns") == stat.st_mtime_ns and index.get("size") == stat.st_size:
+        digest = index["sha256"]
+    else:
+        digest = _file_digest(file_path)
+
+    entry_dir = os.path.join(cache_dir, digest)
+    instance = _load_cached_instance(entry_dir)
+    if instance is None:
+        instance = _parse_instance(file_path)
+        _write_cached_instance(instance, entry_dir)
+    else:
+        print(f"Data successfully loaded from cache for `{file_path}`.")
+
+    if index.get("sha256") != digest or index.get("mtime_ns") != stat.st_mtime_ns:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(index_path, "w") as file:
+            json.dump({"path": os.path.abspath(file_path), "mtime_ns": stat.st_mtime_ns,
+                       "size": stat.st_size, "sha256": digest}, file)
 
+    return instance
+
+def _parse_instance(file_path):
+    sheets = _read_sheets(file_path)
+
+    solver, num_products, num_tasks = _read_hyperparameters(sheets['overview'])
+
+    df_tasks = sheets['task_times']
+    tasks = df_tasks.iloc[:, 0].to_numpy()
+    product_names = df_tasks.columns[1:].tolist()
+
+    df_cycle_time = sheets['cycle_time'].set_index('Product')
+    df_station_types = sheets['station_types'].set_index('task_ID')
+    station_types = df_station_types.columns.tolist()
+    df_station_costs = sheets['station_costs'].set_index('Station')
+
+    instance = Instance.from_arrays(
+        solver=solver,
+        num_tasks=num_tasks,
+        tasks=tasks,
+        product_names=product_names,
+        station_types=station_types,
+        task_times=df_tasks.iloc[:, 1:].to_numpy(),
+        cycle_times=df_cycle_time.loc[product_names, 'Cycle_time'].astype(int).to_numpy(),
+        compatibility=df_station_types.loc[tasks, station_types].to_numpy(),
+        station_costs=df_station_costs.loc[station_types, 'Costs'].to_numpy(),
+        precedence_pairs=_split_task_pairs(sheets['precedence_relations']),
+        incompatible_pairs=_split_task_pairs(sheets['incompatible_tasks']),
+        same_station_pairs=_split_task_pairs(sheets['compatible_tasks']),
+    )
+
+    print(f"Data successfully loaded from `{file_path}`.")
+
+    return instance
+
+def _file_digest(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _read_cache_index(index_path):
+    try:
+        with open(index_path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def _load_cached_instance(entry_dir):
+    if not os.path.isdir(entry_dir):
+        return None
+    start = time.perf_counter()
+    try:
+        instance = Instance.load(entry_dir)
+    except (OSError, ValueError, KeyError, TypeError) as error:
+        logger.warning("Ignoring broken instance cache `%s`: %s", entry_dir, error)
+        return None
+    logger.debug("Loaded cached instance `%s` in %.1f ms.", entry_dir, (time.perf_counter() - start) * 1000)
+    return instance
+
+def _write_cached_instance(instance, entry_dir):
+    # Writes into a temporary directory first, so an interrupted write never leaves a partial entry
+    temp_dir = f"{entry_dir}.{os.getpid()}.tmp"
+    try:
+        instance.save(temp_dir)
+        if os.path.isdir(entry_dir):
+            shutil.rmtree(entry_dir)
+        os.replace(temp_dir, entry_dir)
+    except (OSError, ValueError) as error:
+        logger.warning("Could not write instance cache `%s`: %s", entry_dir, error)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def _read_sheets(file_path):
+    # Opens the workbook once and parses all sheets from the open file
+    sheets = {}
+    start = time.perf_counter()
+    with pd.ExcelFile(file_path) as workbook:
+        logger.debug("Opened `%s` in %.1f ms.", file_path, (time.perf_counter() - start) * 1000)
+        for sheet_name, header in SHEETS.items():
+            sheet_start = time.perf_counter()
+            sheets[sheet_name] = pd.read_excel(workbook, sheet_name=sheet_name, header=header)
+            logger.debug("Read sheet `%s` in %.1f ms.", sheet_name, (time.perf_counter() - sheet_start) * 1000)
+    logger.debug("Read all sheets of `%s` in %.1f ms.", file_path, (time.perf_counter() - start) * 1000)
+    return sheets
+
+def _read_hyperparameters(df_overview):
     solver = df_overview.iloc[0, 1]
     num_products = int(df_overview.iloc[1, 1])
     num_tasks = int(df_overview.iloc[2, 1])
 
     return (solver, num_products, num_tasks)
 
-def _read_cycle_time(file_path, product_names):
-    df_cycle_time = pd.read_excel(file_path, sheet_name='cycle_time')
-    cycle_time_dict = {}
-
-    for _, row in df_cycle_time.iterrows():
-        cycle_time_dict[row["Product"]] = int(row["Cycle_time"])
-
-    return cycle_time_dict
-
-def _read_task_times(file_path):
-    df_tasks = pd.read_excel(file_path, sheet_name='task_times')
+def _read_cycle_time(df_cycle_time, product_names):
+    return dict(zip(df_cycle_time["Product"].tolist(), df_cycle_time["Cycle_time"].astype(int).tolist()))
 
+def _read_task_times(df_tasks):
     tasks = df_tasks.iloc[:, 0].tolist()
 
     product_names = df_tasks.columns[1:].tolist()
 
-    product_columns = df_tasks.columns[1:]
-
-    # Create task_time_dict dynamically
-    task_time_dict = {}
-    for _, row in df_tasks.iterrows():
-        for product in product_columns:
-            task_time_dict[(row.iloc[0], product)] = row[product]
+    # Create task_time_dict with (task, product) keys
+    task_time_dict = df_tasks.set_index(df_tasks.columns[0]).stack().to_dict()
 
     return tasks, product_names, task_time_dict
 
-def _read_station_types(file_path):
-    df_station_types = pd.read_excel(file_path, sheet_name='station_types')
-
+def _read_station_types(df_station_types):
     station_types = [col for col in df_station_types.columns if col != 'task_ID']
 
     # Convert the DataFrame to the required dictionary
-    stationtype_compatibility = {
-        (row['task_ID'], station_type): row[station_type]
-        for _, row in df_station_types.iterrows()
-        for station_type in station_types
-    }
+    stationtype_compatibility = df_station_types.set_index('task_ID')[station_types].stack().to_dict()
 
     return stationtype_compatibility, station_types
 
-def _read_station_costs(file_path):
-    df_station_costs = pd.read_excel(file_path, sheet_name='station_costs')
-
-    station_costs = {row["Station"]: row["Costs"] for _, row in df_station_costs.iterrows()}
+def _read_station_costs(df_station_costs):
+    return dict(zip(df_station_costs["Station"].tolist(), df_station_costs["Costs"].tolist()))
 
-    return station_costs
+def _read_task_pairs(df):
+    return [tuple(task_pair) for task_pair in _split_task_pairs(df).tolist()]
 
-def _read_task_pairs(file_path, sheet_name):
-    df = pd.read_excel(file_path, sheet_name=sheet_name)
-    return [
-        tuple(map(int, task_pair.split(';')))
-        for task_pair in df.iloc[:, 0].apply(str)
-    ]
\ No newline at end of file
+def _split_task_pairs(df):
+    # Splits "g;h" entries of the first column into an array of integer pairs
+    if df.empty:
+        return np.empty((0, 2), dtype=np.int64)
+    return df.iloc[:, 0].astype(str).str.split(';', expand=True).astype(int).to_numpy()
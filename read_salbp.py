@@ -0,0 +1,153 @@
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Section markers of the `.IN2` format
+END_OF_PRECEDENCE_RELATIONS = (-1, -1)
+END_OF_INCOMPATIBLE_TASKS = (-2, -2)
+
+# Station type of the benchmark instances, which don't distinguish station types
+STATION_TYPE = "Standard"
+
+def read_input_from_in2(file_path, cycle_time=None, solver=None):
+    """
+    Reads a SALBP benchmark file in `.IN2` format.
+
+    The file holds the number of tasks and the task times of the first product, followed by the
+    precedence relations up to `-1,-1` and the incompatible tasks up to `-2,-2`. Each further
+    product is given by its task times, optionally preceded by the number of tasks (see README).
+    The file is read line by line.
+
+    Tasks are numbered from 1. The instance has a single station type with costs 1, so the
+    objective of the model is the number of stations.
+
+    Args:
+        file_path (str): Path to the `.IN2` file.
+        cycle_time (int or dict): Cycle time of all products, or a dict mapping each product name
+            to its cycle time. If None, each product gets its largest task time as cycle time.
+        solver (str): Solver stored in the returned data, the files don't specify one.
+
+    Returns:
+        dict: The input data with the same keys as `read_data.read_input_from_excel`.
+
+    Raises:
+        ValueError: If the file doesn't follow the `.IN2` format.
+    """
+    with open(file_path) as file:
+        lines = _data_lines(file)
+
+        num_tasks = _read_int(next(lines, None), file_path)
+        task_times = [_read_task_times(lines, num_tasks, file_path)]
+        precedence_relations = _read_task_pairs(lines, END_OF_PRECEDENCE_RELATIONS, file_path)
+        incompatible_tasks = _read_task_pairs(lines, END_OF_INCOMPATIBLE_TASKS, file_path)
+        task_times += _read_further_products(lines, num_tasks, file_path)
+
+    tasks = list(range(1, num_tasks + 1))
+    product_names = [f"Product {p}" for p in range(1, len(task_times) + 1)]
+
+    for g, h in precedence_relations + incompatible_tasks:
+        if not (1 <= g <= num_tasks and 1 <= h <= num_tasks):
+            raise ValueError(f"Unknown task in pair ({g}, {h}) of `{file_path}`.")
+
+    if cycle_time is None:
+        cycle_time_dict = {p: max(times, default=0) for p, times in zip(product_names, task_times)}
+    elif isinstance(cycle_time, dict):
+        cycle_time_dict = {p: int(cycle_time[p]) for p in product_names}
+    else:
+        cycle_time_dict = {p: int(cycle_time) for p in product_names}
+
+    data_input = {
+        "solver": solver,
+        "cycle_time_dict": cycle_time_dict,
+        "num_tasks": num_tasks,
+        "tasks": tasks,
+        "product_names": product_names,
+        "task_time_dict": {
+            (i, p): times[i - 1] for p, times in zip(product_names, task_times) for i in tasks
+        },
+        "station_costs": {STATION_TYPE: 1},
+        "stationtype_compatibility": {(i, STATION_TYPE): 1 for i in tasks},
+        "station_types": [STATION_TYPE],
+        "precedence_relations": precedence_relations,
+        "incompatible_tasks": incompatible_tasks,
+        "compatible_tasks": [],
+    }
+
+    print(f"Data successfully loaded from `{file_path}`.")
+
+    return data_input
+
+def iter_in2_directory(directory, cycle_time=None, solver=None):
+    """
+    Reads all `.IN2` files of a directory, one file at a time.
+
+    Args:
+        directory (str): Directory containing the `.IN2` files.
+        cycle_time, solver: Passed on to `read_input_from_in2`.
+
+    Yields:
+        tuple: (name, data_input) per file in alphabetical order, where name is the file name
+            without extension.
+    """
+    file_names = sorted(name for name in os.listdir(directory) if name.lower().endswith(".in2"))
+    for file_name in file_names:
+        yield os.path.splitext(file_name)[0], read_input_from_in2(
+            os.path.join(directory, file_name), cycle_time=cycle_time, solver=solver)
+
+def _data_lines(file):
+    # Yields the stripped, non-empty lines, ignoring the DOS end-of-file character
+    for line in file:
+        line = line.strip().strip("\x1a").strip()
+        if line:
+            yield line
+
+def _read_int(line, file_path):
+    if line is None:
+        raise ValueError(f"Unexpected end of `{file_path}`.")
+    try:
+        return int(line)
+    except ValueError:
+        raise ValueError(f"Expected a number in `{file_path}`, got `{line}`.") from None
+
+def _read_task_times(lines, num_tasks, file_path):
+    times = []
+    while len(times) < num_tasks:
+        times.append(_read_int(next(lines, None), file_path))
+    return times
+
+def _read_task_pairs(lines, end_marker, file_path):
+    # Reads "g,h" lines up to the end marker, a missing marker at the end of the file is accepted
+    pairs = []
+    for line in lines:
+        try:
+            pair = tuple(int(value) for value in line.split(","))
+        except ValueError:
+            raise ValueError(f"Expected a task pair in `{file_path}`, got `{line}`.") from None
+        if len(pair) != 2:
+            raise ValueError(f"Expected a task pair in `{file_path}`, got `{line}`.")
+        if pair == end_marker:
+            break
+        if pair in (END_OF_PRECEDENCE_RELATIONS, END_OF_INCOMPATIBLE_TASKS):
+            raise ValueError(f"Unexpected section marker `{line}` in `{file_path}`.")
+        pairs.append(pair)
+    return pairs
+
+def _read_further_products(lines, num_tasks, file_path):
+    # The remaining lines are the task times of further products. Whether the blocks start with
+    # the number of tasks is decided once from the number of remaining values.
+    values = [_read_int(line, file_path) for line in lines]
+    if num_tasks == 0 or not values:
+        return []
+    if len(values) % num_tasks == 0:
+        block = num_tasks
+    elif len(values) % (num_tasks + 1) == 0 and all(
+            count == num_tasks for count in values[::num_tasks + 1]):
+        block = num_tasks + 1
+    else:
+        raise ValueError(
+            f"{len(values)} values after the incompatible tasks of `{file_path}` don't form "
+            f"products with {num_tasks} tasks."
+        )
+    logger.debug("Read %d further products from `%s`.", len(values) // block, file_path)
+    return [values[start + block - num_tasks:start + block] for start in range(0, len(values), block)]
@@ -0,0 +1,239 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import queue
+import time
+import traceback
+
+import read_data
+import read_salbp
+from instance import Instance
+from utils.heuristics import solution_cost
+from utils.precedence_graph import PrecedenceGraph
+
+# Instance data of a worker process, sent once per worker instead of once per scenario
+_data_input = None
+_precedence_graph = None
+_rows = None
+
+
+class ScenarioSweep:
+    def __init__(self, solver_name="appsi_highs", time_limit=60, processes=None, prune_stations=True):
+        """
+        Parameters:
+        ----------
+        solver_name : str
+            Name of the solver for Pyomo's SolverFactory.
+        time_limit : float
+            Seconds per scenario.
+        processes : int
+            Number of worker processes, defaults to the number of CPUs.
+        prune_stations : bool
+            Passed on to `OptimizationModel.build_model`.
+        """
+        self.solver_name = solver_name
+        self.time_limit = time_limit
+        self.processes = processes or os.cpu_count() or 1
+        self.prune_stations = prune_stations
+
+    def run(self, data_input, cycle_time_dicts, station_cost_dicts=None, output_path=None):
+        """
+        Solves every combination of cycle times and station costs in parallel processes.
+
+        A line stays feasible if the cycle times grow or the station costs change, so each scenario
+        is warm-started with the cheapest line found so far by its worker for cycle times no longer
+        than its own. Scenarios with the same station costs are therefore solved by the same worker
+        in order of increasing cycle times, as long as there are enough of them to keep all workers busy.
+
+        Args:
+            data_input (dict or Instance): Input data as returned by `read_data.read_input_from_excel`
+                or `read_data.read_instance`.
+            cycle_time_dicts (list of dict): Cycle time of each product per scenario.
+            station_cost_dicts (list of dict): Costs of each station type per scenario, defaults to
+                the costs of the instance.
+            output_path (str): CSV file the rows are written to as they arrive.
+
+        Returns:
+            list of dict: One row per scenario, ordered by scenario number, with the keys "scenario",
+                "cycle_time_dict", "cost_variant", "status", "objective", "num_stations", "lower_bound",
+                "gap", "warm_start" and "time".
+        """
+        if isinstance(data_input, Instance):
+            data_input = data_input.to_data_input()
+        if station_cost_dicts is None:
+            station_cost_dicts = [data_input["station_costs"]]
+        grid = [(cycle, k, costs) for k, costs in enumerate(station_cost_dicts) for cycle in cycle_time_dicts]
+        scenarios = [(number, *scenario) for number, scenario in enumerate(grid, start=1)]
+        chains = _chains(scenarios, data_input["product_names"], self.processes)
+        print(f"Sweeping {len(scenarios)} scenarios in {len(chains)} chains with {self.processes} processes...")
+
+        rows = []
+        context = multiprocessing.get_context()
+        rows_queue = context.Queue()
+        with _TableWriter(data_input["product_names"], output_path) as table, \
+                context.Pool(self.processes, initializer=_init_worker, initargs=(data_input, rows_queue)) as pool:
+            result = pool.starmap_async(
+                _solve_chain, [(self.solver_name, self.time_limit, self.prune_stations, chain) for chain in chains])
+            while len(rows) < len(scenarios):
+                try:
+                    row = rows_queue.get(timeout=1.0)
+                except queue.Empty:
+                    if result.ready():
+                        # Re-raises the error of a worker which stopped without reporting all its rows
+                        result.get()
+                        break
+                    continue
+                rows.append(row)
+                table.write(row)
+
+        return sorted(rows, key=lambda row: row["scenario"])
+
+
+def _chains(scenarios, products, processes):
+    # Scenarios grouped by station costs in order of increasing cycle times, long chains are split
+    # until there is one per process
+    chains = {}
+    for scenario in scenarios:
+        chains.setdefault(scenario[2], []).append(scenario)
+    chains = [sorted(chain, key=lambda scenario: [scenario[1][p] for p in products]) for chain in chains.values()]
+    while len(chains) < processes:
+        longest = max(chains, key=len)
+        if len(longest) < 2:
+            break
+        chains.remove(longest)
+        middle = len(longest) // 2
+        chains += [longest[:middle], longest[middle:]]
+    return chains
+
+
+def _init_worker(data_input, rows_queue):
+    global _data_input, _precedence_graph, _rows
+    _data_input = data_input
+    _precedence_graph = PrecedenceGraph.from_pairs(data_input["tasks"], data_input["precedence_relations"])
+    _rows = rows_queue
+
+
+def _solve_chain(solver_name, time_limit, prune_stations, chain):
+    # Runs in a worker process and reports one row per scenario
+    from model_with_stationtypes import OptimizationModel
+
+    # (cycle_time_dict, station_results) of the solved scenarios, any of them is feasible for longer cycle times
+    solved = []
+    products = _data_input["product_names"]
+    for number, cycle_time_dict, cost_variant, station_costs in chain:
+        start = time.perf_counter()
+        row = {
+            "scenario": number,
+            "cycle_time_dict": cycle_time_dict,
+            "cost_variant": cost_variant,
+            "status": None,
+            "objective": None,
+            "num_stations": None,
+            "lower_bound": None,
+            "gap": None,
+            "warm_start": False,
+            "time": None,
+        }
+        try:
+            feasible = [
+                station_results for cycle, station_results in solved
+                if all(cycle[p] <= cycle_time_dict[p] for p in products)
+            ]
+            warm_start = min(feasible, key=lambda station_results: solution_cost(station_results, station_costs),
+                             default=None)
+            row["warm_start"] = warm_start is not None
+
+            model = OptimizationModel()
+            model.build_model(cycle_time_dict, _data_input["tasks"], _data_input["station_types"], products,
+                              _data_input["task_time_dict"], _data_input["precedence_relations"],
+                              _data_input["incompatible_tasks"], _data_input["compatible_tasks"],
+                              _data_input["stationtype_compatibility"], station_costs,
+                              prune_stations=prune_stations, heuristic_start=True, presolve=True,
+                              initial_solution=warm_start, precedence_graph=_precedence_graph)
+            station_results = model.execute_solver(solver_name, time_limit=time_limit)
+            statistics = model.statistics
+            row.update(status=statistics.get("status", "unavailable"), objective=statistics.get("objective"),
+                       lower_bound=statistics.get("lower_bound"), gap=statistics.get("gap"))
+            if station_results:
+                row["num_stations"] = len(station_results)
+                solved.append((cycle_time_dict, station_results))
+        except Exception as error:
+            traceback.print_exc()
+            row["status"] = f"error: {type(error).__name__}: {error}"
+        row["time"] = time.perf_counter() - start
+        _rows.put(row)
+
+
+class _TableWriter:
+    # Prints the rows as a table and optionally appends them to a CSV file
+    def __init__(self, products, output_path=None):
+        self.products = products
+        self.output_path = output_path
+        self._file = None
+        self._writer = None
+
+    def __enter__(self):
+        print(f"\n{'Scenario':>8}  {'Cycle times':<24}{'Costs':>6}  {'Status':<22}{'Objective':>12}"
+              f"{'Stations':>10}{'Gap':>8}{'Warm':>6}{'Time':>8}")
+        if self.output_path is not None:
+            self._file = open(self.output_path, "w", newline="")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(["scenario"] + [f"cycle_time_{p}" for p in self.products] + [
+                "cost_variant", "status", "objective", "num_stations", "lower_bound", "gap", "warm_start", "time"])
+        return self
+
+    def write(self, row):
+        cycle_times = ", ".join(f"{row['cycle_time_dict'][p]:g}" for p in self.products)
+        objective = "-" if row["objective"] is None else f"{row['objective']:.6g}"
+        stations = "-" if row["num_stations"] is None else row["num_stations"]
+        gap = "-" if row["gap"] is None else f"{row['gap']:.2%}"
+        print(f"{row['scenario']:>8}  {cycle_times:<24}{row['cost_variant']:>6}  {str(row['status'])[:21]:<22}"
+              f"{objective:>12}{stations:>10}{gap:>8}{'yes' if row['warm_start'] else 'no':>6}{row['time']:>8.2f}")
+        if self._writer is not None:
+            self._writer.writerow([row["scenario"]] + [row["cycle_time_dict"][p] for p in self.products] + [
+                row[key] for key in ("cost_variant", "status", "objective", "num_stations", "lower_bound", "gap",
+                                     "warm_start", "time")])
+            self._file.flush()
+
+    def __exit__(self, *exc_info):
+        if self._file is not None:
+            self._file.close()
+            print(f"\nTable written to `{self.output_path}`.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solves an instance for a grid of cycle times and station costs.")
+    parser.add_argument("instance", help="Excel or SALBP benchmark (.IN2) file.")
+    parser.add_argument("--cycle-time", type=float, default=None,
+                        help="Cycle time of .IN2 files, defaults to the largest task time.")
+    parser.add_argument("--cycle-time-factors", nargs="+", type=float, default=[1.0],
+                        help="Factors applied to the cycle time of every product, one scenario per factor.")
+    parser.add_argument("--station-costs", action="append", type=json.loads, default=None,
+                        help='Costs of the station types as JSON, e.g. \'{"Robot": 2, "Manual": 1}\'. '
+                             'May be given several times, defaults to the costs of the instance.')
+    parser.add_argument("--solver", default="appsi_highs", help="Name of the solver for Pyomo's SolverFactory.")
+    parser.add_argument("--time-limit", type=float, default=60, help="Time limit of each scenario in seconds.")
+    parser.add_argument("--processes", type=int, default=None, help="Number of worker processes.")
+    parser.add_argument("--output", default=None, help="Path of the CSV table.")
+    args = parser.parse_args(argv)
+
+    if args.instance.lower().endswith(".in2"):
+        data_input = read_salbp.read_input_from_in2(args.instance, cycle_time=args.cycle_time)
+    else:
+        data_input = read_data.read_instance(args.instance)
+    if isinstance(data_input, Instance):
+        data_input = data_input.to_data_input()
+
+    # Integer cycle times stay integers, e.g. for the .IN2 files
+    cycle_time_dicts = [
+        {p: type(c)(c * factor) for p, c in data_input["cycle_time_dict"].items()} for factor in args.cycle_time_factors
+    ]
+    sweep = ScenarioSweep(args.solver, args.time_limit, args.processes)
+    sweep.run(data_input, cycle_time_dicts, args.station_costs, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,14 +1,39 @@
-from pyscipopt import Model
+from pyscipopt import Eventhdlr, Model, SCIP_EVENTTYPE
 import os
-from collections import defaultdict
+import time
 import write_assignments
+from utils.bounds import relative_gap
+from utils.solution_decoding import decode_station_results
 
 class SolverSCIP:
-    def __init__(self, num_tasks, precedence_relations):
+    def __init__(self, num_tasks, precedence_relations, time_limit=None):
         self.max_num_stations = num_tasks
         self.precedence_relations = precedence_relations
+        self.time_limit = time_limit
+        # Wall times of the last run in seconds and the statistics reported by SCIP
+        self.timings = {}
+        self.statistics = {}
+        # Called with (objective, station_results) whenever SCIP finds a new best solution
+        self.incumbent_callback = None
+        # Lower bound on the objective, e.g. `OptimizationModel.lower_bound`. SCIP stops once an
+        # incumbent reaches it, and it tightens the reported gap.
+        self.lower_bound = None
+        # Maps the super-tasks of a presolved model to their tasks, see `OptimizationModel.unit_members`
+        self.unit_members = None
+        # `utils.progress.ProgressLog` filled with the incumbents, bounds and node counts during the run
+        self.progress = None
+        # Maps column names to the values of a MIP start, see `utils.solution_decoding.column_values`
+        self.mip_start = None
 
-    def solve(self, file_path):
+    def solve(self, file_path, column_map=None):
+        """
+        Solves the model of an MPS file.
+
+        Args:
+            file_path (str): Path of the MPS file.
+            column_map (dict): Maps the column names of the file to (component name, index), see
+                `OptimizationModel.column_map`. If None, the names are parsed as Pyomo symbolic labels.
+        """
         # Check if filename is a valid MPS file
         if not os.path.isfile(file_path):
             raise FileNotFoundError(f"File '{file_path}' wasn't found.")
@@ -17,31 +42,106 @@ class SolverSCIP:
 
         print("Using SCIP to solve the model...")
         # Call solver
-        station_task_dict = self.run_scip_optimizer(file_path)
-        write_assignments.write_results(station_task_dict, self.precedence_relations)
+        station_results = self.run_scip_optimizer(file_path, column_map)
+        write_assignments.print_station_results(station_results)
+        return station_results
 
 
-    def run_scip_optimizer(self, file_path):
+    def run_scip_optimizer(self, file_path, column_map=None):
+        start = time.perf_counter()
         model = Model()
+        if self.time_limit is not None:
+            model.setParam("limits/time", float(self.time_limit))
+        if self.lower_bound is not None:
+            model.setParam("limits/primal", self.lower_bound + 1e-6)
         model.readProblem(file_path)
+        if self.mip_start:
+            # A partial solution, SCIP completes or repairs it in the presolve
+            solution = model.createPartialSol()
+            for var in model.getVars():
+                if var.name in self.mip_start:
+                    model.setSolVal(solution, var, self.mip_start[var.name])
+            model.addSol(solution)
+        if self.incumbent_callback is not None:
+            model.includeEventhdlr(_IncumbentEventhdlr(self, column_map), "incumbents",
+                                   "Reports each new best solution")
+        if self.progress is not None:
+            self.progress.clear()
+            model.includeEventhdlr(_ProgressEventhdlr(self.progress), "progress",
+                                   "Records the incumbent, bound and node count")
         model.optimize()
 
         print("SCIP Status: ", model.getStatus())
-        station_task_dict = self.create_station_task_dict(model)
-        return station_task_dict
+        self.timings["solve"] = time.perf_counter() - start
+
+        has_solution = model.getNSols() > 0
+        lower_bound = model.getDualbound()
+        if self.lower_bound is not None:
+            lower_bound = max(lower_bound, self.lower_bound)
+        self.statistics = {
+            "status": model.getStatus(),
+            # Sizes of the original problem, the transformed one is freed after the solve
+            "num_variables": model.getNVars(transformed=False),
+            "num_constraints": model.getNConss(transformed=False),
+            "objective": model.getObjVal() if has_solution else None,
+            "gap": relative_gap(model.getObjVal(), lower_bound) if has_solution else None,
+            "lower_bound": lower_bound,
+            "nodes": model.getNNodes(),
+        }
+        if self.progress is not None:
+            self.progress.record(model.getSolvingTime(), model.getPrimalbound(), model.getDualbound(),
+                                 model.getNNodes(), "final")
+
+        start = time.perf_counter()
+        station_results = self.create_station_results(model, column_map) if has_solution else {}
+        self.timings["decode"] = time.perf_counter() - start
+        return station_results
+
+    def create_station_results(self, model, column_map=None, solution=None):
+        # Reads all values of the solution (the best one by default) in one pass and decodes them by variable name
+        variables = model.getVars()
+        if solution is None:
+            solution = model.getBestSol()
+        values = [model.getSolVal(solution, var) for var in variables]
+        return decode_station_results([var.name for var in variables], values, column_map, self.unit_members)
+
+
+class _IncumbentEventhdlr(Eventhdlr):
+    # Decodes every new best solution and passes it to the incumbent callback of the solver
+    def __init__(self, solver, column_map):
+        self.solver = solver
+        self.column_map = column_map
+
+    def eventinit(self):
+        self.model.catchEvent(SCIP_EVENTTYPE.BESTSOLFOUND, self)
+
+    def eventexit(self):
+        self.model.dropEvent(SCIP_EVENTTYPE.BESTSOLFOUND, self)
+
+    def eventexec(self, event):
+        solution = self.model.getBestSol()
+        station_results = self.solver.create_station_results(self.model, self.column_map, solution)
+        self.solver.incumbent_callback(self.model.getSolObjVal(solution), station_results)
+
+
+class _ProgressEventhdlr(Eventhdlr):
+    # Records the primal and dual bound on new best solutions, dual bound improvements and solved nodes
+    EVENTS = (SCIP_EVENTTYPE.BESTSOLFOUND, SCIP_EVENTTYPE.DUALBOUNDIMPROVED, SCIP_EVENTTYPE.NODESOLVED)
 
+    def __init__(self, progress):
+        self.progress = progress
 
-    def create_station_task_dict(self, model):
-        # Dictionary für die Stationen und zugeordneten Aufgaben
-        station_task_dict = defaultdict(list)
+    def eventinit(self):
+        for event_type in self.EVENTS:
+            self.model.catchEvent(event_type, self)
 
-        # Durchlaufe alle Variablen und überprüfe, ob sie zu einer Station und Aufgabe gehören
-        for task in range(self.max_num_stations):
-            for station in range(self.max_num_stations):
-                index = task * self.max_num_stations + station  # Calculate Index
-                value = model.getVal(model.getVars()[index])
-                rounded_value = round(value)
-                if rounded_value == 1:
-                    station_task_dict[station + 1].append(task + 1)
+    def eventexit(self):
+        for event_type in self.EVENTS:
+            self.model.dropEvent(event_type, self)
 
-        return station_task_dict
\ No newline at end of file
+    def eventexec(self, event):
+        kind = "incumbent" if event.getType() == SCIP_EVENTTYPE.BESTSOLFOUND else "progress"
+        # The primal bound isn't updated yet when the new best solution is announced
+        incumbent = self.model.getSolObjVal(self.model.getBestSol()) if self.model.getNSols() > 0 else None
+        self.progress.record(self.model.getSolvingTime(), incumbent, self.model.getDualbound(),
+                             self.model.getNNodes(), kind)
@@ -0,0 +1,115 @@
+import numpy as np
+
+
+def station_bounds(tasks, products, task_time_dict, cycle_time_dict):
+    """
+    Computes the classic SALBP-1 lower bounds on the number of stations for each product.
+
+    LB1 is the total task time divided by the cycle time. LB2 counts the tasks longer than half
+    the cycle time, of which no two share a station, and tasks of exactly half the cycle time as
+    half a station. LB3 weights tasks longer than two thirds of the cycle time with 1, of exactly
+    two thirds with 2/3, between one and two thirds with 1/2 and of exactly one third with 1/3.
+
+    Args:
+        tasks (list of int): Task IDs.
+        products (list of str): Product names.
+        task_time_dict (dict): Maps (task_ID, product) to the processing time.
+        cycle_time_dict (dict): Maps a product to its cycle time.
+
+    Returns:
+        dict: Maps each product to a tuple (LB1, LB2, LB3).
+    """
+    times, cycle_times = _time_matrix(tasks, products, task_time_dict, cycle_time_dict)
+    bounds = _bin_packing_bounds(times, cycle_times)
+    return {p: tuple(int(bound) for bound in bounds[:, column]) for column, p in enumerate(products)}
+
+
+def station_lower_bound(tasks, products, task_time_dict, cycle_time_dict):
+    """
+    Returns the largest bound of `station_bounds` over all products, since every station has to
+    meet the cycle time of every product.
+    """
+    if not tasks or not products:
+        return 0
+    times, cycle_times = _time_matrix(tasks, products, task_time_dict, cycle_time_dict)
+    return int(_bin_packing_bounds(times, cycle_times).max())
+
+
+def cost_lower_bound(tasks, products, station_types, task_time_dict, cycle_time_dict, stationtype_compatibility,
+                     station_costs):
+    """
+    Computes a lower bound on the costs of a line.
+
+    Each task needs a station whose type is compatible with it, so the station of a task costs
+    at least as much as the cheapest compatible type of the task. For every cost level v, the tasks
+    whose cheapest compatible type costs at least v need at least `station_lower_bound` of them
+    stations costing at least v. Summing over the levels gives the bound.
+
+    Args:
+        tasks (list of int): Task IDs.
+        products (list of str): Product names.
+        station_types (list of str): Station types.
+        task_time_dict (dict): Maps (task_ID, product) to the processing time.
+        cycle_time_dict (dict): Maps a product to its cycle time.
+        stationtype_compatibility (dict): Maps (task_ID, station_type) to 1 if compatible, else 0.
+        station_costs (dict): Maps a station type to the costs of opening a station of that type.
+
+    Returns:
+        float: The lower bound, 0 without tasks.
+
+    Raises:
+        ValueError: If a task isn't compatible with any station type.
+    """
+    if not tasks or not products:
+        return 0
+
+    times, cycle_times = _time_matrix(tasks, products, task_time_dict, cycle_time_dict)
+    costs = np.array([station_costs[k] for k in station_types], dtype=float)
+    compatible = np.array([[stationtype_compatibility[(i, k)] for k in station_types] for i in tasks], dtype=bool)
+    incompatible_tasks = np.flatnonzero(~compatible.any(axis=1))
+    if incompatible_tasks.size:
+        raise ValueError(f"Task {tasks[incompatible_tasks[0]]} isn't compatible with any station type.")
+    cheapest = np.where(compatible, costs, np.inf).min(axis=1)
+
+    bound = 0.0
+    stations_so_far = 0
+    for level in np.unique(cheapest)[::-1]:
+        stations = int(_bin_packing_bounds(times[cheapest >= level], cycle_times).max())
+        if stations > stations_so_far:
+            bound += (stations - stations_so_far) * level
+            stations_so_far = stations
+    return float(bound)
+
+
+def relative_gap(objective, lower_bound):
+    """
+    Returns the relative gap between an objective value and a lower bound, or None if either is missing.
+    """
+    if objective is None or lower_bound is None or abs(objective) == float("inf") or abs(lower_bound) == float("inf"):
+        return None
+    return max(objective - lower_bound, 0) / max(abs(objective), 1e-10)
+
+
+def _time_matrix(tasks, products, task_time_dict, cycle_time_dict):
+    # Task times with one row per task and one column per product, and the cycle time per product
+    times = np.array([[task_time_dict[(i, p)] for p in products] for i in tasks], dtype=float)
+    cycle_times = np.array([cycle_time_dict[p] for p in products], dtype=float)
+    return times.reshape(len(tasks), len(products)), cycle_times
+
+
+def _bin_packing_bounds(times, cycle_times):
+    # Rows LB1, LB2 and LB3 with one column per product, comparisons are scaled to stay exact for integer times
+    lb1 = np.ceil(times.sum(axis=0) / cycle_times - 1e-9)
+
+    long_tasks = (2 * times > cycle_times).sum(axis=0)
+    half_tasks = (2 * times == cycle_times).sum(axis=0)
+    lb2 = long_tasks + np.ceil(half_tasks / 2)
+
+    weights = np.select(
+        [3 * times > 2 * cycle_times, 3 * times == 2 * cycle_times, 3 * times > cycle_times, 3 * times == cycle_times],
+        [1, 2 / 3, 1 / 2, 1 / 3],
+        default=0,
+    )
+    lb3 = np.ceil(weights.sum(axis=0) - 1e-9)
+
+    return np.vstack([lb1, lb2, lb3])
@@ -5,6 +5,8 @@ from networkx.drawing.nx_agraph import graphviz_layout
 import logging
 import os
 
+from utils.precedence_graph import PrecedenceCycleError, PrecedenceGraph
+
 # Set the log level of matplotlib to WARNING
 logging.getLogger('matplotlib').setLevel(logging.WARNING)
 
@@ -20,22 +22,13 @@ def validate_graph(edges):
     """
     
     # Check if precedence_relations has a cycle
-    if _has_cycle(edges):
-        raise ValueError("Graph has a cycle.")
-    else:
-        print("Passed.")
-
-def _has_cycle(edges):
-    # Creates a graph based on precedence_relations
-    G = nx.DiGraph()
-    G.add_edges_from(edges)
-
-    # Check if there's a cycle in the graph
-    for cycle in nx.simple_cycles(G):
-        print("Cycle found -> ", cycle)
-        return True
-    
-    return False # No cycle found
+    nodes = list(dict.fromkeys(task for edge in edges for task in edge))
+    try:
+        PrecedenceGraph.from_pairs(nodes, edges)
+    except PrecedenceCycleError as error:
+        print("Cycle found -> ", error.cycle)
+        raise ValueError("Graph has a cycle.") from error
+    print("Passed.")
 
 def visualize_graph(edges, visualizer="graphviz"):
     # Create a directed graph using NetworkX
@@ -0,0 +1,259 @@
+from utils.precedence_graph import PrecedenceGraph
+from utils.station_windows import same_station_groups
+
+
+def ranked_positional_weight(tasks, products, station_types, task_time_dict, cycle_time_dict, precedence_relations,
+                             incompatible_tasks, same_station_pairs, stationtype_compatibility, station_costs,
+                             precedence_graph=None):
+    """
+    Builds a feasible line layout with the ranked positional weight rule.
+
+    Tasks which must share a station (directly or because precedence relations force them
+    together) are merged into units. Stations are then filled one after another: among all
+    units whose predecessors are already assigned and which still fit the station (cycle time
+    of every product, station type compatibility and incompatible tasks), the unit keeping the
+    station cheapest is chosen, ties are broken by the highest positional weight.
+    When no unit fits anymore, the station gets the cheapest compatible type and is closed.
+
+    Args:
+        tasks (list of int): Task IDs.
+        products (list of str): Product names.
+        station_types (list of str): Station types.
+        task_time_dict (dict): Maps (task_ID, product) to the processing time.
+        cycle_time_dict (dict): Maps a product to its cycle time.
+        precedence_relations (list of tuple): Pairs (g, h) where task g must precede task h.
+        incompatible_tasks (list of tuple): Pairs (d, f) which can't share a station.
+        same_station_pairs (list of tuple): Pairs (m, n) which must share a station.
+        stationtype_compatibility (dict): Maps (task_ID, station_type) to 1 if compatible, else 0.
+        station_costs (dict): Maps a station type to the cost of opening a station of that type.
+        precedence_graph (PrecedenceGraph): The preprocessed precedence relations of the tasks,
+            e.g. `Instance.precedence_graph`. Built from `precedence_relations` if None.
+
+    Returns:
+        dict: Maps the station index (starting at 1) to a dict with the keys
+            "station_type" and "assigned_tasks" (ordered according to the precedence relations).
+
+    Raises:
+        ValueError: If some tasks can't be assigned to any station.
+    """
+    units, members, unit_predecessors, unit_successors = group_units(tasks, precedence_relations, same_station_pairs,
+                                                                     precedence_graph)
+    position = {unit: index for index, unit in enumerate(units)}
+    unit_of_task = {task: unit for unit in units for task in members[unit]}
+
+    # Unit level data
+    unit_times = {
+        unit: {p: sum(task_time_dict[(i, p)] for i in members[unit]) for p in products} for unit in units
+    }
+    unit_types = {
+        unit: {k for k in station_types if all(stationtype_compatibility[(i, k)] for i in members[unit])}
+        for unit in units
+    }
+    unit_incompatible = {unit: set() for unit in units}
+    for d, f in incompatible_tasks:
+        if unit_of_task[d] == unit_of_task[f]:
+            raise ValueError(f"Incompatible tasks {d} and {f} are forced onto the same station.")
+        unit_incompatible[unit_of_task[d]].add(unit_of_task[f])
+        unit_incompatible[unit_of_task[f]].add(unit_of_task[d])
+
+    weights = _positional_weights(units, unit_successors, unit_times, products, cycle_time_dict)
+
+    # Fill stations one after another
+    remaining_predecessors = {unit: len(unit_predecessors[unit]) for unit in units}
+    available = {unit for unit in units if remaining_predecessors[unit] == 0}
+    station_results = {}
+
+    while available:
+        loads = {p: 0 for p in products}
+        allowed_types = set(station_types)
+        station_units = []
+
+        while True:
+            candidates = [
+                unit for unit in available
+                if unit_types[unit] & allowed_types
+                and all(loads[p] + unit_times[unit][p] <= cycle_time_dict[p] for p in products)
+                and not unit_incompatible[unit].intersection(station_units)
+            ]
+            if not candidates:
+                break
+
+            unit = max(
+                candidates,
+                key=lambda u: (-min(station_costs[k] for k in unit_types[u] & allowed_types), weights[u], -position[u]),
+            )
+            station_units.append(unit)
+            available.remove(unit)
+            allowed_types &= unit_types[unit]
+            for p in products:
+                loads[p] += unit_times[unit][p]
+            for successor in unit_successors[unit]:
+                remaining_predecessors[successor] -= 1
+                if remaining_predecessors[successor] == 0:
+                    available.add(successor)
+
+        if not station_units:
+            blocked = sorted(task for unit in available for task in members[unit])
+            raise ValueError(f"Tasks {blocked} don't fit on any station.")
+
+        station_results[len(station_results) + 1] = {
+            "station_type": min(allowed_types, key=lambda k: station_costs[k]),
+            "assigned_tasks": [task for unit in station_units for task in members[unit]],
+        }
+
+    return station_results
+
+
+def solution_cost(station_results, station_costs):
+    """
+    Returns the total cost of opening the stations of a line layout.
+    """
+    return sum(station_costs[info["station_type"]] for info in station_results.values())
+
+
+def group_units(tasks, precedence_relations, same_station_pairs, precedence_graph=None):
+    """
+    Merges tasks which must share a station into units.
+
+    Besides the given same-station pairs, a task lying on a precedence path between two tasks
+    of a unit is forced onto the same station and therefore merged as well.
+
+    Args:
+        tasks (list of int): Task IDs.
+        precedence_relations (list of tuple): Pairs (g, h) where task g must precede task h.
+        same_station_pairs (list of tuple): Pairs (m, n) which must share a station.
+        precedence_graph (PrecedenceGraph): The preprocessed precedence relations of the tasks,
+            e.g. `Instance.precedence_graph`. Built from `precedence_relations` if None.
+
+    Returns:
+        tuple: (units, members, unit_predecessors, unit_successors) where units is a topologically
+            sorted list of unit IDs (the smallest task ID of the unit), members maps a unit to its
+            tasks in topological order and the last two map a unit to the set of adjacent units
+            along the transitive reduction of the precedence relations.
+
+    Raises:
+        PrecedenceCycleError: If the precedence relations contain a cycle.
+    """
+    if precedence_graph is None:
+        precedence_graph = PrecedenceGraph.from_pairs(tasks, precedence_relations)
+    # The reduction has the same reachability as the precedence relations, with fewer edges
+    reduced_pairs = precedence_graph.reduction_pairs()
+    successors = {task: [] for task in tasks}
+    for g, h in reduced_pairs:
+        successors[g].append(h)
+
+    unit_of_task = _merge_units(tasks, successors, same_station_pairs)
+    members = {unit: [] for unit in set(unit_of_task.values())}
+    for task in precedence_graph.tasks[precedence_graph.order].tolist():
+        members[unit_of_task[task]].append(task)
+
+    unit_successors = {unit: set() for unit in members}
+    unit_predecessors = {unit: set() for unit in members}
+    for g, h in reduced_pairs:
+        if unit_of_task[g] != unit_of_task[h]:
+            unit_successors[unit_of_task[g]].add(unit_of_task[h])
+            unit_predecessors[unit_of_task[h]].add(unit_of_task[g])
+
+    unit_ids = sorted(members)
+    unit_graph = PrecedenceGraph.from_pairs(
+        unit_ids, [(u, v) for u in unit_ids for v in sorted(unit_successors[u])])
+    units = unit_graph.tasks[unit_graph.order].tolist()
+    return units, members, unit_predecessors, unit_successors
+
+
+def _merge_units(tasks, successors, same_station_pairs):
+    # Tasks which must share a station form a unit. A unit which lies on a precedence path between
+    # two tasks of another unit is forced onto the same station, so strongly connected units are merged.
+    unit_of_task = {task: task for task in tasks}
+    for group in same_station_groups(tasks, same_station_pairs):
+        representative = min(group)
+        for task in group:
+            unit_of_task[task] = representative
+
+    while True:
+        unit_successors = {unit: set() for unit in set(unit_of_task.values())}
+        for g in tasks:
+            for h in successors[g]:
+                if unit_of_task[g] != unit_of_task[h]:
+                    unit_successors[unit_of_task[g]].add(unit_of_task[h])
+
+        components = [c for c in _strongly_connected_components(unit_successors) if len(c) > 1]
+        if not components:
+            return unit_of_task
+
+        for component in components:
+            representative = min(component)
+            for task in tasks:
+                if unit_of_task[task] in component:
+                    unit_of_task[task] = representative
+
+
+def _strongly_connected_components(successors):
+    # Iterative version of Tarjan's algorithm
+    index = {}
+    lowlink = {}
+    on_stack = set()
+    stack = []
+    components = []
+    counter = 0
+
+    for root in successors:
+        if root in index:
+            continue
+        work = [(root, iter(successors[root]))]
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+
+        while work:
+            node, neighbours = work[-1]
+            advanced = False
+            for neighbour in neighbours:
+                if neighbour not in index:
+                    index[neighbour] = lowlink[neighbour] = counter
+                    counter += 1
+                    stack.append(neighbour)
+                    on_stack.add(neighbour)
+                    work.append((neighbour, iter(successors[neighbour])))
+                    advanced = True
+                    break
+                if neighbour in on_stack:
+                    lowlink[node] = min(lowlink[node], index[neighbour])
+            if advanced:
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            if lowlink[node] == index[node]:
+                component = set()
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.add(member)
+                    if member == node:
+                        break
+                components.append(component)
+
+    return components
+
+
+def _positional_weights(units, unit_successors, unit_times, products, cycle_time_dict):
+    # Time of the unit and all of its successors, relative to the cycle time of each product
+    descendants = {}
+    for unit in reversed(units):
+        related = set()
+        for successor in unit_successors[unit]:
+            related.add(successor)
+            related |= descendants[successor]
+        descendants[unit] = related
+
+    return {
+        unit: sum(
+            (unit_times[unit][p] + sum(unit_times[d][p] for d in descendants[unit])) / cycle_time_dict[p]
+            for p in products if cycle_time_dict[p] > 0
+        )
+        for unit in units
+    }
@@ -0,0 +1,204 @@
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+
+
+class PrecedenceCycleError(ValueError):
+    """
+    Raised if the precedence relations contain a cycle.
+
+    Attributes:
+        cycle (list): Task IDs of one cycle, where each task precedes the next one and the last
+            task precedes the first.
+    """
+    def __init__(self, cycle):
+        super().__init__(f"Precedence relations contain a cycle: {' -> '.join(map(str, cycle + cycle[:1]))}.")
+        self.cycle = cycle
+
+
+@dataclass(frozen=True, eq=False)
+class PrecedenceGraph:
+    """
+    Preprocessed precedence relations of an instance, computed once and shared by the model
+    builder, the validators and the result sorting.
+
+    Tasks are addressed by their index in `tasks`. Reachability is stored as one Python integer
+    per task used as bitset, bit j of `descendants[i]` is set if task i (transitively) precedes task j.
+
+    Attributes:
+        tasks (np.ndarray): Task IDs, shape (n_tasks,).
+        order (np.ndarray): Task indices in topological order.
+        position (np.ndarray): Position of each task index in `order`.
+        reduction_indptr, reduction_indices (np.ndarray): Transitive reduction of the precedence
+            relations as CSR adjacency, i.e. without duplicate edges and edges implied by others.
+        descendants (tuple of int): Bitset of the tasks each task precedes.
+        ancestors (tuple of int): Bitset of the tasks preceding each task.
+    """
+    tasks: np.ndarray
+    order: np.ndarray
+    position: np.ndarray
+    reduction_indptr: np.ndarray
+    reduction_indices: np.ndarray
+    descendants: tuple
+    ancestors: tuple
+
+    @classmethod
+    def from_csr(cls, tasks, successor_indptr, successor_indices):
+        """
+        Preprocesses precedence relations given as CSR adjacency over task indices.
+
+        Args:
+            tasks (array-like): Task IDs, used for messages and `reduction_pairs`.
+            successor_indptr, successor_indices (np.ndarray): The successors of task i are
+                `successor_indices[successor_indptr[i]:successor_indptr[i + 1]]`.
+
+        Raises:
+            PrecedenceCycleError: If the precedence relations contain a cycle.
+        """
+        tasks = np.asarray(tasks)
+        num_tasks = len(tasks)
+        order = topological_sort(num_tasks, successor_indptr, successor_indices, tasks)
+        position = np.empty(num_tasks, dtype=np.int64)
+        position[order] = np.arange(num_tasks)
+
+        # One pass in reverse topological order: the successors of a task are visited in
+        # topological order, so a successor reachable through an earlier one is redundant
+        descendants = [0] * num_tasks
+        kept = [[] for _ in range(num_tasks)]
+        for u in order[::-1].tolist():
+            successors = successor_indices[successor_indptr[u]:successor_indptr[u + 1]]
+            covered = 0
+            for v in successors[np.argsort(position[successors], kind="stable")].tolist():
+                if not covered >> v & 1:
+                    kept[u].append(v)
+                    covered |= descendants[v] | 1 << v
+            descendants[u] = covered
+
+        ancestors = [0] * num_tasks
+        for u in order.tolist():
+            for v in kept[u]:
+                ancestors[v] |= ancestors[u] | 1 << u
+
+        reduction_indptr = np.zeros(num_tasks + 1, dtype=np.int64)
+        np.cumsum([len(successors) for successors in kept], out=reduction_indptr[1:])
+        reduction_indices = np.array([v for successors in kept for v in successors], dtype=np.int64)
+
+        return cls(
+            tasks=tasks,
+            order=order,
+            position=position,
+            reduction_indptr=reduction_indptr,
+            reduction_indices=reduction_indices,
+            descendants=tuple(descendants),
+            ancestors=tuple(ancestors),
+        )
+
+    @classmethod
+    def from_pairs(cls, tasks, precedence_relations):
+        """
+        Preprocesses precedence relations given as pairs (g, h) of task IDs, see `from_csr`.
+
+        Raises:
+            ValueError: If a pair contains an unknown task.
+            PrecedenceCycleError: If the precedence relations contain a cycle.
+        """
+        tasks = list(tasks)
+        index = {task: i for i, task in enumerate(tasks)}
+        try:
+            pairs = np.array([(index[g], index[h]) for g, h in precedence_relations], dtype=np.int64).reshape(-1, 2)
+        except KeyError as error:
+            raise ValueError(f"Unknown task {error.args[0]} in precedence relations.") from None
+        order = np.argsort(pairs[:, 0], kind="stable")
+        indptr = np.zeros(len(tasks) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pairs[:, 0], minlength=len(tasks)), out=indptr[1:])
+        return cls.from_csr(tasks, indptr, pairs[order, 1])
+
+    @property
+    def num_tasks(self):
+        return len(self.tasks)
+
+    def precedes(self, i, j):
+        """Returns True if the task with index i (transitively) precedes the task with index j."""
+        return bool(self.descendants[i] >> j & 1)
+
+    def reachability_matrix(self, transpose=False):
+        """
+        Returns a boolean matrix of shape (n_tasks, n_tasks) whose entry [i, j] is True if task i
+        precedes task j, or if task j precedes task i when `transpose` is True.
+        """
+        return _bitset_matrix(self.ancestors if transpose else self.descendants, self.num_tasks)
+
+    def reduction_pairs(self):
+        """Returns the transitively reduced precedence relations as pairs (g, h) of task IDs."""
+        sources = np.repeat(self.tasks, np.diff(self.reduction_indptr))
+        return list(zip(sources.tolist(), self.tasks[self.reduction_indices].tolist()))
+
+    def sort_tasks(self, task_ids):
+        """Returns the task IDs in topological order."""
+        index = {task: i for i, task in enumerate(self.tasks.tolist())}
+        return sorted(task_ids, key=lambda task: self.position[index[task]])
+
+
+def topological_sort(num_tasks, successor_indptr, successor_indices, tasks=None):
+    """
+    Sorts task indices topologically with Kahn's algorithm.
+
+    Args:
+        num_tasks (int): Number of tasks.
+        successor_indptr, successor_indices (np.ndarray): CSR adjacency of the precedence relations.
+        tasks (array-like): Task IDs used to report a cycle, defaults to the indices.
+
+    Returns:
+        np.ndarray: The task indices in topological order.
+
+    Raises:
+        PrecedenceCycleError: If the precedence relations contain a cycle.
+    """
+    in_degree = np.bincount(successor_indices, minlength=num_tasks).tolist()
+    indptr = successor_indptr.tolist()
+    indices = successor_indices.tolist()
+    queue = deque(i for i in range(num_tasks) if in_degree[i] == 0)
+    order = []
+    while queue:
+        u = queue.popleft()
+        order.append(u)
+        for v in indices[indptr[u]:indptr[u + 1]]:
+            in_degree[v] -= 1
+            if in_degree[v] == 0:
+                queue.append(v)
+
+    if len(order) < num_tasks:
+        cycle = _find_cycle(num_tasks, indptr, indices, in_degree)
+        labels = np.asarray(tasks).tolist() if tasks is not None else list(range(num_tasks))
+        raise PrecedenceCycleError([labels[i] for i in cycle])
+    return np.array(order, dtype=np.int64)
+
+
+def _bitset_matrix(bitsets, num_tasks):
+    # Unpacks one bitset per task into the rows of a boolean matrix
+    num_bytes = (num_tasks + 7) // 8
+    if num_bytes == 0:
+        return np.zeros((0, 0), dtype=bool)
+    packed = np.frombuffer(b"".join(bits.to_bytes(num_bytes, "little") for bits in bitsets), dtype=np.uint8)
+    unpacked = np.unpackbits(packed.reshape(num_tasks, num_bytes), axis=1, bitorder="little")
+    return unpacked[:, :num_tasks].astype(bool)
+
+
+def _find_cycle(num_tasks, indptr, indices, in_degree):
+    # Every task left over by Kahn's algorithm has a left over predecessor, so walking backwards
+    # along those predecessors must revisit a task
+    predecessor = {}
+    for u in range(num_tasks):
+        if in_degree[u] > 0:
+            for v in indices[indptr[u]:indptr[u + 1]]:
+                if in_degree[v] > 0:
+                    predecessor.setdefault(v, u)
+
+    visited = {}
+    task = next(iter(predecessor))
+    while task not in visited:
+        visited[task] = len(visited)
+        task = predecessor[task]
+    path = list(visited)[visited[task]:]
+    return path[::-1]
@@ -0,0 +1,141 @@
+from utils.heuristics import group_units
+from utils.precedence_graph import PrecedenceGraph
+
+
+def presolve_instance(tasks, products, task_time_dict, cycle_time_dict, precedence_relations, incompatible_tasks,
+                      same_station_pairs, stationtype_compatibility, windows, precedence_graph=None):
+    """
+    Shrinks an instance before the model is built.
+
+    - Tasks which must share a station, including tasks on a precedence path between two of them,
+      are merged into a super-task with the summed times and the common station types. The
+      super-task is named after its smallest task ID (see `utils.heuristics.group_units`).
+    - Precedence relations between super-tasks are transitively reduced.
+    - Incompatible pairs are dropped if their station windows don't overlap, or if the tasks
+      together with all tasks on precedence paths between them exceed a cycle time, since such
+      tasks can't share a station anyway.
+
+    Args:
+        tasks (list of int): Task IDs.
+        products (list of str): Product names.
+        task_time_dict (dict): Maps (task_ID, product) to the processing time.
+        cycle_time_dict (dict): Maps a product to its cycle time.
+        precedence_relations (list of tuple): Pairs (g, h) where task g must precede task h.
+        incompatible_tasks (list of tuple): Pairs (d, f) which can't share a station.
+        same_station_pairs (list of tuple): Pairs (m, n) which must share a station.
+        stationtype_compatibility (dict): Maps (task_ID, station_type) to 1 if compatible, else 0.
+        windows (dict): Maps each task to its (earliest, latest) station.
+        precedence_graph (PrecedenceGraph): The preprocessed precedence relations of the tasks.
+            Built from `precedence_relations` if None.
+
+    Returns:
+        dict: The presolved instance with the keys "tasks", "task_time_dict", "stationtype_compatibility",
+            "precedence_relations", "incompatible_tasks" and "windows" over the super-tasks, "members"
+            mapping each super-task of several tasks to its tasks in topological order,
+            "dropped_incompatible" with the dropped incompatible pairs of the original tasks, and "report"
+            with the number of removed pairs, rows and variables.
+
+    Raises:
+        ValueError: If incompatible tasks must share a station or a super-task has no feasible station.
+    """
+    if precedence_graph is None:
+        precedence_graph = PrecedenceGraph.from_pairs(tasks, precedence_relations)
+    task_index = {task: k for k, task in enumerate(tasks)}
+
+    units, members, _, unit_successors = group_units(tasks, precedence_relations, same_station_pairs,
+                                                     precedence_graph)
+    unit_of = {task: unit for unit in units for task in members[unit]}
+    station_types = sorted({k for _, k in stationtype_compatibility})
+
+    unit_windows = {}
+    for unit in units:
+        earliest = max(windows[task][0] for task in members[unit])
+        latest = min(windows[task][1] for task in members[unit])
+        if earliest > latest:
+            raise ValueError(f"Tasks {members[unit]} must share a station, but have no common feasible station.")
+        unit_windows[unit] = (earliest, latest)
+
+    unit_pairs = [(u, v) for u in units for v in sorted(unit_successors[u])]
+    reduced_precedence = PrecedenceGraph.from_pairs(units, unit_pairs).reduction_pairs()
+
+    kept_incompatible = []
+    dropped_incompatible = []
+    seen = set()
+    for d, f in incompatible_tasks:
+        u, v = unit_of[d], unit_of[f]
+        if u == v:
+            raise ValueError(f"Tasks {d} and {f} are incompatible, but must share a station.")
+        key = (min(u, v), max(u, v))
+        if key in seen:
+            continue
+        seen.add(key)
+        overlap = min(unit_windows[u][1], unit_windows[v][1]) - max(unit_windows[u][0], unit_windows[v][0]) + 1
+        if overlap <= 0 or exceeds_cycle_time(members[u] + members[v], precedence_graph, task_index, tasks,
+                                              products, task_time_dict, cycle_time_dict):
+            dropped_incompatible.append((d, f))
+            continue
+        kept_incompatible.append((u, v))
+
+    merged_tasks = [task for unit in units for task in members[unit] if task != unit]
+    merged_columns = sum(windows[task][1] - windows[task][0] + 1 for task in merged_tasks)
+    report = {
+        "merged_tasks": len(merged_tasks),
+        "removed_precedence_pairs": len(precedence_relations) - len(reduced_precedence),
+        "removed_incompatible_pairs": len(incompatible_tasks) - len(kept_incompatible),
+        # x and task_order per task and station
+        "removed_variables": 2 * merged_columns,
+        # task_assignment per task, open_station, station_compatibility and task_order_assignment per
+        # task and station, same_station_tasks per pair and station, two rows per precedence pair
+        "removed_rows": len(merged_tasks) + 3 * merged_columns
+        + sum(windows[m][1] - windows[m][0] + 1 for m, _ in same_station_pairs)
+        + 2 * (len(precedence_relations) - len(reduced_precedence))
+        + _incompatible_rows(incompatible_tasks, windows) - _incompatible_rows(kept_incompatible, unit_windows),
+    }
+
+    return {
+        "tasks": units,
+        "task_time_dict": {
+            (unit, p): sum(task_time_dict[(task, p)] for task in members[unit]) for unit in units for p in products
+        },
+        "stationtype_compatibility": {
+            (unit, k): int(all(stationtype_compatibility[(task, k)] for task in members[unit]))
+            for unit in units for k in station_types
+        },
+        "precedence_relations": reduced_precedence,
+        "incompatible_tasks": kept_incompatible,
+        "windows": unit_windows,
+        "members": {unit: members[unit] for unit in units if len(members[unit]) > 1},
+        "dropped_incompatible": dropped_incompatible,
+        "report": report,
+    }
+
+
+def exceeds_cycle_time(group, precedence_graph, task_index, tasks, products, task_time_dict, cycle_time_dict):
+    """
+    Checks if a group of tasks can't share a station. Tasks on a precedence path between two tasks
+    of a station are on that station too, so their times count as well.
+
+    Args:
+        group (list of int): Task IDs.
+        precedence_graph (PrecedenceGraph): The precedence relations of `tasks`.
+        task_index (dict): Maps each task to its position in `tasks`.
+        tasks (list of int): Task IDs in the order of `precedence_graph`.
+        products (list of str): Product names.
+        task_time_dict (dict): Maps (task_ID, product) to the processing time.
+        cycle_time_dict (dict): Maps a product to its cycle time.
+
+    Returns:
+        bool: True if the tasks exceed the cycle time of a product.
+    """
+    descendants = ancestors = 0
+    for task in group:
+        k = task_index[task]
+        descendants |= precedence_graph.descendants[k]
+        ancestors |= precedence_graph.ancestors[k]
+    between = descendants & ancestors
+    on_station = set(group) | {tasks[k] for k, bit in enumerate(reversed(bin(between)[2:])) if bit == "1"}
+    return any(sum(task_time_dict[(task, p)] for task in on_station) > cycle_time_dict[p] for p in products)
+
+
+def _incompatible_rows(pairs, windows):
+    return sum(max(min(windows[d][1], windows[f][1]) - max(windows[d][0], windows[f][0]) + 1, 0) for d, f in pairs)
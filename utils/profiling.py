@@ -0,0 +1,191 @@
+import contextlib
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Comma-separated options of the profiler, e.g. "time", "time,memory" or "cprofile,memory", empty or "0" disables it
+PROFILE_ENV = "ALB_PROFILE"
+# Directory the cProfile statistics are written to as `<phase>.prof`, printed if unset
+PROFILE_DIR_ENV = "ALB_PROFILE_DIR"
+OPTIONS = ("time", "memory", "cprofile")
+
+_profiler = None
+
+
+class PhaseProfiler:
+    def __init__(self, enabled=True, memory=False, cprofile=False, output_dir=None, top=15):
+        """
+        Parameters:
+        ----------
+        enabled : bool
+            Records nothing if False, so the phases cost next to nothing.
+        memory : bool
+            Traces the Python allocations with tracemalloc, which slows the traced code down.
+        cprofile : bool
+            Runs cProfile during each phase that isn't nested in another one.
+        output_dir : str
+            Directory of the cProfile statistics, the `top` functions by cumulative time are printed otherwise.
+        top : int
+            Number of functions printed per phase.
+        """
+        self.enabled = enabled
+        self.memory = memory
+        self.cprofile = cprofile
+        self.output_dir = output_dir
+        self.top = top
+        # One dict per finished phase with the keys "phase", "wall", "cpu", "peak_memory_mb" and "max_rss_mb"
+        self.rows = []
+        # Peak traced memory of the open phases, innermost last
+        self._peaks = []
+        self._profiling = False
+
+    @classmethod
+    def from_options(cls, options, output_dir=None):
+        """
+        Creates a profiler from a comma-separated string of `OPTIONS`, see `PROFILE_ENV`.
+
+        Raises:
+            ValueError: If an option is unknown.
+        """
+        options = {option.strip().lower() for option in (options or "").split(",")} - {"", "0", "false", "off"}
+        options = {"time" if option in ("1", "true", "on") else option for option in options}
+        unknown = options - set(OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown profiling options {sorted(unknown)}, expected some of {OPTIONS}.")
+        return cls(enabled=bool(options), memory="memory" in options, cprofile="cprofile" in options,
+                   output_dir=output_dir)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        Measures the wall time, CPU time and peak memory of the code in the `with` block.
+
+        Phases may be nested, e.g. the solve of a model within a portfolio run, each of them gets its
+        own row. cProfile only covers the outermost phase, since only one profiler can be active.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            current, peak = tracemalloc.get_traced_memory()
+            # The peak of an enclosing phase would be lost by the reset
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], peak)
+            tracemalloc.reset_peak()
+            self._peaks.append(current)
+            baseline = current
+        profiler = None
+        if self.cprofile and not self._profiling:
+            profiler = cProfile.Profile()
+            self._profiling = True
+            profiler.enable()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+                self._report_profile(name, profiler)
+            peak_memory = None
+            if self.memory:
+                peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+                tracemalloc.reset_peak()
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+                peak_memory = (peak - baseline) / (1024 * 1024)
+            self.rows.append({
+                "phase": name,
+                "wall": wall,
+                "cpu": cpu,
+                "peak_memory_mb": peak_memory,
+                "max_rss_mb": _max_rss_mb(),
+            })
+
+    def _report_profile(self, name, profiler):
+        if self.output_dir is not None:
+            os.makedirs(self.output_dir, exist_ok=True)
+            file_path = os.path.join(self.output_dir, f"{name}.prof")
+            profiler.dump_stats(file_path)
+            print(f"Profile of phase '{name}' written to `{file_path}`.")
+            return
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(self.top)
+        print(f"Profile of phase '{name}':\n{stream.getvalue()}")
+
+    def summary(self):
+        """
+        Prints the wall time, CPU time and memory of every phase in the order they finished.
+
+        The peak memory is the largest amount of traced Python memory above the start of the phase,
+        memory of the solvers' native code is only part of the maximum resident set size of the process.
+        """
+        if not self.enabled or not self.rows:
+            return
+        print(f"\n{'Phase':<16}{'Wall [s]':>10}{'CPU [s]':>10}{'Peak MB':>10}{'Max RSS MB':>12}")
+        for row in self.rows:
+            peak = "-" if row["peak_memory_mb"] is None else f"{row['peak_memory_mb']:.1f}"
+            rss = "-" if row["max_rss_mb"] is None else f"{row['max_rss_mb']:.1f}"
+            print(f"{row['phase']:<16}{row['wall']:>10.3f}{row['cpu']:>10.3f}{peak:>10}{rss:>12}")
+
+    def export(self, file_path):
+        # Writes the rows to a JSON file
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(file_path, "w") as file:
+            json.dump(self.rows, file, indent=2)
+        print(f"Phase profile written to `{file_path}`.")
+
+
+def configure(options=None, output_dir=None):
+    """
+    Replaces the profiler used by `phase`, configured from the environment variables `PROFILE_ENV`
+    and `PROFILE_DIR_ENV` if `options` is None.
+
+    Returns:
+        PhaseProfiler: The new profiler.
+    """
+    global _profiler
+    if options is None:
+        options = os.environ.get(PROFILE_ENV, "")
+        output_dir = output_dir or os.environ.get(PROFILE_DIR_ENV) or None
+    _profiler = PhaseProfiler.from_options(options, output_dir)
+    return _profiler
+
+
+def get_profiler():
+    if _profiler is None:
+        configure()
+    return _profiler
+
+
+def phase(name):
+    """
+    Measures the code in a `with` block as phase `name` of the current profiler, see `PhaseProfiler.phase`.
+    """
+    return get_profiler().phase(name)
+
+
+def _max_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is given in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
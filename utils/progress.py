@@ -0,0 +1,82 @@
+import csv
+import json
+import math
+import os
+
+from utils.bounds import relative_gap
+
+# Incumbents and bounds at or beyond this magnitude mean "none yet", e.g. GRB.INFINITY or SCIP's infinity
+INFINITY = 1e20
+
+
+class ProgressLog:
+    """
+    Time series of the incumbent objective, best bound and node count of a solve, filled by the
+    callbacks of the solver backends and exported as CSV or JSON.
+
+    A row is kept for every new incumbent, every change of the bound or incumbent, and otherwise at
+    most every `interval` seconds, so frequent callbacks don't flood the log.
+
+    Attributes:
+        rows (list of dict): One dict per row with the keys of `FIELDS`.
+        metadata (dict): Free-form information about the run, e.g. instance and solver, stored in the JSON export.
+    """
+    FIELDS = ("time", "incumbent", "bound", "gap", "nodes", "event")
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.rows = []
+        self.metadata = {}
+
+    def clear(self):
+        self.rows = []
+
+    def record(self, elapsed, incumbent, bound, nodes, event="progress"):
+        """
+        Adds a row unless nothing changed within the last `interval` seconds.
+
+        Args:
+            elapsed (float): Seconds since the solver started.
+            incumbent (float): Objective of the best solution, None or infinite if there is none.
+            bound (float): Best bound on the objective, None or infinite if there is none.
+            nodes (int): Number of branch-and-bound nodes so far.
+            event (str): "incumbent" for a new best solution, "final" for the result, otherwise "progress".
+        """
+        incumbent = _finite(incumbent)
+        bound = _finite(bound)
+        if self.rows and event == "progress":
+            last = self.rows[-1]
+            unchanged = last["incumbent"] == incumbent and last["bound"] == bound
+            if unchanged and elapsed - last["time"] < self.interval:
+                return
+        self.rows.append({
+            "time": elapsed,
+            "incumbent": incumbent,
+            "bound": bound,
+            "gap": relative_gap(incumbent, bound),
+            "nodes": None if nodes is None else int(nodes),
+            "event": event,
+        })
+
+    def export(self, file_path):
+        """
+        Writes the rows to a `.json` file together with the metadata, or to a CSV file otherwise.
+        """
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if file_path.lower().endswith(".json"):
+            with open(file_path, "w") as file:
+                json.dump({"metadata": self.metadata, "rows": self.rows}, file, indent=2)
+        else:
+            with open(file_path, "w", newline="") as file:
+                writer = csv.DictWriter(file, fieldnames=self.FIELDS)
+                writer.writeheader()
+                writer.writerows(self.rows)
+        print(f"Progress of the solve written to `{file_path}`.")
+
+
+def _finite(number):
+    if number is None or not math.isfinite(number) or abs(number) >= INFINITY:
+        return None
+    return float(number)
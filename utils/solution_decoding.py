@@ -0,0 +1,110 @@
+import re
+
+import numpy as np
+from pyomo.environ import Var
+
+# Pyomo symbolic solver labels, e.g. `x(3_2)` for x[3,2]
+_LABEL_PATTERN = re.compile(r"^(\w+?)\((.*)\)$")
+
+# Values below this threshold count as zero
+TOLERANCE = 1e-6
+
+
+def column_map_from_model(model):
+    """
+    Maps the names of all variables of a Pyomo model, e.g. `x[3,2]`, to (component name, index).
+    """
+    column_map = {}
+    for var in model.component_data_objects(Var, descend_into=True):
+        column_map[var.name] = (var.parent_component().local_name, _as_tuple(var.index()))
+    return column_map
+
+
+def column_map_from_symbol_map(symbol_map):
+    """
+    Maps the labels of a Pyomo symbol map, as written to MPS files, to (component name, index).
+    """
+    column_map = {}
+    for label, component in symbol_map.bySymbol.items():
+        if component is not None and component.ctype is Var:
+            column_map[label] = (component.parent_component().local_name, _as_tuple(component.index()))
+    return column_map
+
+
+def column_values(model, column_map):
+    """
+    Maps the column names of `column_map` to the current values of the Pyomo variables, e.g. the MIP
+    start loaded by `OptimizationModel.build_model`. Variables without a value are left out.
+    """
+    name_of = {key: name for name, key in column_map.items()}
+    values = {}
+    for var in model.component_data_objects(Var, descend_into=True):
+        name = name_of.get((var.parent_component().local_name, _as_tuple(var.index())))
+        if name is not None and var.value is not None:
+            values[name] = var.value
+    return values
+
+
+def parse_label(label):
+    """
+    Best effort parsing of a Pyomo symbolic label like `y(3_Manual)` into ("y", (3, "Manual")).
+    Labels whose index contains underscores or special characters can't be recovered exactly.
+    """
+    match = _LABEL_PATTERN.match(label)
+    if match is None:
+        return label, ()
+    return match.group(1), tuple(int(part) if part.lstrip("-").isdigit() else part
+                                 for part in match.group(2).split("_"))
+
+
+def decode_station_results(names, values, column_map=None, unit_members=None):
+    """
+    Decodes a solution of the station-type model into the line layout.
+
+    Only the nonzero values are looked up by name, so the decoding doesn't depend on the column order.
+
+    Args:
+        names (list of str): Column names of the solver.
+        values (array-like): Solution value of each column.
+        column_map (dict): Maps a column name to (component name, index). If None, the names are
+            parsed as Pyomo symbolic labels.
+        unit_members (dict): Maps a super-task of the presolve to its tasks, see
+            `OptimizationModel.unit_members`.
+
+    Returns:
+        dict: Maps each open station to a dict with the keys "station_type" (None if the model has
+            no station types) and "assigned_tasks", ordered by `task_order` if the model has it.
+    """
+    values = np.asarray(values, dtype=float)
+    assignments = {}
+    station_types = {}
+    task_orders = {}
+
+    for k in np.flatnonzero(np.abs(values) > TOLERANCE).tolist():
+        name = names[k]
+        component, index = column_map[name] if column_map is not None else parse_label(name)
+        value = values[k]
+        if component == "x" and value > 0.5:
+            task, station = index
+            assignments.setdefault(station, []).append(task)
+        elif component == "y" and len(index) == 2 and value > 0.5:
+            station_types[index[0]] = index[1]
+        elif component == "task_order":
+            task_orders[index] = value
+
+    station_results = {}
+    for station in sorted(assignments):
+        tasks = sorted(assignments[station], key=lambda task: task_orders.get((task, station), 0))
+        if unit_members:
+            tasks = [i for task in tasks for i in unit_members.get(task, [task])]
+        station_results[station] = {
+            "station_type": station_types.get(station),
+            "assigned_tasks": tasks,
+        }
+    return station_results
+
+
+def _as_tuple(index):
+    if index is None:
+        return ()
+    return index if isinstance(index, tuple) else (index,)
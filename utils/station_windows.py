@@ -0,0 +1,90 @@
+from collections import defaultdict
+
+import numpy as np
+
+from utils.precedence_graph import PrecedenceGraph
+
+
+def compute_station_windows(tasks, products, task_time_dict, cycle_time_dict, precedence_relations,
+                            same_station_pairs, max_stations, precedence_graph=None):
+    """
+    Computes the earliest and latest feasible station for every task.
+
+    The earliest station of a task is derived from the time of the task and all of its
+    (transitive) predecessors, the latest station from the time of the task and all of its
+    (transitive) successors. Both are evaluated per product with that product's cycle time,
+    and the tightest value is kept. Tasks which must share a station get the intersection
+    of their windows.
+
+    Args:
+        tasks (list of int): Task IDs.
+        products (list of str): Product names.
+        task_time_dict (dict): Maps (task_ID, product) to the processing time.
+        cycle_time_dict (dict): Maps a product to its cycle time.
+        precedence_relations (list of tuple): Pairs (g, h) where task g must precede task h.
+        same_station_pairs (list of tuple): Pairs (m, n) which must be on the same station.
+        max_stations (int): Number of stations available in the model.
+        precedence_graph (PrecedenceGraph): The preprocessed precedence relations of the tasks,
+            e.g. `Instance.precedence_graph`. Built from `precedence_relations` if None.
+
+    Returns:
+        dict: Maps each task ID to a tuple (earliest_station, latest_station).
+
+    Raises:
+        ValueError: If a task has an empty station window.
+    """
+    if precedence_graph is None:
+        precedence_graph = PrecedenceGraph.from_pairs(tasks, precedence_relations)
+
+    # Time of each task together with all its predecessors (head) or successors (tail) per product
+    times = np.array([[task_time_dict[(i, p)] for p in products] for i in tasks], dtype=float) \
+        .reshape(len(tasks), len(products))
+    head_times = times + precedence_graph.reachability_matrix(transpose=True) @ times
+    tail_times = times + precedence_graph.reachability_matrix() @ times
+    cycle_times = np.array([cycle_time_dict[p] for p in products], dtype=float)
+    positive = cycle_times > 0
+    head = np.ceil(head_times[:, positive] / cycle_times[positive]).max(axis=1, initial=1).astype(int)
+    tail = np.ceil(tail_times[:, positive] / cycle_times[positive]).max(axis=1, initial=1).astype(int)
+
+    windows = {task: (int(head[k]), max_stations + 1 - int(tail[k])) for k, task in enumerate(tasks)}
+
+    # Tasks on the same station share the intersection of their windows
+    for group in same_station_groups(tasks, same_station_pairs):
+        earliest = max(windows[task][0] for task in group)
+        latest = min(windows[task][1] for task in group)
+        for task in group:
+            windows[task] = (earliest, latest)
+
+    for task, (earliest, latest) in windows.items():
+        if earliest > latest:
+            raise ValueError(
+                f"Task {task} has no feasible station (earliest {earliest}, latest {latest}) "
+                f"with {max_stations} stations."
+            )
+
+    return windows
+
+
+def same_station_groups(tasks, same_station_pairs):
+    linked = defaultdict(set)
+    for m, n in same_station_pairs:
+        linked[m].add(n)
+        linked[n].add(m)
+
+    groups = []
+    visited = set()
+    for task in tasks:
+        if task in visited or task not in linked:
+            continue
+        group = []
+        stack = [task]
+        visited.add(task)
+        while stack:
+            current = stack.pop()
+            group.append(current)
+            for neighbour in linked[current]:
+                if neighbour not in visited:
+                    visited.add(neighbour)
+                    stack.append(neighbour)
+        groups.append(group)
+    return groups
@@ -1,4 +1,6 @@
-import utils.graph as graph
+import numpy as np
+
+from utils.heuristics import group_units
 
 def find_connected_task_groups(compatible_task_pairs):
     """
@@ -10,63 +12,57 @@ def find_connected_task_groups(compatible_task_pairs):
     Returns:
         list of list: A list of unique task groups.
     """
-    def _find_group(initial_pair, remaining_pairs):
-        """
-        Recursively finds all tasks connected through compatibility pairs.
-
-        Args:
-            initial_pair (list): The initial group of tasks.
-            remaining_pairs (list of tuple): The remaining compatibility pairs to process.
-
-        Returns:
-            list: A complete list of tasks connected to the initial pair.
-        """
-        group = list(initial_pair)
-        pairs_to_process = remaining_pairs.copy()
-        newly_added = True
-
-        while newly_added:
-            newly_added = False
-            for task1, task2 in pairs_to_process:
-                if task1 in group or task2 in group:
-                    if task1 not in group:
-                        group.append(task1)
-                    if task2 not in group:
-                        group.append(task2)
-                    pairs_to_process.remove((task1, task2))
-                    newly_added = True
-        return group
-
-    # Find all connected groups
-    groups = []
-    for pair in compatible_task_pairs:
-        remaining_pairs = compatible_task_pairs.copy()
-        group = _find_group(pair, remaining_pairs)
-        groups.append(group)
-
-    # Remove duplicate groups
-    unique_groups = {frozenset(group) for group in groups}
-    return [list(group) for group in unique_groups]
-
-
-def check_task_groups_against_cycle_time(task_groups, tasks, cycle_time):
+    # Union-find with path halving
+    parent = {}
+
+    def find(task):
+        parent.setdefault(task, task)
+        while parent[task] != task:
+            parent[task] = parent[parent[task]]
+            task = parent[task]
+        return task
+
+    for task1, task2 in compatible_task_pairs:
+        root1, root2 = find(task1), find(task2)
+        if root1 != root2:
+            parent[max(root1, root2)] = min(root1, root2)
+
+    groups = {}
+    for task in parent:
+        groups.setdefault(find(task), []).append(task)
+    return [sorted(group) for group in groups.values()]
+
+
+def check_task_groups_against_cycle_time(task_groups, products, task_time_dict, cycle_time_dict):
     """
-    Checks if groups of tasks can be completed within the given cycle time.
+    Checks if groups of tasks can be completed within the cycle time of every product.
 
     Args:
         task_groups (list of list): A list of task groups.
-        tasks (dict): A dictionary where keys are task IDs and values are task times.
-        cycle_time (int): The maximum allowable time for a group of tasks.
+        products (list of str): Product names.
+        task_time_dict (dict): Maps (task_ID, product) to the processing time.
+        cycle_time_dict (dict): Maps a product to its cycle time.
 
     Returns:
-        None
+        bool: True if every group fits into the cycle time of every product.
     """
-    for group in task_groups:
-        total_time = sum(tasks[task] for task in group)
-        if total_time > cycle_time:
-            print(f"Tasks {group} cannot be processed together (total time: {total_time}).")
-        else:
-            print(f"Tasks {group} can be processed together (total time: {total_time}).")
+    if not task_groups or not products:
+        return True
+
+    # Time sums with one row per group and one column per product
+    group_tasks = [task for group in task_groups for task in group]
+    group_index = np.repeat(np.arange(len(task_groups)), [len(group) for group in task_groups])
+    times = np.array([[task_time_dict[(task, p)] for p in products] for task in group_tasks], dtype=float)
+    group_times = np.zeros((len(task_groups), len(products)))
+    np.add.at(group_times, group_index, times)
+    cycle_times = np.array([cycle_time_dict[p] for p in products], dtype=float)
+
+    valid = True
+    for g, column in zip(*np.nonzero(group_times > cycle_times)):
+        print(f"Tasks {task_groups[g]} cannot be processed together for {products[column]} "
+              f"(total time: {group_times[g, column]:g}, cycle time: {cycle_times[column]:g}).")
+        valid = False
+    return valid
 
 
 def validate_task_groups(task_groups, incompatible_task_pairs):
@@ -78,96 +74,76 @@ def validate_task_groups(task_groups, incompatible_task_pairs):
         incompatible_task_pairs (list of tuple): A list of task pairs that are incompatible.
 
     Returns:
-        None
+        bool: True if no group contains an incompatible pair.
     """
-    for group in task_groups:
-        for task1, task2 in incompatible_task_pairs:
-            if task1 in group and task2 in group:
-                print(f"Group {group} contains incompatible tasks ({task1}, {task2}).")
-                return False  # Incompatible tasks detected
-    print("All task groups are valid.")
+    group_of_task = {task: g for g, group in enumerate(task_groups) for task in group}
+    for task1, task2 in incompatible_task_pairs:
+        g = group_of_task.get(task1)
+        if g is not None and g == group_of_task.get(task2):
+            print(f"Group {task_groups[g]} contains incompatible tasks ({task1}, {task2}).")
+            return False  # Incompatible tasks detected
     return True
 
-def check_precedence_relations(connected_task_groups, precedence_relations, incompatible_task_pairs):
-    g = graph.Graph()
-    g.add_edges(precedence_relations)
-
-    for connected_task_group in connected_task_groups:
-        subgraph_edges = g.get_edges_of_subgraph_with_paths(connected_task_group)
-
-        subgraph = graph.Graph()
-        subgraph.add_edges(subgraph_edges)
-
-        nodes_with_predecessors_and_successors = subgraph.get_nodes_with_predecessors_and_successors()
-
-        for task1, task2 in incompatible_task_pairs:
-            if task1 in nodes_with_predecessors_and_successors:
-                if subgraph.is_predecessor(task1, task2):
-                    print("------------------------------------------------------------------------")
-                    print(f"Error due to: ")
-                    print(f"Task {task1} is incompatible to task {task2}, but ", end="")
-                    print(f"Task {task2} is predecessor of task {task1}.")
-                    print(f"This contradicts to the following compatible tasks: {connected_task_groups}")
-                    print(f"This is the corresponding subgraph: {subgraph_edges}")
-                    print("------------------------------------------------------------------------")
-                    return False
-
-            if task2 in nodes_with_predecessors_and_successors:
-                if subgraph.is_predecessor(task2, task1):
-                    print("------------------------------------------------------------------------")
-                    print(f"Error due to: ")
-                    print(f"Task {task2} is incompatible to task {task1}, but ", end="")
-                    print(f"Task {task1} is predecessor of task {task2}.")
-                    print(f"This contradicts to the following compatible tasks: {connected_task_groups}")
-                    print(f"This is the corresponding subgraph: {subgraph_edges}")
-                    print("------------------------------------------------------------------------")
-                    return False
-                
-    return True
 
-def validate_input(tasks_per_product, compatible_task_pairs, incompatible_task_pairs, precedence_relations, cycle_time):
+def check_precedence_relations(forced_task_groups, connected_task_groups, incompatible_task_pairs):
     """
-    Processes tasks with compatibility, incompatibility, precedence, and cycle time constraints.
+    Checks that precedence relations don't force incompatible tasks onto the same station.
+
+    A task on a precedence path between two tasks of a group has to be assigned to the station of
+    that group as well, see `utils.heuristics.group_units`.
 
     Args:
-        tasks (dict): A dictionary where keys are task IDs and values are task times.
-        compatible_task_pairs (list of tuple): A list of task pairs that are compatible.
+        forced_task_groups (list of list): The task groups including the tasks forced into them.
+        connected_task_groups (list of list): The task groups of the compatibility pairs.
         incompatible_task_pairs (list of tuple): A list of task pairs that are incompatible.
-        precedence_relations (list of tuple): A list of precedence relations (task1, task2).
-        cycle_time (int): The maximum allowable time for a group of tasks.
 
     Returns:
-        None
+        bool: True if no forced group contains an incompatible pair.
     """
-    print("Finding connected task groups... ", end="")
-    connected_task_groups = find_connected_task_groups(compatible_task_pairs)
-    print("Done.")
-
-    print("Validating task groups against incompatibilities... ", end="")
-    valid = validate_task_groups(connected_task_groups, incompatible_task_pairs)
-    if not valid:
-        print("\nTask group validation failed due to incompatibilities.")
-        return
+    group_of_task = {task: g for g, group in enumerate(forced_task_groups) for task in group}
+    connected_tasks = {task for group in connected_task_groups for task in group}
+    for task1, task2 in incompatible_task_pairs:
+        g = group_of_task.get(task1)
+        if g is not None and g == group_of_task.get(task2):
+            forced_tasks = [task for task in forced_task_groups[g] if task not in connected_tasks]
+            print(f"Task {task1} is incompatible to task {task2}, but the precedence relations force both "
+                  f"onto the station of the compatible tasks {forced_task_groups[g]} (forced: {forced_tasks}).")
+            return False
+    return True
 
-    print("Checking groups against cycle time...")
-    for tasks in tasks_per_product:
-        check_task_groups_against_cycle_time(connected_task_groups, tasks, cycle_time)
 
-    print("Checking precedence relations...")
-    valid = check_precedence_relations(connected_task_groups, precedence_relations, incompatible_task_pairs)
-    if not valid:
-        print("Precedence relations check failed.")
-        return
+def validate_input(tasks, products, task_time_dict, cycle_time_dict, compatible_task_pairs, incompatible_task_pairs,
+                   precedence_relations, precedence_graph=None):
+    """
+    Processes tasks with compatibility, incompatibility, precedence, and cycle time constraints.
 
-    print("Processing complete.")
+    Args:
+        tasks (list of int): Task IDs.
+        products (list of str): Product names.
+        task_time_dict (dict): Maps (task_ID, product) to the processing time.
+        cycle_time_dict (dict): Maps a product to its cycle time.
+        compatible_task_pairs (list of tuple): A list of task pairs that must share a station.
+        incompatible_task_pairs (list of tuple): A list of task pairs that are incompatible.
+        precedence_relations (list of tuple): A list of acyclic precedence relations (task1, task2).
+        precedence_graph (PrecedenceGraph): The preprocessed precedence relations of the tasks,
+            e.g. `Instance.precedence_graph`. Built from `precedence_relations` if None.
 
+    Returns:
+        bool: True if the input passed all checks.
+    """
+    connected_task_groups = find_connected_task_groups(compatible_task_pairs)
+    if not validate_task_groups(connected_task_groups, incompatible_task_pairs):
+        print("Task group validation failed due to incompatibilities.")
+        return False
 
-# Example usage
-tasks = [{1: 1, 2: 1, 3: 1, 4: 6, 5: 8}]
-compatible_task_pairs = [(1, 3)]
-incompatible_task_pairs = [(1, 2)]
-precedence_relations = [(1, 2), (2, 3)]
-cycle_time = 500
+    _, members, _, _ = group_units(tasks, precedence_relations, compatible_task_pairs, precedence_graph)
+    forced_task_groups = [group for group in members.values() if len(group) > 1]
+    if not check_precedence_relations(forced_task_groups, connected_task_groups, incompatible_task_pairs):
+        print("Precedence relations check failed.")
+        return False
 
-# validate_input(tasks, compatible_task_pairs, incompatible_task_pairs, precedence_relations, cycle_time)
+    if not check_task_groups_against_cycle_time(forced_task_groups, products, task_time_dict, cycle_time_dict):
+        print("Cycle time check failed.")
+        return False
 
+    return True
@@ -1,4 +1,4 @@
-import networkx as nx
+from utils.precedence_graph import PrecedenceGraph
 
 def write_results(station_task_dict, precedence_relations):
     sorted_dict = sort_tasks_in_stations(station_task_dict, precedence_relations)
@@ -6,28 +6,15 @@ def write_results(station_task_dict, precedence_relations):
 
 
 def sort_tasks_in_stations(station_task_dict, precedence_relations):
-    # Erstelle einen gerichteten Graphen basierend auf den precedence_relations
-    G = nx.DiGraph()
-    G.add_edges_from(precedence_relations)
+    # Sorts the tasks of each station topologically, the precedence graph is built once for all stations
+    tasks = list(dict.fromkeys(
+        [task for tasks in station_task_dict.values() for task in tasks]
+        + [task for relation in precedence_relations for task in relation]
+    ))
+    graph = PrecedenceGraph.from_pairs(tasks, precedence_relations)
 
-    # Durchlaufe jede Station und sortiere die Aufgaben
     for station, tasks in station_task_dict.items():
-        items_in_graph = [task for task in tasks if task in G.nodes]
-        items_not_in_graph = [task for task in tasks if task not in G.nodes]
-
-        subgraph = G.subgraph(items_in_graph)
-        # Wenn keine Aufgaben in der aktuellen Station sind, überspringe die Station
-        sorted_items = list(nx.topological_sort(subgraph))
-
-        sorted_list = []
-        for item in tasks:
-            if item in items_in_graph:
-                sorted_list.append(sorted_items.pop(0))  # Füge die sortierten Items hinzu
-            else:
-                sorted_list.append(item)
-
-        # Sortiere die Aufgaben der Station nach der Reihenfolge
-        station_task_dict[station] = sorted_list
+        station_task_dict[station] = graph.sort_tasks(tasks)
 
     return station_task_dict
 
@@ -39,4 +26,13 @@ def print_task_assignments(station_task_dict):
         # Get the tasks for this station
         tasks = station_task_dict[station]
         # Output the station with the new name (Station 1, Station 2, etc.)
-        print(f"Station {idx}: {tasks}")
\ No newline at end of file
+        print(f"Station {idx}: {tasks}")
+
+def print_station_results(station_results):
+    # Prints stations with their type and tasks, numbering the open stations consecutively
+    count = 1
+    for station_index, info in station_results.items():
+        print(
+            f"Station {count} with type {info['station_type']}: {info['assigned_tasks']}"
+        )
+        count += 1